@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Admission control: per-class concurrency limits, bounded wait queues and per-client rate limits"""
+
+import asyncio
+import ipaddress
+import math
+import os
+import time
+from typing import Collection, Dict, List, Optional, Union
+
+from starlette.responses import JSONResponse
+
+from caching import LRUCache
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+from ratelimit import TokenBucket
+
+# Path prefix -> traffic class; the first match wins, unmatched paths are not limited
+ROUTE_CLASSES = (
+    ("/api/chatbot/chat", "chat"),
+    ("/api/chatbot/query", "chat"),
+    ("/api/chatbot/batch", "chat"),
+    ("/api/chatbot/", "catalog"),
+    ("/api/", "proxy"),
+)
+# Defaults per class: (concurrency, queue, max wait seconds); chat costs ~1000x a proxy GET
+CLASS_DEFAULTS = {
+    "chat": (4, 16, 10.0),
+    "proxy": (64, 256, 5.0),
+    "catalog": (32, 128, 2.0),
+}
+# Peers whose X-Forwarded-For is believed: the Next.js server and any load balancer, as IPs or
+# CIDRs; "*" trusts any peer. The default covers a frontend on the same host or private network.
+TRUSTED_PROXIES = os.getenv(
+    "ADMISSION_TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+)
+# Comma-separated API keys that get their own per-client bucket; any other key is limited by IP
+ADMISSION_API_KEYS = frozenset(k.strip() for k in os.getenv("ADMISSION_API_KEYS", "").split(",") if k.strip())
+API_KEY_HEADER = b"x-api-key"
+# Idle clients' buckets are dropped after this long; a new bucket starts full anyway
+CLIENT_BUCKET_TTL = 600.0
+
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def classify(path: str) -> Optional[str]:
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return None
+
+
+class AdmissionRejected(Exception):
+    """A request turned away; `status` is 429 (client over its rate) or 503 (class overloaded)"""
+
+    def __init__(self, status: int, reason: str, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class TrafficClass:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one kind of traffic
+
+    Up to `concurrency` requests run at once and up to `queue` more wait,
+    each for at most `max_wait` seconds. Beyond that requests are rejected
+    at once with 503, so a burst of one class cannot starve the others.
+    An optional per-client token bucket (`client_rate` per second, up to
+    `client_burst`) rejects heavy clients with 429 before they queue.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, max_wait: float,
+                 client_rate: float = 0.0, client_burst: float = 0.0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue = max(0, queue)
+        self.max_wait = max_wait
+        self.client_rate = client_rate
+        self.client_burst = client_burst or max(1.0, client_rate)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.waiting = 0
+        self.running = 0
+        # Smoothed seconds per request, for Retry-After estimates
+        self._service_time = 1.0
+        self._clients = LRUCache(max_entries=10000, ttl=CLIENT_BUCKET_TTL)
+        self._publish()
+
+    @classmethod
+    def from_env(cls, name: str) -> "TrafficClass":
+        """Build a class from ADMISSION_<NAME>_* and CLIENT_RATE_<NAME> / CLIENT_BURST_<NAME>"""
+        concurrency, queue, max_wait = CLASS_DEFAULTS[name]
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            concurrency=int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+            queue=int(os.getenv(prefix + "QUEUE", str(queue))),
+            max_wait=float(os.getenv(prefix + "MAX_WAIT", str(max_wait))),
+            client_rate=float(os.getenv(f"CLIENT_RATE_{name.upper()}", "0")),
+            client_burst=float(os.getenv(f"CLIENT_BURST_{name.upper()}", "0")),
+        )
+
+    def _retry_after(self) -> float:
+        """Rough time until a slot frees up for a newcomer"""
+        return self._service_time * (self.waiting + 1) / self.concurrency
+
+    def check_client(self, client: str) -> None:
+        if self.client_rate <= 0:
+            return
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._clients.set(client, bucket)
+        if not bucket.try_acquire():
+            self._reject(429, "client_rate", bucket.wait_time(),
+                         f"Too many {self.name} requests from this client")
+
+    def _reject(self, status: int, reason: str, retry_after: float, detail: str) -> None:
+        ADMISSION_REJECTED.inc(traffic_class=self.name, reason=reason)
+        raise AdmissionRejected(status, reason, retry_after, detail)
+
+    def _publish(self) -> None:
+        ADMISSION_QUEUE_DEPTH.set(self.waiting, traffic_class=self.name)
+        ADMISSION_IN_FLIGHT.set(self.running, traffic_class=self.name)
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if there is room; raises AdmissionRejected otherwise"""
+        if self.running < self.concurrency and not self.waiting:
+            await self._slots.acquire()  # Free slot: returns without suspending
+        else:
+            if self.waiting >= self.queue:
+                self._reject(503, "queue_full", self._retry_after(), f"Too many {self.name} requests queued")
+            self.waiting += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self._reject(503, "wait_timeout", self._retry_after(),
+                             f"No {self.name} capacity within {self.max_wait:g}s")
+            finally:
+                self.waiting -= 1
+        self.running += 1
+        self._publish()
+
+    def release(self, seconds: float) -> None:
+        self.running -= 1
+        self._service_time += 0.1 * (seconds - self._service_time)
+        self._slots.release()
+        self._publish()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "max_wait": self.max_wait,
+            "running": self.running,
+            "waiting": self.waiting,
+            "client_rate": self.client_rate,
+            "mean_service_seconds": round(self._service_time, 3),
+        }
+
+
+def parse_networks(text: str) -> Optional[List[IPNetwork]]:
+    """Networks from "10.0.0.0/8,::1"; None for "*", meaning any address"""
+    entries = [e.strip() for e in text.split(",") if e.strip()]
+    if "*" in entries:
+        return None
+    return [ipaddress.ip_network(e, strict=False) for e in entries]
+
+
+def _in_networks(address: str, networks: Optional[List[IPNetwork]]) -> bool:
+    if networks is None:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+_TRUSTED = parse_networks(TRUSTED_PROXIES)
+
+
+def client_key(scope, api_keys: Collection[str] = ADMISSION_API_KEYS,
+               trusted: Optional[List[IPNetwork]] = _TRUSTED) -> str:
+    """
+    An allow-listed API key if the request carries one, otherwise the client IP
+
+    Behind trusted proxies the IP is the rightmost X-Forwarded-For entry
+    that is not itself a trusted proxy: entries left of it could have been
+    written by the client. `trusted` None trusts every peer.
+    """
+    forwarded = None
+    for name, value in scope.get("headers", []):
+        if name == API_KEY_HEADER and value.decode("latin-1") in api_keys:
+            return "key:" + value.decode("latin-1")
+        if name == b"x-forwarded-for":
+            forwarded = value
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if forwarded and _in_networks(peer, trusted):
+        hops = [h.strip() for h in forwarded.decode("latin-1").split(",") if h.strip()]
+        while len(hops) > 1 and trusted is not None and _in_networks(hops[-1], trusted):
+            hops.pop()
+        if hops:
+            return "ip:" + hops[-1]
+    return "ip:" + peer
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting chat, proxy and catalog requests per traffic class
+
+    A request holds its class's slot until its response (including a
+    streamed one) is complete. Rejections are fast JSON responses with
+    `Retry-After`, sent before any work is done.
+    """
+
+    def __init__(self, app, classes: Optional[Dict[str, TrafficClass]] = None):
+        self.app = app
+        self.classes = classes if classes is not None else {name: TrafficClass.from_env(name) for name in CLASS_DEFAULTS}
+
+    async def __call__(self, scope, receive, send):
+        traffic = self.classes.get(classify(scope["path"])) if scope["type"] == "http" else None
+        if traffic is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            traffic.check_client(client_key(scope))
+            await traffic.acquire()
+        except AdmissionRejected as e:
+            retry_after = str(max(1, math.ceil(e.retry_after)))
+            response = JSONResponse({"detail": e.detail}, status_code=e.status, headers={"Retry-After": retry_after})
+            await response(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            traffic.release(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: traffic.stats() for name, traffic in self.classes.items()}
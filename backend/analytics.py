@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Price and savings aggregates over the catalog, computed with NumPy group-bys at load time"""
+
+import logging
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ingest import PRICE_COLUMNS, parse_prices
+
+logger = logging.getLogger(__name__)
+
+# Grouping name -> metadata column
+GROUP_COLUMNS = {
+    "category": "Category",
+    "animal_material": "Animal Materials Used",
+    "vegan_material": "Material",
+}
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _prices(chunks: List[Dict[str, Any]], display: str) -> np.ndarray:
+    """Numeric prices for every chunk; NaN where a price is missing or unparseable"""
+    numeric = PRICE_COLUMNS[display]
+    values = [chunk["metadata"].get(numeric) for chunk in chunks]
+    if chunks and all(v is not None for v in values):
+        return np.array(values, dtype=np.float64)
+    # Chunks pickled before prices were parsed at load time only carry the display strings
+    return parse_prices(pd.Series([chunk["metadata"].get(display) for chunk in chunks], dtype=object)).to_numpy()
+
+
+def _labels(chunks: List[Dict[str, Any]], column: str) -> np.ndarray:
+    return np.array([str(chunk["metadata"].get(column)) for chunk in chunks], dtype=object)
+
+
+def value_order(values: np.ndarray) -> np.ndarray:
+    """Positions of the non-NaN values, ascending; shared by every grouping of the same values"""
+    order = np.argsort(values, kind="stable")
+    return order[:len(order) - int(np.isnan(values).sum())]
+
+
+def grouped_stats(codes: np.ndarray, values: np.ndarray, groups: int,
+                  order: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    count, mean, median, p90 and total of `values` per group code, ignoring NaN
+
+    Values are sorted once (`order`, from value_order), then stably by
+    group code, a linear-time radix sort for small codes, so each group's
+    slice is ascending. Quantiles are read by position from the slice,
+    with the same linear interpolation as np.percentile.
+    """
+    if order is None:
+        order = value_order(values)
+    codes, values = codes[order], values[order]
+    count = np.bincount(codes, minlength=groups)
+    total = np.bincount(codes, weights=values, minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    small = codes.astype(np.int16 if groups < 2 ** 15 else np.int32)
+    ordered = values[np.argsort(small, kind="stable")]
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+    stats = {"count": count, "mean": mean, "total": total}
+    for name, q in (("median", 0.5), ("p90", 0.9)):
+        position = q * np.maximum(count - 1, 0)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        result = np.full(groups, np.nan)
+        has = count > 0
+        lo = ordered[starts[has] + below[has]]
+        hi = ordered[starts[has] + above[has]]
+        result[has] = lo + (hi - lo) * (position[has] - below[has])
+        stats[name] = result
+    return stats
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _group_rows(labels: np.ndarray, estimated: np.ndarray, vegan: np.ndarray,
+                orders: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict[str, Any]]:
+    """Aggregates for every label present, keyed by label"""
+    orders = orders or {}
+    codes, uniques = pd.factorize(labels)
+    groups = len(uniques)
+    count = np.bincount(codes, minlength=groups)
+    est = grouped_stats(codes, estimated, groups, orders.get("estimated"))
+    veg = grouped_stats(codes, vegan, groups, orders.get("vegan"))
+    # Savings only where both prices are known
+    sav = grouped_stats(codes, estimated - vegan, groups, orders.get("savings"))
+    rows = {}
+    for g, label in enumerate(uniques):
+        rows[label] = {
+            "group": label,
+            "count": int(count[g]),
+            "priced": int(sav["count"][g]),
+            "estimated_price": {k: _round(est[k][g]) for k in ("mean", "median", "p90")},
+            "vegan_price": {k: _round(veg[k][g]) for k in ("mean", "median", "p90")},
+            "savings": {k: _round(sav[k][g]) for k in ("mean", "median", "p90", "total")},
+        }
+    return rows
+
+
+class CatalogAnalytics:
+    """
+    Price and savings aggregates for one catalog version
+
+    Built once per catalog from numeric price arrays; requests read the
+    precomputed summary. A catalog change recomputes only the groups
+    whose products were added, removed or edited.
+    """
+
+    def __init__(self, labels: Dict[str, np.ndarray], estimated: np.ndarray, vegan: np.ndarray,
+                 groups: Dict[str, Dict[str, Dict[str, Any]]], orders: Dict[str, np.ndarray]):
+        self.labels = labels
+        self.estimated = estimated
+        self.vegan = vegan
+        self.groups = groups
+        self.summary = self._summarize(orders)
+        # Category -> (vegan prices ascending, chunk ids), for price-capped lookups
+        self.by_category = self._category_prices(orders["vegan"])
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]], previous: Optional["CatalogAnalytics"] = None,
+                    old_ids: Optional[np.ndarray] = None) -> "CatalogAnalytics":
+        """
+        Aggregates for `chunks`, reusing `previous` for groups the change did not touch
+
+        `old_ids[i]` is chunk i's position in the previous catalog, or -1 if
+        it is new or changed; a chunk whose text is unchanged has the same
+        prices and groups, so only groups holding new or removed chunks are
+        recomputed.
+        """
+        estimated = _prices(chunks, "Estimated Price")
+        vegan = _prices(chunks, "Price")
+        labels = {name: _labels(chunks, column) for name, column in GROUP_COLUMNS.items()}
+        orders = {"estimated": value_order(estimated), "vegan": value_order(vegan),
+                  "savings": value_order(estimated - vegan)}
+        groups = {}
+        for name, column_labels in labels.items():
+            if previous is None or old_ids is None:
+                groups[name] = _group_rows(column_labels, estimated, vegan, orders)
+                continue
+            removed = np.ones(len(previous.estimated), dtype=bool)
+            removed[old_ids[old_ids >= 0]] = False
+            touched = set(column_labels[old_ids < 0]) | set(previous.labels[name][removed])
+            rows = {label: row for label, row in previous.groups[name].items() if label not in touched}
+            if touched:
+                # The sorted orders restricted to touched groups stay sorted, so nothing is re-sorted
+                mask = np.isin(column_labels, list(touched))
+                touched_orders = {key: order[mask[order]] for key, order in orders.items()}
+                recomputed = _group_rows(column_labels, estimated, vegan, touched_orders)
+                rows.update((label, row) for label, row in recomputed.items() if label in touched)
+            groups[name] = rows
+        analytics = cls(labels, estimated, vegan, groups, orders)
+        touched_note = "" if previous is None else " (changed groups only)"
+        logger.info(f"✅ Computed price analytics for {len(chunks)} products{touched_note}")
+        return analytics
+
+    def _summarize(self, orders: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        estimated, vegan = self.estimated, self.vegan
+        everything = np.full(len(estimated), "all", dtype=object)
+        overall = _group_rows(everything, estimated, vegan, orders).get("all", {})
+        overall.pop("group", None)
+
+        def percentiles(values: np.ndarray, order: np.ndarray) -> Dict[str, Optional[float]]:
+            if not len(order):
+                return {f"p{p}": None for p in PERCENTILES}
+            # Already sorted, so np.percentile's partition is cheap
+            return {f"p{p}": _round(v) for p, v in zip(PERCENTILES, np.percentile(values[order], PERCENTILES))}
+
+        return {
+            "products": len(estimated),
+            "overall": overall,
+            "percentiles": {
+                "estimated_price": percentiles(estimated, orders["estimated"]),
+                "vegan_price": percentiles(vegan, orders["vegan"]),
+                "savings": percentiles(estimated - vegan, orders["savings"]),
+            },
+            "by": {
+                name: sorted(rows.values(), key=lambda row: (-row["priced"], str(row["group"])))
+                for name, rows in self.groups.items()
+            },
+        }
+
+    def _category_prices(self, order: np.ndarray) -> Dict[Any, tuple]:
+        categories = self.labels["category"][order]
+        codes, uniques = pd.factorize(categories)
+        # Stable by category, so each category's slice stays sorted by price
+        grouped = order[np.argsort(codes, kind="stable")]
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+        return {
+            label: (self.vegan[ids], ids)
+            for label, ids in zip(uniques, np.split(grouped, bounds[:-1]))
+        }
+
+    def priced_under(self, categories: Iterable[Any], cap: float, limit: int,
+                     exclude: Collection[int] = ()) -> List[int]:
+        """
+        Up to `limit` chunk ids in `categories` with a vegan price at or under `cap`
+
+        Closest to the cap first, i.e. the next price tier down. A binary
+        search per category, so the cost does not grow with the catalog.
+        """
+        found = []
+        for category in categories:
+            if str(category) not in self.by_category:
+                continue
+            prices, ids = self.by_category[str(category)]
+            end = int(np.searchsorted(prices, cap, side="right"))
+            taken = 0
+            for j in range(end - 1, -1, -1):
+                if taken == limit:
+                    break
+                i = int(ids[j])
+                if i not in exclude:
+                    found.append((prices[j], i))
+                    taken += 1
+        found.sort(key=lambda item: -item[0])
+        return [i for _, i in found[:limit]]
+
+    @property
+    def nbytes(self) -> int:
+        return (self.estimated.nbytes + self.vegan.nbytes + sum(a.nbytes for a in self.labels.values())
+                + sum(ids.nbytes * 2 for _, ids in self.by_category.values()))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Deterministic markdown answers built straight from catalog rows"""
+
+from typing import Any, Dict, List
+
+NO_CONTEXT_ANSWER = "I couldn't find relevant information to answer your question. Please try rephrasing or ask about specific products or materials."
+BUSY_ANSWER = "Sorry, that took longer than expected. Please try again in a moment."
+
+
+def product_line(metadata: Dict[str, Any]) -> str:
+    """One markdown bullet describing a product and its vegan alternative"""
+    return (
+        f"- **{metadata['Product Name']}** ({metadata['Category']}, {metadata['Estimated Price']}) "
+        f"uses {str(metadata['Animal Materials Used']).lower()}. "
+        f"Vegan alternative: **{metadata['Vegan Alternative']}** in {metadata['Material']} "
+        f"for {metadata['Price']}."
+    )
+
+
+def retrieval_only_answer(query: str, chunks: List[Dict[str, Any]]) -> str:
+    """Answer built from retrieved chunks only, used when Gemini is unavailable"""
+    if not chunks:
+        return NO_CONTEXT_ANSWER
+    lines = [product_line(c['metadata']) for c in chunks]
+    return (
+        "Our assistant is busy right now, so here are the closest matches from the catalog:\n\n"
+        + "\n".join(lines)
+    )
+
+
+def price_answer(rows: List[Dict[str, Any]], total: int) -> str:
+    """Prices of matching products alongside their vegan alternatives"""
+    lines = [
+        f"- **{m['Product Name']}**: {m['Estimated Price']} "
+        f"(vegan alternative **{m['Vegan Alternative']}**: {m['Price']})"
+        for m in rows
+    ]
+    header = "Here is the price I found:" if total == 1 else f"I found {total} matching products:"
+    if total > len(rows):
+        header += f" (showing {len(rows)})"
+    return header + "\n\n" + "\n".join(lines)
+
+
+def alternatives_answer(subject: str, rows: List[Dict[str, Any]]) -> str:
+    """Vegan alternatives for products matching `subject`, without repeats"""
+    seen = set()
+    lines = []
+    for m in rows:
+        if m['Vegan Alternative'] in seen:
+            continue
+        seen.add(m['Vegan Alternative'])
+        lines.append(
+            f"- **{m['Vegan Alternative']}** in {m['Material']} for {m['Price']}, "
+            f"instead of {m['Product Name']} ({m['Estimated Price']}, {str(m['Animal Materials Used']).lower()})"
+        )
+    return f"Vegan alternatives to {subject}:\n\n" + "\n".join(lines)
+
+
+def listing_answer(category: str, max_price: float, rows: List[Dict[str, Any]]) -> str:
+    """Vegan products in a category at or under a price, cheapest first"""
+    if not rows:
+        return f"I couldn't find vegan {category.lower()} at or under ${max_price:,.0f}. Try a higher budget."
+    seen = set()
+    lines = []
+    for m in rows:
+        if m['Vegan Alternative'] in seen:
+            continue
+        seen.add(m['Vegan Alternative'])
+        lines.append(f"- **{m['Vegan Alternative']}** in {m['Material']}: {m['Price']}")
+    return f"Vegan {category.lower()} at or under ${max_price:,.0f}:\n\n" + "\n".join(lines)
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""Typeahead over catalog brands, product names, categories and materials"""
+
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_MAX_RESULTS = int(os.getenv("AUTOCOMPLETE_MAX_RESULTS", "10"))
+
+# Suggestion kind -> metadata column it comes from; brands come from BRAND_COLUMN or are inferred from names
+SUGGESTION_COLUMNS = {
+    "category": "Category",
+    "animal_material": "Animal Materials Used",
+    "vegan_material": "Material",
+    "product": "Product Name",
+    "vegan_alternative": "Vegan Alternative",
+}
+# A catalog may name brands itself; otherwise they are inferred from product names
+BRAND_COLUMN = "Brand"
+BRAND_MAX_WORDS = 3
+BRAND_MIN_PRODUCTS = 3
+
+# Prefix keys are truncated to this many UTF-8 bytes; longer queries are checked against the full text
+KEY_BYTES = 24
+# Keys per block of the top-k table; ranges shorter than two blocks are scanned directly
+BLOCK = 256
+# Candidates kept per table cell; one entry can own several keys in a range
+TOP_K = 2 * AUTOCOMPLETE_MAX_RESULTS
+# Keys checked one by one for long or multi-word queries
+SCAN_LIMIT = 4096
+
+TRIGRAM_CANDIDATES = 64
+MAX_CORRECTIONS = 3
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation: "Hermès" -> "hermes", "Bio-Based" -> "bio based" """
+    text = str(text).lower()
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    text = text.replace("'", "")
+    if not text.replace(" ", "").isalnum():
+        text = re.sub(r"[\W_]+", " ", text)
+    return " ".join(text.split())
+
+
+def _trigrams(word: str) -> List[str]:
+    # Only the front is padded: query words are often unfinished
+    padded = "  " + word
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance counting an adjacent transposition as one edit"""
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _prefix_distance(partial: str, word: str, limit: int) -> int:
+    """Edit distance from `partial` to the closest prefix of `word`"""
+    lengths = range(max(1, len(partial) - limit), min(len(word), len(partial) + limit) + 1)
+    return min((_edit_distance(partial, word[:n]) for n in lengths), default=limit + 1)
+
+
+def _first_unique(owners: Iterable[int], limit: int) -> List[int]:
+    found: List[int] = []
+    for owner in owners:
+        owner = int(owner)
+        if owner not in found:
+            found.append(owner)
+            if len(found) == limit:
+                break
+    return found
+
+
+def allowed_typos(word: str) -> int:
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def infer_brands(names: Mapping[str, int], max_words: int = BRAND_MAX_WORDS,
+                 min_products: int = BRAND_MIN_PRODUCTS) -> Counter:
+    """
+    Brands as the leading words that product names share before they diverge
+
+    Names are grouped by first word; the brand grows word by word while
+    every name in the group continues the same way. "Louis Vuitton Classic
+    Tote" and "Louis Vuitton Heritage Boots" give "Louis Vuitton". `names`
+    maps name -> number of products; returns brand -> number of products.
+    """
+    groups: Dict[str, List[Tuple[List[str], int]]] = {}
+    for name, count in names.items():
+        # Words past max_words never matter, only whether there are more
+        words = name.split(maxsplit=max_words)
+        if words:
+            groups.setdefault(words[0], []).append((words, count))
+    brands: Counter = Counter()
+    for members in groups.values():
+        if len(members) < min_products:
+            continue
+        n = 1
+        while n < max_words:
+            # A brand is never a whole name, so every member needs a word after it
+            following = {words[n] if len(words) > n + 1 else None for words, _ in members}
+            if len(following) != 1 or None in following:
+                break
+            n += 1
+        brands[" ".join(members[0][0][:n])] += sum(count for _, count in members)
+    return brands
+
+
+class AutocompleteIndex:
+    """
+    Prefix suggestions ranked by popularity, with typo-tolerant fallback
+
+    Every suggestion (a brand, category, material, product or vegan
+    alternative) is indexed under each of its word starts, so "overc"
+    finds "Gucci Classic Overcoat Outerwear"; several words also match
+    in any order ("gucci coat"). The keys sit in one sorted byte array:
+    a prefix is a contiguous range found with two binary searches.
+    Popularity is the number of products carrying the value.
+    A sparse table holds the top-ranked keys of every power-of-two run of
+    blocks, so even a one-letter prefix over millions of keys is answered
+    from two table cells and two partial blocks. When a prefix finds too
+    little, query words are corrected against the catalog vocabulary
+    using a trigram index and edit distance.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str, int]]):
+        self.texts = [text for text, _, _ in entries]
+        self.kinds = [kind for _, kind, _ in entries]
+        self.popularity = np.array([count for _, _, count in entries], dtype=np.int64)
+        self.normalized = [normalize(text) for text in self.texts]
+        self._build_prefix_index()
+        self._build_vocabulary()
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> "AutocompleteIndex":
+        def column_counts(column: str) -> Counter:
+            values = Counter(chunk["metadata"].get(column) for chunk in chunks)
+            counts: Counter = Counter()
+            for value, count in values.items():
+                if isinstance(value, str) and value.strip():
+                    counts[value.strip()] += count
+            return counts
+
+        counts = {kind: column_counts(column) for kind, column in SUGGESTION_COLUMNS.items()}
+        counts["brand"] = column_counts(BRAND_COLUMN)
+        if not counts["brand"]:
+            for kind in ("product", "vegan_alternative"):
+                counts["brand"].update(infer_brands(counts[kind]))
+        entries = [(text, kind, count) for kind, values in counts.items() for text, count in values.items()]
+        index = cls(entries)
+        logger.info(f"✅ Built autocomplete index: {len(entries)} suggestions, {len(index.keys)} prefix keys")
+        return index
+
+    # ------------------------------
+    # Prefix index
+    # ------------------------------
+    def _build_prefix_index(self) -> None:
+        keys: List[bytes] = []
+        counts: List[int] = []
+        for text in self.normalized:
+            encoded = text.encode("utf-8")
+            before = len(keys)
+            start = 0
+            while start >= 0:
+                # Bare numbers ("No. 12" edition suffixes) are not worth a key
+                if not encoded[start:start + 1].isdigit():
+                    keys.append(encoded[start:start + KEY_BYTES])
+                start = encoded.find(b" ", start)
+                start = start + 1 if start >= 0 else -1
+            counts.append(len(keys) - before)
+        keys_array = np.array(keys, dtype=f"S{KEY_BYTES}")
+        del keys
+        owners = np.repeat(np.arange(len(self.normalized), dtype=np.int32), counts)
+        order = np.argsort(keys_array, kind="stable")
+        self.keys = keys_array[order]
+        self.owners = owners[order]
+        # Keys rank by owner popularity, then alphabetically (by position)
+        self._stride = len(self.keys) + 1
+        self._build_table()
+
+    def _scores(self, positions: np.ndarray) -> np.ndarray:
+        """Ranking of key positions: lower is better"""
+        return -self.popularity[self.owners[positions]] * self._stride + positions
+
+    def _build_table(self) -> None:
+        """table[j][b] = the TOP_K best key positions in blocks b .. b + 2**j - 1, best first"""
+        blocks = len(self.keys) // BLOCK
+        self.table: List[np.ndarray] = []
+        if blocks == 0:
+            return
+        positions = np.arange(blocks * BLOCK, dtype=np.int64).reshape(blocks, BLOCK)
+        level = self._best_of(positions)
+        self.table.append(level)
+        span = 1
+        while 2 * span <= blocks:
+            level = self._best_of(np.concatenate([level[:-span], level[span:]], axis=1))
+            self.table.append(level)
+            span *= 2
+
+    def _best_of(self, positions: np.ndarray) -> np.ndarray:
+        order = np.argsort(self._scores(positions), axis=1)[:, :TOP_K]
+        return np.take_along_axis(positions, order, axis=1).astype(np.int32)
+
+    def _best_positions(self, lo: int, hi: int) -> np.ndarray:
+        """The TOP_K best key positions in lo .. hi - 1, best first"""
+        first = -(-lo // BLOCK)
+        last = hi // BLOCK
+        if last - first < 1:
+            candidates = np.arange(lo, hi)
+        else:
+            level = (last - first).bit_length() - 1
+            table = self.table[level]
+            # The two table cells may overlap, hence unique
+            candidates = np.unique(np.concatenate([
+                np.arange(lo, first * BLOCK),
+                table[first],
+                table[last - (1 << level)],
+                np.arange(last * BLOCK, hi),
+            ]))
+        return candidates[np.argsort(self._scores(candidates), kind="stable")[:TOP_K]]
+
+    def _prefix_range(self, prefix: bytes) -> Tuple[int, int]:
+        lo = int(np.searchsorted(self.keys, prefix, side="left"))
+        hi = int(np.searchsorted(self.keys, prefix + b"\xff", side="left"))
+        return lo, hi
+
+    def _scan(self, lo: int, hi: int) -> np.ndarray:
+        """Owners of up to SCAN_LIMIT keys from lo, best first"""
+        positions = np.arange(lo, min(hi, lo + SCAN_LIMIT))
+        return self.owners[positions[np.argsort(self._scores(positions), kind="stable")]]
+
+    def _has_words(self, entry: int, words: List[str]) -> bool:
+        text = " " + self.normalized[entry]
+        return all(" " + word in text for word in words)
+
+    def _search(self, query: str, limit: int) -> List[int]:
+        """Entries with a word starting with `query` (already normalized), best first"""
+        encoded = query.encode("utf-8")
+        if len(encoded) < KEY_BYTES:
+            owners = self.owners[self._best_positions(*self._prefix_range(encoded))]
+        else:
+            # Keys are truncated, so confirm against the full text; long prefixes match few keys
+            owners = [o for o in self._scan(*self._prefix_range(encoded[:KEY_BYTES - 1]))
+                      if self._has_words(o, [query])]
+        return _first_unique(owners, limit)
+
+    def _search_words(self, words: List[str], limit: int) -> List[int]:
+        """Entries with a word starting with each of `words`, in any order, best first"""
+        ranges = [self._prefix_range(w.encode("utf-8")[:KEY_BYTES - 1]) for w in words]
+        owners = self._scan(*min(ranges, key=lambda r: r[1] - r[0]))
+        return _first_unique((o for o in owners if self._has_words(o, words)), limit)
+
+    def _lookup(self, query: str, limit: int) -> List[int]:
+        """Phrase prefix matches, then for several words, matches of every word in any order"""
+        found = self._search(query, limit)
+        words = query.split()
+        if len(found) < limit and len(words) > 1:
+            found += [e for e in self._search_words(words, limit) if e not in found][:limit - len(found)]
+        return found
+
+    # ------------------------------
+    # Typo tolerance
+    # ------------------------------
+    def _build_vocabulary(self) -> None:
+        frequency: Counter = Counter()
+        for text, count in zip(self.normalized, self.popularity.tolist()):
+            for word in set(text.split()):
+                frequency[word] += count
+        self.words = list(frequency)
+        self.word_frequency = np.array([frequency[w] for w in self.words], dtype=np.int64)
+        self._word_set = set(self.words)
+        postings: Dict[str, List[int]] = {}
+        for i, word in enumerate(self.words):
+            for gram in set(_trigrams(word)):
+                postings.setdefault(gram, []).append(i)
+        self.trigrams = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    def _corrections(self, word: str, partial: bool) -> List[Tuple[int, str]]:
+        """
+        Vocabulary words within the typo allowance of `word`, as (distance, word)
+
+        Closest first; at equal distance, words with the same first letter
+        come before others (typos rarely hit it), then the most popular.
+        """
+        limit = allowed_typos(word)
+        if partial:
+            exact = self._search(word, 1)
+            if exact or limit == 0:
+                return [(0, word)]
+        elif word in self._word_set or limit == 0:
+            return [(0, word)]
+        grams = [self.trigrams[g] for g in set(_trigrams(word)) if g in self.trigrams]
+        if not grams:
+            return []
+        shared = np.bincount(np.concatenate(grams), minlength=len(self.words))
+        candidates = np.argsort(-shared, kind="stable")[:TRIGRAM_CANDIDATES]
+        found = []
+        for i in candidates:
+            if shared[i] == 0:
+                break
+            candidate = self.words[i]
+            distance = (_prefix_distance(word, candidate, limit) if partial
+                        else _edit_distance(word, candidate))
+            if distance <= limit:
+                found.append((distance, candidate[0] != word[0], -int(self.word_frequency[i]), candidate))
+        found.sort()
+        return [(distance, candidate) for distance, _, _, candidate in found[:MAX_CORRECTIONS]]
+
+    def _corrected_queries(self, query: str) -> List[str]:
+        """Spellings of `query` closest to catalog words; the last word may be unfinished"""
+        words = query.split()
+        options = [self._corrections(w, partial=(i == len(words) - 1)) for i, w in enumerate(words)]
+        if not all(options):
+            return []
+        queries = [(0, [])]
+        for word_options in options:
+            queries = sorted(
+                ((total + distance, [*words_so_far, word]) for total, words_so_far in queries
+                 for distance, word in word_options),
+                key=lambda q: q[0],
+            )[:MAX_CORRECTIONS]
+        return [" ".join(words) for total, words in queries if total > 0]
+
+    # ------------------------------
+    # Lookup
+    # ------------------------------
+    def complete(self, query: str, limit: int = AUTOCOMPLETE_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Suggestions for what the user has typed so far
+
+        Exact prefix matches come first; if there are fewer than `limit`,
+        matches for corrected spellings follow, marked with `corrected`.
+        These take turns across corrections, best correction first, so one
+        popular correction cannot crowd out the others.
+        """
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_RESULTS))
+        query = normalize(query)
+        if not query or not len(self.keys):
+            return []
+        results = [(entry, None) for entry in self._lookup(query, limit)]
+        if len(results) < limit:
+            seen = {entry for entry, _ in results}
+            lookups = [(corrected, self._lookup(corrected, limit)) for corrected in self._corrected_queries(query)]
+            for rank in range(limit):
+                for corrected, entries in lookups:
+                    if rank < len(entries) and entries[rank] not in seen and len(results) < limit:
+                        seen.add(entries[rank])
+                        results.append((entries[rank], corrected))
+        return [
+            {
+                "text": self.texts[entry],
+                "kind": self.kinds[entry],
+                "popularity": int(self.popularity[entry]),
+                **({"corrected": corrected} if corrected else {}),
+            }
+            for entry, corrected in results
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the numpy parts of the index"""
+        arrays = [self.keys, self.owners, self.popularity, *self.table, *self.trigrams.values()]
+        return sum(a.nbytes for a in arrays)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Deterministic local stand-ins for Gemini, used by the benchmark and load-test scripts"""
+
+import asyncio
+import hashlib
+import time
+from typing import Any, Optional
+
+import google.generativeai as genai
+
+
+class StubResponse:
+    """Mimics the `.text` attribute of a Gemini response"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """
+    Offline replacement for `genai.GenerativeModel`
+
+    Answers are derived from a hash of the prompt so repeated runs produce the
+    same output. Every call sleeps for `latency` seconds to stand in for the
+    network round trip and generation time.
+    """
+
+    latency = 0.0
+    calls = 0
+
+    def __init__(self, model_name: str = "stub", **kwargs: Any):
+        self.model_name = model_name
+
+    @staticmethod
+    def _answer(prompt: str) -> StubResponse:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+        return StubResponse(
+            f"Here are some cruelty-free options worth a look (stub answer {digest}).\n\n"
+            f"- The prompt had {len(prompt)} characters.\n"
+            f"- Choosing vegan keeps animals out of the supply chain."
+        )
+
+    def generate_content(self, prompt: str, request_options: Optional[dict] = None, **kwargs: Any) -> StubResponse:
+        StubGenerativeModel.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt: str, request_options: Optional[dict] = None,
+                                     **kwargs: Any) -> StubResponse:
+        StubGenerativeModel.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+def install_stub_gemini(latency: float = 0.0) -> None:
+    """Route every `genai.GenerativeModel` created from now on to the stub"""
+    StubGenerativeModel.latency = latency
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = StubGenerativeModel
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark suite for the RAG pipeline
+
+Gemini is replaced by a deterministic stub with configurable latency, so
+no API key or network is needed. Results are written as JSON so runs from
+different releases can be compared.
+
+Usage:
+    python benchmark_rag.py --sizes 350,5000,50000 --gemini-latency 0.2 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_stubs import install_stub_gemini
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BACKEND_DIR, "luxury_animal_products_vegan_alternatives.csv")
+
+QUERIES = [
+    "What are vegan alternatives to leather handbags?",
+    "Tell me about products that use ostrich leather",
+    "What's the price of Gucci Classic Overcoat?",
+    "list footwear under $200",
+    "How are animals harmed in the wool industry?",
+    "Why should I choose a vegan parka over a down jacket?",
+    "Compare cork leather and mycelium leather wallets",
+    "Which luxury scarves are made with silk or cashmere?",
+]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Latency summary in milliseconds"""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[len(ms) // 2],
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "max_ms": ms[-1],
+    }
+
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def synthetic_frame(n: int):
+    """Catalog dataframe with `n` synthetic rows from the data generator"""
+    import pandas as pd
+    from generate_vegan_alternatives import HEADER, generate_rows
+    from ingest import prepare_catalog
+    return prepare_catalog(pd.DataFrame(generate_rows(n), columns=HEADER))
+
+
+def bench_cold_start() -> Tuple[Any, Dict[str, Any]]:
+    """Time building the chatbot from the CSV, in a scratch directory so artifacts stay untouched"""
+    start = time.perf_counter()
+    from cruelty_free_chatbot import CrueltyFreeChatbot
+    import_seconds = time.perf_counter() - start
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            start = time.perf_counter()
+            chatbot = CrueltyFreeChatbot(CSV_PATH, "stub-key")
+            setup_seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    first = time.perf_counter()
+    chatbot.answer_query(QUERIES[0])
+    first_query_seconds = time.perf_counter() - first
+    return chatbot, {
+        "import_s": import_seconds,
+        "setup_s": setup_seconds,
+        "first_query_ms": first_query_seconds * 1000,
+    }
+
+
+def bench_catalog_size(n: int, embed_model, max_embed: int, queries: List[str], repeat: int) -> Dict[str, Any]:
+    """Chunk building, bulk embedding and FAISS search for a synthetic catalog of `n` rows"""
+    import faiss
+    import numpy as np
+    from cruelty_free_chatbot import build_chunks
+
+    result: Dict[str, Any] = {"rows": n}
+    df = synthetic_frame(n)
+
+    start = time.perf_counter()
+    chunks = build_chunks(df)
+    result["build_chunks_s"] = time.perf_counter() - start
+
+    # Embedding a very large catalog on CPU takes minutes, so beyond `max_embed`
+    # rows the embedded sample is tiled with small noise to fill the index.
+    texts = [c['text'] for c in chunks[:max_embed]]
+    start = time.perf_counter()
+    embeddings = embed_model.encode(texts, batch_size=64).astype("float32")
+    elapsed = time.perf_counter() - start
+    result["bulk_embed"] = {"rows": len(texts), "s": elapsed, "rows_per_s": len(texts) / elapsed}
+    if n > len(embeddings):
+        reps = -(-n // len(embeddings))
+        rng = np.random.default_rng(0)
+        embeddings = np.tile(embeddings, (reps, 1))[:n]
+        embeddings += rng.normal(0, 0.01, embeddings.shape).astype("float32")
+
+    start = time.perf_counter()
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    result["index_build_s"] = time.perf_counter() - start
+
+    query_vecs = embed_model.encode(queries).astype("float32")
+    samples = []
+    for _ in range(repeat):
+        for vec in query_vecs:
+            start = time.perf_counter()
+            index.search(vec[None, :], 5)
+            samples.append(time.perf_counter() - start)
+    result["faiss_search_single"] = summarize(samples)
+    result["faiss_search_batch"] = summarize(time_calls(lambda: index.search(query_vecs, 5), repeat))
+    return result
+
+
+def bench_cascade(chatbot, candidates: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Stage-1 (embed, wide search, lexical filter) and stage-2 (re-rank) latency for each candidate count N"""
+    from cruelty_free_chatbot import retrieve_chunk_ids
+    from rerank import Reranker
+
+    if chatbot.reranker is None or chatbot.reranker.model is None:
+        return []
+    results = []
+    for n in candidates:
+        # No budget, so every pass is measured in full
+        reranker = Reranker(candidates=n, budget_ms=float("inf"), model=chatbot.reranker.model)
+        for _ in range(repeat):
+            for q in QUERIES:
+                retrieve_chunk_ids(q, chatbot.embed_model, chatbot.index, chunks=chatbot.chunks, reranker=reranker)
+        stats = reranker.stats.snapshot()
+        results.append({"candidates": n, "mean_candidates": stats["mean_candidates"],
+                        "stage1_ms": stats["mean_latency_ms"]["stage1"],
+                        "stage2_ms": stats["mean_latency_ms"]["stage2"]})
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    install_stub_gemini(latency=args.gemini_latency)
+    chatbot, cold = bench_cold_start()
+    from cruelty_free_chatbot import build_prompt, retrieve_chunks
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "gemini_latency_s": args.gemini_latency,
+            "repeat": args.repeat,
+        },
+        "cold_start": cold,
+    }
+
+    report["query_encode"] = summarize([
+        s for q in QUERIES for s in time_calls(lambda: chatbot.embed_model.encode([q]), args.repeat)
+    ])
+
+    retrieved = {q: retrieve_chunks(q, chatbot.embed_model, chatbot.index, chatbot.chunks) for q in QUERIES}
+    report["prompt_assembly"] = summarize([
+        s for q in QUERIES
+        for s in time_calls(lambda: chatbot.prompt_builder.build(q, retrieved[q], build_prompt), args.repeat)
+    ])
+    report["prompt_tokens"] = {
+        q: chatbot.prompt_builder.count_tokens(chatbot.prompt_builder.build(q, retrieved[q], build_prompt))
+        for q in QUERIES
+    }
+
+    report["answer_query"] = summarize([
+        s for q in QUERIES for s in time_calls(lambda: chatbot.answer_query(q), args.repeat)
+    ])
+    report["routing"] = chatbot.router.stats.snapshot()
+    report["retrieval_cascade"] = bench_cascade(chatbot, args.rerank_candidates, args.repeat)
+
+    report["catalog_sizes"] = [
+        bench_catalog_size(n, chatbot.embed_model, args.max_embed, QUERIES, args.repeat)
+        for n in args.sizes
+    ]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[350, 5000, 50000],
+                        help="Synthetic catalog sizes for chunking and FAISS search")
+    parser.add_argument("--max-embed", type=int, default=5000,
+                        help="Rows actually embedded per size; larger indexes reuse these vectors")
+    parser.add_argument("--rerank-candidates", type=lambda s: [int(x) for x in s.split(",")],
+                        default=[10, 25, 50, 100], help="Stage-1 candidate counts (N) to time the re-ranker with")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="Stub Gemini latency in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
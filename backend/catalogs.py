@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Registry of product catalogs served from one process, loaded lazily and evicted under a memory budget"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sentence_transformers import SentenceTransformer
+
+from cruelty_free_chatbot import EMBEDDING_MODEL, Catalog, CrueltyFreeChatbot, setup_gemini
+from prompt_builder import PromptBuilder
+from rerank import Reranker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG = "default"
+DEFAULT_CSV = "luxury_animal_products_vegan_alternatives.csv"
+# Semicolon-separated "name=path/to/products.csv"; the first entry is the default unless one is named "default"
+CATALOGS = os.getenv("CATALOGS", f"{DEFAULT_CATALOG}={DEFAULT_CSV}")
+# Total estimated size of loaded catalogs before the least recently used are evicted
+CATALOG_MEMORY_BUDGET_MB = float(os.getenv("CATALOG_MEMORY_BUDGET_MB", "1024"))
+# Where catalogs other than the default keep their FAISS index and metadata
+CATALOG_ARTIFACT_DIR = os.getenv("CATALOG_ARTIFACT_DIR", "catalog_artifacts")
+
+CATALOG_NAME_PATTERN = re.compile(r"^[\w-]{1,64}$")
+
+
+class UnknownCatalogError(KeyError):
+    pass
+
+
+def parse_catalogs(text: str) -> Dict[str, str]:
+    """Parse "name=path;name=path" into an ordered mapping"""
+    catalogs: Dict[str, str] = {}
+    for entry in text.split(";"):
+        name, sep, path = entry.partition("=")
+        name, path = name.strip(), path.strip()
+        if not sep or not name or not path:
+            continue
+        if not CATALOG_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid catalog name: {name!r}")
+        catalogs[name] = path
+    return catalogs
+
+
+def estimate_catalog_bytes(catalog: Catalog) -> int:
+    """Approximate memory held by a catalog: FAISS vectors, derived indexes, chunk texts and metadata"""
+    index = catalog.index
+    total = index.ntotal * index.d * 4
+    if catalog.graph is not None:
+        total += catalog.graph.ids.nbytes + catalog.graph.distances.nbytes
+    if catalog.autocomplete is not None:
+        total += catalog.autocomplete.nbytes
+    if catalog.analytics is not None:
+        total += catalog.analytics.nbytes
+    for chunk in catalog.chunks:
+        metadata = chunk["metadata"]
+        total += sys.getsizeof(chunk["text"]) + sys.getsizeof(metadata)
+        total += sum(sys.getsizeof(value) for value in metadata.values())
+    return total
+
+
+class CatalogRegistry:
+    """
+    Named catalogs, each with its own FAISS index, metadata and chatbot
+
+    A catalog is loaded on first use (from its saved artifacts when they
+    are newer than the CSV, else by embedding the CSV) and kept until the
+    loaded catalogs exceed `memory_budget_mb`, when the least recently
+    used are dropped. The embedding model, Gemini client and prompt
+    builder are shared by every catalog.
+    """
+
+    def __init__(self, sources: Dict[str, str], gemini_api_key: str,
+                 memory_budget_mb: float = CATALOG_MEMORY_BUDGET_MB,
+                 artifact_dir: str = CATALOG_ARTIFACT_DIR):
+        if not sources:
+            raise ValueError("No catalogs configured")
+        self.sources = dict(sources)
+        self.default = DEFAULT_CATALOG if DEFAULT_CATALOG in sources else next(iter(sources))
+        self.gemini_api_key = gemini_api_key
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.artifact_dir = artifact_dir
+        self.evictions = 0
+        self._loaded: "OrderedDict[str, CrueltyFreeChatbot]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in sources}
+        # Shared across catalogs, created once by the first load
+        self._shared_lock = threading.Lock()
+        self._embed_model = None
+        self._gemini = None
+        self._prompt_builder = None
+        self._reranker = None
+
+    def resolve(self, name: Optional[str]) -> str:
+        name = name or self.default
+        if name not in self.sources:
+            raise UnknownCatalogError(name)
+        return name
+
+    def artifact_paths(self, name: str):
+        """Index and metadata paths; the default catalog keeps the historical file names"""
+        if name == self.default:
+            return "faiss_animal_products.index", "metadata.pkl"
+        return (os.path.join(self.artifact_dir, f"faiss_{name}.index"),
+                os.path.join(self.artifact_dir, f"metadata_{name}.pkl"))
+
+    def peek(self, name: Optional[str] = None, touch: bool = False) -> Optional[CrueltyFreeChatbot]:
+        """The chatbot for a catalog if it is loaded, without loading it; `touch` marks it recently used"""
+        name = self.resolve(name)
+        with self._lock:
+            chatbot = self._loaded.get(name)
+            if chatbot is not None and touch:
+                self._loaded.move_to_end(name)
+            return chatbot
+
+    def loaded(self) -> Dict[str, CrueltyFreeChatbot]:
+        with self._lock:
+            return dict(self._loaded)
+
+    def get(self, name: Optional[str] = None) -> CrueltyFreeChatbot:
+        """
+        The chatbot for a catalog, loading it on first use
+
+        Blocks while the catalog loads, so call it off the event loop.
+        Concurrent first requests for one catalog share a single load.
+        """
+        name = self.resolve(name)
+        chatbot = self.peek(name, touch=True)
+        if chatbot is not None:
+            return chatbot
+        with self._load_locks[name]:
+            with self._lock:
+                chatbot = self._loaded.get(name)
+                if chatbot is not None:
+                    self._loaded.move_to_end(name)
+                    return chatbot
+            chatbot = self._load(name)
+            with self._lock:
+                self._loaded[name] = chatbot
+            self.update_size(name)
+            return chatbot
+
+    def _load_shared(self) -> None:
+        """Create the embedding model, Gemini client, prompt builder and reranker once for every catalog"""
+        with self._shared_lock:
+            if self._embed_model is not None:
+                return
+            gemini = setup_gemini(self.gemini_api_key)
+            embed_model = SentenceTransformer(EMBEDDING_MODEL)
+            reranker = Reranker()
+            reranker.load()
+            self._gemini = gemini
+            self._prompt_builder = PromptBuilder(getattr(embed_model, "tokenizer", None))
+            self._reranker = reranker
+            # Set last: a non-None model means every shared component is ready
+            self._embed_model = embed_model
+
+    def _load(self, name: str) -> CrueltyFreeChatbot:
+        self._load_shared()
+        index_path, metadata_path = self.artifact_paths(name)
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger.info(f"📦 Loading catalog '{name}' from {self.sources[name]}")
+        chatbot = CrueltyFreeChatbot(
+            self.sources[name], self.gemini_api_key,
+            index_path=index_path, metadata_path=metadata_path,
+            embed_model=self._embed_model, gemini=self._gemini, prompt_builder=self._prompt_builder,
+            reranker=self._reranker,
+            prefer_artifacts=True,
+        )
+        return chatbot
+
+    def update_size(self, name: str) -> None:
+        """Re-measure a catalog, e.g. after a reload, and evict others if over budget"""
+        with self._lock:
+            chatbot = self._loaded.get(name)
+        if chatbot is None or chatbot.catalog is None:
+            return
+        size = estimate_catalog_bytes(chatbot.catalog)
+        with self._lock:
+            if name in self._loaded:
+                self._sizes[name] = size
+            self._evict(keep=name)
+
+    def _evict(self, keep: str) -> None:
+        # Requests already holding an evicted chatbot finish with it; it is freed afterwards
+        while sum(self._sizes.values()) > self.memory_budget and len(self._loaded) > 1:
+            victim = next(name for name in self._loaded if name != keep)
+            del self._loaded[victim]
+            self._sizes.pop(victim, None)
+            self.evictions += 1
+            logger.info(f"♻️ Evicted catalog '{victim}' to stay under the memory budget")
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            name = self.resolve(name)
+            if name not in self._loaded:
+                return False
+            del self._loaded[name]
+            self._sizes.pop(name, None)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "default": self.default,
+                "configured": list(self.sources),
+                "loaded": {
+                    name: {
+                        "version": chatbot.catalog_version,
+                        "products": len(chatbot.chunks),
+                        "estimated_mb": round(self._sizes.get(name, 0) / (1024 * 1024), 1),
+                    }
+                    for name, chatbot in self._loaded.items()
+                },
+                "estimated_mb": round(sum(self._sizes.values()) / (1024 * 1024), 1),
+                "budget_mb": round(self.memory_budget / (1024 * 1024), 1),
+                "evictions": self.evictions,
+            }
+
+    def names(self) -> List[str]:
+        return list(self.sources)
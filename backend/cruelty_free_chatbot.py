@@ -12,11 +12,38 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
 import pickle
+import hashlib
+import json
 import google.generativeai as genai
 import os
-from typing import List, Dict, Any, Optional
+import sys
+import asyncio
+import time
+import threading
+from typing import List, Dict, Any, Optional, Iterator, NamedTuple, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from contextlib import closing
 import logging
 
+try:
+    import resource
+except ImportError:  # Windows has no resource module; memory is then not reported
+    resource = None
+
+from gemini_client import GeminiClient, GeminiUnavailableError
+from answer_templates import BUSY_ANSWER, NO_CONTEXT_ANSWER, retrieval_only_answer
+from intent_router import IntentRouter
+from prompt_builder import PromptBuilder
+from sessions import add_turn, format_history, is_follow_up, narrow_follow_up
+from metrics import REQUESTS_CUT_SHORT, timed
+from deadlines import Deadline
+from ingest import build_records, price_value, read_catalog, render_texts
+from analytics import CatalogAnalytics
+from rerank import Reranker
+from autocomplete import AUTOCOMPLETE_MAX_RESULTS, AutocompleteIndex
+from similar import NeighborGraph, build_graph, load_graph, save_graph, similar_products, update_graph
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,7 +55,7 @@ def setup_gemini(api_key: str):
     """Configure Gemini API with the provided key"""
     try:
         genai.configure(api_key=api_key)
-        gemini = genai.GenerativeModel("gemini-2.0-flash-exp")
+        gemini = GeminiClient.from_env(genai.GenerativeModel("gemini-2.0-flash-exp"))
         logger.info("✅ Gemini API configured successfully")
         return gemini
     except Exception as e:
@@ -39,9 +66,9 @@ def setup_gemini(api_key: str):
 # 3️⃣ Load dataset
 # ------------------------------
 def load_dataset(csv_path: str):
-    """Load the CSV dataset"""
+    """Load the CSV dataset with typed columns and parsed prices"""
     try:
-        df = pd.read_csv(csv_path)
+        df = read_catalog(csv_path)
         logger.info(f"✅ Loaded {len(df)} products from CSV")
         return df
     except Exception as e:
@@ -51,33 +78,44 @@ def load_dataset(csv_path: str):
 # ------------------------------
 # 4️⃣ Build text chunks
 # ------------------------------
-def build_chunks(df: pd.DataFrame):
-    """Build text chunks from the dataframe"""
-    chunks = []
-    for _, row in df.iterrows():
-        text = f"""
-Product: {row['Product Name']} ({row['Category']})
-Materials from animals: {row['Animal Materials Used']}
-Animal cruelty flag: {row['Animal Cruelty Flag']}
-Cruelty Note: {row['Cruelty Note']}
-Price: {row['Estimated Price']}
-Vegan Alternative: {row['Vegan Alternative']}
-Vegan Material: {row['Material']}
-Vegan Price: {row['Price']}
-Why choose vegan: {row['Why Choose Vegan']}
+CHUNK_TEMPLATE = """
+Product: {Product Name} ({Category})
+Materials from animals: {Animal Materials Used}
+Animal cruelty flag: {Animal Cruelty Flag}
+Cruelty Note: {Cruelty Note}
+Price: {Estimated Price}
+Vegan Alternative: {Vegan Alternative}
+Vegan Material: {Material}
+Vegan Price: {Price}
+Why choose vegan: {Why Choose Vegan}
 """
-        chunks.append({"text": text, "metadata": row.to_dict()})
+
+def build_chunks(df: pd.DataFrame):
+    """Build text chunks from the dataframe, column-wise rather than row by row"""
+    texts = render_texts(df, CHUNK_TEMPLATE)
+    chunks = [{"text": text, "metadata": metadata} for text, metadata in zip(texts, build_records(df))]
     
     logger.info(f"✅ Created {len(chunks)} text chunks")
     return chunks
 
+def catalog_version(chunks: List[Dict]) -> str:
+    """Short content hash of the catalog, used in ETags; changes whenever any product changes"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk["text"].encode("utf-8"))
+        digest.update(json.dumps(chunk["metadata"], sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
 # ------------------------------
 # 5️⃣ Generate embeddings
 # ------------------------------
-def generate_embeddings(chunks: List[Dict]):
-    """Generate embeddings for the text chunks"""
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+def generate_embeddings(chunks: List[Dict], embed_model: Optional[SentenceTransformer] = None):
+    """Generate embeddings for the text chunks, loading the model unless one is passed in"""
     try:
-        embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+        if embed_model is None:
+            embed_model = SentenceTransformer(EMBEDDING_MODEL)
         texts = [c['text'] for c in chunks]
         embeddings = embed_model.encode(texts, show_progress_bar=True).astype("float32")
         logger.info(f"✅ Generated {len(embeddings)} embeddings")
@@ -104,56 +142,189 @@ def build_faiss_index(embeddings: np.ndarray):
 # ------------------------------
 # 7️⃣ Save and load index & metadata
 # ------------------------------
+ARTIFACT_LOAD_ATTEMPTS = 3
+
+def version_path(index_path: str) -> str:
+    """Where the version marker for an index is saved, e.g. faiss_animal_products.version.json"""
+    return os.path.splitext(index_path)[0] + ".version.json"
+
+def graph_path(index_path: str) -> str:
+    """Where the kNN graph for an index is saved, e.g. faiss_animal_products.knn.npz"""
+    return os.path.splitext(index_path)[0] + ".knn.npz"
+
+def _file_stamp(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
 def save_index_and_metadata(index: faiss.Index, chunks: List[Dict], 
                            index_path: str = "faiss_animal_products.index", 
-                           metadata_path: str = "metadata.pkl"):
-    """Save the FAISS index and metadata"""
+                           metadata_path: str = "metadata.pkl",
+                           version: Optional[str] = None):
+    """
+    Save the FAISS index and metadata, then the version marker that commits them
+    
+    Each file is replaced atomically, and the marker goes last: it names the
+    catalog version and the exact index and metadata files of that version,
+    so a reader can tell a matched pair from one caught mid-save. Errors are
+    raised, so a failed save fails the reload that asked for it.
+    """
     try:
-        faiss.write_index(index, index_path)
-        with open(metadata_path, "wb") as f:
+        faiss.write_index(index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        with open(metadata_path + ".tmp", "wb") as f:
             pickle.dump(chunks, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+        marker = {
+            "version": version or catalog_version(chunks),
+            "index": _file_stamp(index_path),
+            "metadata": _file_stamp(metadata_path),
+        }
+        marker_path = version_path(index_path)
+        with open(marker_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+        os.replace(marker_path + ".tmp", marker_path)
         logger.info("✅ FAISS index and metadata saved")
     except Exception as e:
         logger.error(f"❌ Failed to save index: {e}")
+        raise
+
+def read_version_marker(index_path: str) -> Optional[Dict[str, Any]]:
+    """The saved version marker, or None for artifacts saved before markers existed"""
+    try:
+        with open(version_path(index_path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def index_vectors(index: faiss.Index) -> np.ndarray:
+    """All vectors stored in a flat index, in product order"""
+    return index.reconstruct_n(0, index.ntotal)
+
+def previous_positions(previous: List[Dict], chunks: List[Dict]) -> np.ndarray:
+    """Each chunk's position in `previous` if its text is unchanged, else -1"""
+    positions = {chunk["text"]: i for i, chunk in enumerate(previous)}
+    return np.array([positions.get(chunk["text"], -1) for chunk in chunks], dtype=np.int64)
 
 def load_index_and_metadata(index_path: str = "faiss_animal_products.index", 
-                           metadata_path: str = "metadata.pkl"):
-    """Load previously saved FAISS index and metadata"""
+                           metadata_path: str = "metadata.pkl",
+                           attempts: int = ARTIFACT_LOAD_ATTEMPTS):
+    """
+    Load a matched FAISS index and metadata, and the catalog version they carry
+    
+    The pair must be the one the version marker names, before and after
+    reading, and the chunks must hash to the marker's version; otherwise a
+    save is in progress and the load is retried. Artifacts without a marker
+    load as they are.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            marker = read_version_marker(index_path)
+            index = faiss.read_index(index_path)
+            with open(metadata_path, "rb") as f:
+                chunks = pickle.load(f)
+            if index.ntotal != len(chunks):
+                raise ValueError(f"Index has {index.ntotal} vectors but metadata has {len(chunks)} chunks")
+            version = catalog_version(chunks)
+            if marker is not None:
+                if (marker.get("version") != version or read_version_marker(index_path) != marker
+                        or marker.get("index") != _file_stamp(index_path)
+                        or marker.get("metadata") != _file_stamp(metadata_path)):
+                    raise ValueError("Index and metadata do not match the saved version marker")
+            logger.info("✅ FAISS index and metadata loaded")
+            return index, chunks, version
+        except Exception as e:
+            if attempt == attempts:
+                logger.error(f"❌ Failed to load index: {e}")
+                raise
+            logger.warning(f"⚠️ Artifacts changed while loading, retrying: {e}")
+            time.sleep(0.1 * attempt)
+
+def artifact_signature(index_path: str = "faiss_animal_products.index",
+                       metadata_path: str = "metadata.pkl") -> Optional[Tuple[int, ...]]:
+    """Modification time and size of the artifacts and their version marker, or None if the pair is missing"""
     try:
-        index = faiss.read_index(index_path)
-        with open(metadata_path, "rb") as f:
-            chunks = pickle.load(f)
-        logger.info("✅ FAISS index and metadata loaded")
-        return index, chunks
-    except Exception as e:
-        logger.error(f"❌ Failed to load index: {e}")
-        raise
+        signature = tuple(v for path in (index_path, metadata_path)
+                          for st in (os.stat(path),) for v in (st.st_mtime_ns, st.st_size))
+    except OSError:
+        return None
+    try:
+        st = os.stat(version_path(index_path))
+        return signature + (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return signature
+
+def max_rss_mb() -> Optional[float]:
+    """Process memory high-water mark in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
 
 # ------------------------------
 # 8️⃣ RAG functions
 # ------------------------------
+def _recall_size(reranker: Optional[Reranker], chunks: Optional[List[Dict]], queries: List[str], top_k: int) -> int:
+    """Stage-1 candidates to fetch per query, or 0 to use the FAISS top-k as is"""
+    if reranker is None or chunks is None:
+        return 0
+    return reranker.recall_size(queries, top_k)
+
+def retrieve_chunk_ids(query: str, embed_model: SentenceTransformer,
+                       index: faiss.Index, top_k: int = 5, chunks: Optional[List[Dict]] = None,
+                       reranker: Optional[Reranker] = None, deadline: Optional[Deadline] = None) -> List[int]:
+    """
+    Ids of the chunks most relevant to a query
+
+    With a reranker that has work to do (a loaded model, or a category or
+    price cap to filter on), FAISS returns its wider candidate set and the
+    reranker picks the `top_k` (see rerank.Reranker) within what is left
+    of `deadline`; otherwise the FAISS top-k is used as is.
+    """
+    wide = _recall_size(reranker, chunks, [query], top_k)
+    start = time.perf_counter()
+    with timed("embed"):
+        vec = embed_model.encode([query]).astype("float32")
+    with timed("faiss_search"):
+        D, I = index.search(vec, wide or top_k)
+    ids = [int(i) for i in I[0] if i >= 0]
+    if not wide:
+        return ids
+    return reranker.cascade([query], [ids], chunks, top_k, start, deadline)[0]
+
 def retrieve_chunks(query: str, embed_model: SentenceTransformer, 
-                   index: faiss.Index, chunks: List[Dict], top_k: int = 5):
+                   index: faiss.Index, chunks: List[Dict], top_k: int = 5,
+                   reranker: Optional[Reranker] = None):
     """Retrieve relevant chunks for a query"""
     try:
-        vec = embed_model.encode([query]).astype("float32")
-        D, I = index.search(vec, top_k)
-        return [chunks[i] for i in I[0]]
+        return [chunks[i] for i in retrieve_chunk_ids(query, embed_model, index, top_k, chunks, reranker)]
     except Exception as e:
         logger.error(f"❌ Failed to retrieve chunks: {e}")
         return []
 
-def answer_with_rag(query: str, embed_model: SentenceTransformer, 
-                   index: faiss.Index, chunks: List[Dict], gemini):
-    """Answer a query using RAG"""
-    try:
-        top_chunks = retrieve_chunks(query, embed_model, index, chunks)
-        if not top_chunks:
-            return "I couldn't find relevant information to answer your question. Please try rephrasing or ask about specific products or materials."
-        
-        context = "\n".join([c['text'] for c in top_chunks])
+def retrieve_chunk_ids_batch(queries: List[str], embed_model: SentenceTransformer,
+                             index: faiss.Index, top_k: int = 5, chunks: Optional[List[Dict]] = None,
+                             reranker: Optional[Reranker] = None) -> List[List[int]]:
+    """Retrieve chunk ids for many queries with one encode, one FAISS search and one re-ranking pass"""
+    wide = _recall_size(reranker, chunks, queries, top_k)
+    start = time.perf_counter()
+    with timed("batch_embed"):
+        vecs = embed_model.encode(queries, batch_size=64).astype("float32")
+    with timed("batch_faiss_search"):
+        D, I = index.search(vecs, wide or top_k)
+    rows = [[int(i) for i in row if i >= 0] for row in I]
+    if not wide:
+        return rows
+    return reranker.cascade(queries, rows, chunks, top_k, start)
 
-        prompt = f"""
+def build_prompt(query: str, context: str, history: str = "") -> str:
+    """Build the Gemini prompt for a query, its retrieved context and any earlier turns"""
+    conversation = ""
+    if history:
+        conversation = f"""Conversation so far (the user's message may refer to products discussed here):
+{history}
+
+"""
+    return f"""
 You are a cruelty-free shopping assistant.
 
 You have detailed product data, including animal material usage, cruelty notes, prices, and vegan alternatives.
@@ -166,7 +337,7 @@ Adapt your answer intelligently:
 - If they ask why to choose vegan, highlight sustainability, ethics, and style — without repeating the same lines every time.
 - Never describe animals dying graphically; keep it professional.
 
-Product Data:
+{conversation}Product Data:
 {context}
 
 User query: {query}
@@ -174,71 +345,567 @@ User query: {query}
 Answer conversationally, in a way that feels natural and tailored to the query:
 """
 
+def assemble_prompt(query: str, top_chunks: List[Dict], prompt_builder: PromptBuilder, history: str = "") -> str:
+    with timed("prompt_assembly"):
+        template = build_prompt
+        if history:
+            template = lambda q, context: build_prompt(q, context, history)
+        return prompt_builder.build(query, top_chunks, template)
 
-        response = gemini.generate_content(prompt)
-        return response.text
+def answer_from_chunks(query: str, top_chunks: List[Dict], gemini, prompt_builder: PromptBuilder,
+                       history: str = "") -> str:
+    """Answer a query with Gemini from already retrieved chunks"""
+    if not top_chunks:
+        return NO_CONTEXT_ANSWER
+
+    prompt = assemble_prompt(query, top_chunks, prompt_builder, history)
+    try:
+        with timed("gemini"):
+            response = gemini.generate_content(prompt)
+    except GeminiUnavailableError as e:
+        logger.warning(f"⚠️ Gemini unavailable, answering from retrieval only: {e}")
+        return retrieval_only_answer(query, top_chunks)
+    return response.text
+
+async def answer_from_chunks_async(query: str, top_chunks: List[Dict], gemini: GeminiClient,
+                                   prompt_builder: PromptBuilder, history: str = "",
+                                   deadline: Optional[Deadline] = None) -> str:
+    """
+    `answer_from_chunks` for the event loop
+
+    Cancelling the awaiting task cancels the Gemini request. Gemini gets
+    what is left of `deadline`; past it the answer is built from the
+    retrieved chunks alone.
+    """
+    if not top_chunks:
+        return NO_CONTEXT_ANSWER
+
+    prompt = assemble_prompt(query, top_chunks, prompt_builder, history)
+    try:
+        with timed("gemini"):
+            response = await gemini.generate_content_async(prompt, timeout=deadline.timeout() if deadline else None)
+    except GeminiUnavailableError as e:
+        if deadline is not None and deadline.expired:
+            REQUESTS_CUT_SHORT.inc(kind="chat", reason="deadline")
+        logger.warning(f"⚠️ Gemini unavailable, answering from retrieval only: {e}")
+        return retrieval_only_answer(query, top_chunks)
+    return response.text
+
+def answer_with_rag(query: str, embed_model: SentenceTransformer, 
+                   index: faiss.Index, chunks: List[Dict], gemini,
+                   prompt_builder: Optional[PromptBuilder] = None,
+                   reranker: Optional[Reranker] = None):
+    """Answer a query using RAG"""
+    try:
+        top_chunks = retrieve_chunks(query, embed_model, index, chunks, reranker=reranker)
+        prompt_builder = prompt_builder or PromptBuilder(getattr(embed_model, "tokenizer", None))
+        return answer_from_chunks(query, top_chunks, gemini, prompt_builder)
     except Exception as e:
         logger.error(f"❌ Failed to generate answer: {e}")
         return f"I encountered an error while processing your request: {str(e)}"
 
+def answer_queries_with_rag(queries: List[str], embed_model: SentenceTransformer,
+                            index: faiss.Index, chunks: List[Dict], gemini,
+                            max_concurrency: int = 4,
+                            prompt_builder: Optional[PromptBuilder] = None,
+                            reranker: Optional[Reranker] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Answer many queries using RAG, yielding results as each one completes
+
+    All queries are embedded in one batched encode and searched with a single
+    FAISS matrix call; with a reranker, all their candidates are re-scored
+    in one pass. Duplicate queries are answered once, and queries that
+    retrieve the same chunks share one assembled context. Gemini requests run
+    on at most `max_concurrency` worker threads.
+
+    Yields dicts with `index` (position in `queries`), `query` and either
+    `answer` or `error`.
+    """
+    # Group positions by normalized query so duplicates cost one answer
+    positions: Dict[str, List[int]] = {}
+    for i, query in enumerate(queries):
+        positions.setdefault(" ".join(query.lower().split()), []).append(i)
+    unique_queries = [queries[group[0]] for group in positions.values()]
+    if not unique_queries:
+        return
+
+    try:
+        ids_per_query = retrieve_chunk_ids_batch(unique_queries, embed_model, index, chunks=chunks,
+                                                 reranker=reranker)
+    except Exception as e:
+        logger.error(f"❌ Failed to retrieve chunks for batch: {e}")
+        for i, query in enumerate(queries):
+            yield {"index": i, "query": query, "error": f"Retrieval failed: {e}"}
+        return
+
+    prompt_builder = prompt_builder or PromptBuilder(getattr(embed_model, "tokenizer", None))
+    contexts: Dict[tuple, str] = {}
+
+    def answer_one(query: str, ids: List[int]) -> str:
+        if not ids:
+            return NO_CONTEXT_ANSWER
+        fields = prompt_builder.select_fields(query)
+        budget = prompt_builder.context_budget(query, build_prompt)
+        key = (tuple(ids), fields, budget)
+        context = contexts.get(key)
+        if context is None:
+            context = contexts[key] = prompt_builder.build_context([chunks[i] for i in ids], fields, budget)
+        try:
+            with timed("gemini"):
+                return gemini.generate_content(build_prompt(query, context)).text
+        except GeminiUnavailableError as e:
+            logger.warning(f"⚠️ Gemini unavailable, answering from retrieval only: {e}")
+            return retrieval_only_answer(query, [chunks[i] for i in ids])
+
+    # Submit lazily, so a consumer that stops reading leaves at most
+    # `max_concurrency` Gemini calls running rather than the whole batch
+    max_concurrency = max(1, max_concurrency)
+    work = zip(unique_queries, ids_per_query, positions.values())
+    pool = ThreadPoolExecutor(max_workers=max_concurrency)
+    pending: Dict[Any, List[int]] = {}
+
+    def submit(n: int) -> None:
+        for query, ids, group in islice(work, n):
+            pending[pool.submit(answer_one, query, ids)] = group
+
+    try:
+        submit(max_concurrency)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            submit(len(done))
+            for future in done:
+                group = pending.pop(future)
+                try:
+                    result = {"answer": future.result()}
+                except Exception as e:
+                    logger.error(f"❌ Failed to generate answer: {e}")
+                    result = {"error": str(e)}
+                for i in group:
+                    yield {"index": i, "query": queries[i], **result}
+    finally:
+        # Closed early (e.g. the client went away): drop work that has not started
+        pool.shutdown(wait=False, cancel_futures=True)
+
 # ------------------------------
 # 9️⃣ Main chatbot class
 # ------------------------------
+class Catalog(NamedTuple):
+    """
+    Everything derived from one version of the product catalog
+
+    The chatbot swaps a whole Catalog in one assignment, so a request that
+    read `chatbot.catalog` once keeps a consistent index, chunks and router
+    even if a reload lands mid-request.
+    """
+    chunks: List[Dict]
+    index: faiss.Index
+    router: IntentRouter
+    version: str
+    source: str
+    # Artifact files as written or read for this version, to tell our own saves from new ones
+    artifacts: Optional[Tuple[int, ...]]
+    # Each product's nearest neighbours, for similar-product lookups
+    graph: Optional[NeighborGraph] = None
+    # Typeahead over brands, names, categories and materials
+    autocomplete: Optional[AutocompleteIndex] = None
+    # Price and savings aggregates
+    analytics: Optional[CatalogAnalytics] = None
+
+def product_summary(product_id: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """One product as returned by the suggestion and similar-product endpoints"""
+    return {
+        'id': product_id,
+        'product_name': metadata['Product Name'],
+        'category': metadata['Category'],
+        'animal_materials': metadata['Animal Materials Used'],
+        'cruelty_flag': metadata['Animal Cruelty Flag'],
+        'vegan_alternative': metadata['Vegan Alternative'],
+        'vegan_material': metadata['Material'],
+        'vegan_price': metadata['Price'],
+        'why_vegan': metadata['Why Choose Vegan']
+    }
+
 class CrueltyFreeChatbot:
     """Cruelty-free shopping assistant using RAG with Gemini API"""
     
-    def __init__(self, csv_path: str, gemini_api_key: str):
+    def __init__(self, csv_path: str, gemini_api_key: str,
+                 index_path: str = "faiss_animal_products.index", metadata_path: str = "metadata.pkl",
+                 embed_model: Optional[SentenceTransformer] = None, gemini=None,
+                 prompt_builder: Optional[PromptBuilder] = None, reranker: Optional[Reranker] = None,
+                 prefer_artifacts: bool = False):
         """
         Initialize the chatbot
         
         Args:
             csv_path: Path to the CSV file with product data
             gemini_api_key: Gemini API key
+            index_path, metadata_path: Where the FAISS index and chunks are saved
+            embed_model, gemini, prompt_builder, reranker: Shared instances to reuse instead of loading new ones
+            prefer_artifacts: Load the saved index and chunks when they are newer than the CSV
         """
         self.csv_path = csv_path
         self.gemini_api_key = gemini_api_key
-        self.embed_model = None
-        self.index = None
-        self.chunks = []
-        self.gemini = None
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.prefer_artifacts = prefer_artifacts
+        self.embed_model = embed_model
+        self.gemini = gemini
+        self.prompt_builder = prompt_builder
+        self.reranker = reranker
+        self.catalog: Optional[Catalog] = None
+        self.last_reload: Dict[str, Any] = {}
+        self._reload_lock = threading.Lock()
         
         # Initialize components
         self._setup()
     
+    # Read-only views of the current catalog, for callers that need a single value
+    @property
+    def chunks(self) -> List[Dict]:
+        return self.catalog.chunks if self.catalog else []
+    
+    @property
+    def index(self) -> Optional[faiss.Index]:
+        return self.catalog.index if self.catalog else None
+    
+    @property
+    def router(self) -> Optional[IntentRouter]:
+        return self.catalog.router if self.catalog else None
+    
+    @property
+    def catalog_version(self) -> str:
+        return self.catalog.version if self.catalog else ""
+    
     def _setup(self):
         """Setup all components"""
         try:
             # Setup Gemini
-            self.gemini = setup_gemini(self.gemini_api_key)
-            
-            # Load dataset
-            df = load_dataset(self.csv_path)
+            if self.gemini is None:
+                self.gemini = setup_gemini(self.gemini_api_key)
             
-            # Build chunks
-            self.chunks = build_chunks(df)
+            # Reuse saved artifacts if asked and still current
+            if self.prefer_artifacts and self._artifacts_current():
+                try:
+                    self.catalog = self._load_catalog()
+                except Exception as e:
+                    logger.warning(f"⚠️ Saved artifacts unusable, rebuilding from CSV: {e}")
             
-            # Generate embeddings
-            self.embed_model, embeddings = generate_embeddings(self.chunks)
-            
-            # Build FAISS index
-            self.index = build_faiss_index(embeddings)
-            
-            # Save for later use
-            save_index_and_metadata(self.index, self.chunks)
+            # Otherwise build the catalog from the CSV and save its artifacts
+            if self.catalog is None:
+                self.catalog = self._build_catalog(self.csv_path)
             
         except Exception as e:
             logger.error(f"❌ Setup failed: {e}")
             raise
     
+    def _new_router(self, chunks: List[Dict]) -> IntentRouter:
+        router = IntentRouter(chunks)
+        if self.catalog is not None:
+            # Routing stats describe the process, not one catalog version
+            router.stats = self.catalog.router.stats
+        return router
+    
+    def _build_catalog(self, csv_path: str) -> Catalog:
+        """Load the CSV, embed it and save the artifacts, without touching the live catalog"""
+        previous = self.catalog
+        
+        # Load dataset
+        df = load_dataset(csv_path)
+        
+        # Build chunks
+        chunks = build_chunks(df)
+        router = self._new_router(chunks)
+        
+        # Products whose text is unchanged keep their vectors; only the rest are embedded
+        # (the model is loaded once and reused on reloads)
+        old_ids = (previous_positions(previous.chunks, chunks) if previous is not None
+                   else np.full(len(chunks), -1, dtype=np.int64))
+        fresh = np.nonzero(old_ids < 0)[0]
+        embeddings = np.empty((len(chunks), previous.index.d if previous else 0), dtype="float32")
+        if fresh.size:
+            self.embed_model, fresh_embeddings = generate_embeddings([chunks[i] for i in fresh], self.embed_model)
+            if previous is None:
+                embeddings = fresh_embeddings
+            else:
+                embeddings[fresh] = fresh_embeddings
+        if previous is not None and fresh.size < len(chunks):
+            kept = np.nonzero(old_ids >= 0)[0]
+            embeddings[kept] = index_vectors(previous.index)[old_ids[kept]]
+            logger.info(f"✅ Reused {len(kept)} embeddings, embedded {fresh.size} new or changed products")
+        self._ensure_models()
+        
+        # Build FAISS index
+        index = build_faiss_index(embeddings)
+        
+        # Neighbour graph, updated from the previous one when it can be
+        version = catalog_version(chunks)
+        if previous is not None and previous.graph is not None:
+            graph = update_graph(previous.graph, old_ids, embeddings, index=index)
+        else:
+            graph = build_graph(embeddings, index=index)
+        
+        # Save for later use, and for other workers watching the artifacts;
+        # the graph goes first and the version marker last, so a watcher
+        # that sees the marker finds everything it names
+        save_graph(graph, graph_path(self.index_path), version)
+        save_index_and_metadata(index, chunks, self.index_path, self.metadata_path, version)
+        
+        return Catalog(chunks, index, router, version, csv_path,
+                       artifact_signature(self.index_path, self.metadata_path), graph,
+                       AutocompleteIndex.from_chunks(chunks),
+                       CatalogAnalytics.from_chunks(chunks, previous.analytics if previous else None, old_ids))
+    
+    def _artifacts_current(self) -> bool:
+        """Whether both artifacts exist and were saved after the CSV last changed"""
+        try:
+            csv_mtime = os.stat(self.csv_path).st_mtime_ns
+            return all(os.stat(path).st_mtime_ns >= csv_mtime for path in (self.index_path, self.metadata_path))
+        except OSError:
+            return False
+    
+    def _ensure_models(self) -> None:
+        if self.embed_model is None:
+            self.embed_model = SentenceTransformer(EMBEDDING_MODEL)
+        if self.prompt_builder is None:
+            self.prompt_builder = PromptBuilder(getattr(self.embed_model, "tokenizer", None))
+        if self.reranker is None:
+            self.reranker = Reranker()
+            self.reranker.load()
+    
+    def _load_catalog(self) -> Catalog:
+        """Load the saved index and chunks, e.g. after another worker rebuilt them"""
+        self._ensure_models()
+        signature = artifact_signature(self.index_path, self.metadata_path)
+        index, chunks, version = load_index_and_metadata(self.index_path, self.metadata_path)
+        graph = load_graph(graph_path(self.index_path), version, len(chunks))
+        if graph is None:
+            # Artifacts saved before graphs existed, or by an interrupted save
+            graph = build_graph(index_vectors(index), index=index)
+            marker = read_version_marker(self.index_path)
+            # Not saved once a newer version is marked: its graph must not be
+            # replaced with this one
+            if marker is None or marker.get("version") == version:
+                save_graph(graph, graph_path(self.index_path), version)
+        previous = self.catalog
+        old_ids = previous_positions(previous.chunks, chunks) if previous is not None else None
+        return Catalog(chunks, index, self._new_router(chunks), version, self.index_path, signature, graph,
+                       AutocompleteIndex.from_chunks(chunks),
+                       CatalogAnalytics.from_chunks(chunks, previous.analytics if previous else None, old_ids))
+    
+    def artifacts_changed(self) -> bool:
+        """Whether the saved artifacts differ from the ones behind the live catalog"""
+        signature = artifact_signature(self.index_path, self.metadata_path)
+        return signature is not None and self.catalog is not None and signature != self.catalog.artifacts
+    
+    def reload(self, source: str = "csv", csv_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build a new catalog in the calling thread, then swap it in
+        
+        `source` is "csv" to re-embed the CSV (and save fresh artifacts), or
+        "artifacts" to load the saved index and chunks. Requests in flight
+        finish on the catalog they started with. Raises RuntimeError if a
+        reload is already running.
+        """
+        if source not in ("csv", "artifacts"):
+            raise ValueError(f"Unknown reload source: {source}")
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("A catalog reload is already in progress")
+        try:
+            start = time.perf_counter()
+            rss_before = max_rss_mb()
+            previous = self.catalog
+            if source == "csv":
+                catalog = self._build_catalog(csv_path or self.csv_path)
+                self.csv_path = catalog.source
+            else:
+                catalog = self._load_catalog()
+            # The swap: one reference assignment
+            self.catalog = catalog
+            rss_after = max_rss_mb()
+            self.last_reload = {
+                "source": source,
+                "path": catalog.source,
+                "previous_version": previous.version if previous else "",
+                "version": catalog.version,
+                "changed": previous is None or previous.version != catalog.version,
+                "products": len(catalog.chunks),
+                "seconds": round(time.perf_counter() - start, 3),
+                "maxrss_mb": round(rss_after, 1) if rss_after is not None else None,
+                "maxrss_growth_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+                "finished_at": time.time(),
+            }
+            logger.info(f"✅ Reloaded catalog {catalog.version} ({len(catalog.chunks)} products) "
+                        f"from {source} in {self.last_reload['seconds']:.1f}s")
+            return self.last_reload
+        finally:
+            self._reload_lock.release()
+    
     def answer_query(self, query: str) -> str:
-        """Answer a user query using RAG"""
-        return answer_with_rag(query, self.embed_model, self.index, self.chunks, self.gemini)
+        """Answer a user query from catalog templates when possible, otherwise with RAG"""
+        start = time.perf_counter()
+        catalog = self.catalog
+        with timed("intent_routing"):
+            answer = catalog.router.route(query)
+        path = "structured"
+        if answer is None:
+            answer = answer_with_rag(query, self.embed_model, catalog.index, catalog.chunks, self.gemini,
+                                     prompt_builder=self.prompt_builder, reranker=self.reranker)
+            path = "llm"
+        catalog.router.stats.record(path, time.perf_counter() - start)
+        return answer
+    
+    def chat(self, message: str, session: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Answer one chat turn, reading and updating `session`
+
+        Follow-ups ("and cheaper ones?") reuse or narrow the chunks retrieved
+        for the previous turn instead of running a fresh retrieval, and recent
+        turns are included in the prompt.
+        """
+        if session is None:
+            return self.answer_query(message)
+        
+        start = time.perf_counter()
+        catalog = self.catalog
+        answer, ids = self._prepare_turn(catalog, message, session)
+        if answer is None:
+            try:
+                answer = answer_from_chunks(message, [catalog.chunks[i] for i in ids], self.gemini,
+                                            self.prompt_builder, history=format_history(session["turns"]))
+            except Exception as e:
+                logger.error(f"❌ Failed to generate answer: {e}")
+                answer = f"I encountered an error while processing your request: {str(e)}"
+            self._finish_turn(catalog, session, message, answer, ids, "llm", start)
+        else:
+            self._finish_turn(catalog, session, message, answer, ids or None, "structured", start)
+        return answer
+    
+    async def chat_async(self, message: str, session: Optional[Dict[str, Any]] = None,
+                         deadline: Optional[Deadline] = None) -> str:
+        """
+        `chat()` for the event loop, bounded by `deadline` and cancellable
+        
+        Routing and retrieval run in a worker thread and Gemini is awaited, so
+        cancelling the task drops retrieval that has not started and cancels
+        the Gemini request; `session` is then left without the turn. When
+        `deadline` passes, the turn is answered from retrieval alone (or with
+        a "try again" note if retrieval itself was too slow) instead of
+        waiting on.
+        """
+        deadline = deadline or Deadline()
+        start = time.perf_counter()
+        catalog = self.catalog
+        try:
+            answer, ids = await asyncio.wait_for(
+                asyncio.to_thread(self._prepare_turn, catalog, message, session, deadline), deadline.timeout())
+        except asyncio.TimeoutError:
+            # The worker thread sees the cancelled deadline and skips its remaining stages
+            deadline.cancel()
+            REQUESTS_CUT_SHORT.inc(kind="chat", reason="deadline")
+            logger.warning("⚠️ Retrieval missed the request deadline")
+            return BUSY_ANSWER
+        except asyncio.CancelledError:
+            deadline.cancel()
+            raise
+        if answer is not None:
+            self._finish_turn(catalog, session, message, answer, ids or None, "structured", start)
+            return answer
+        
+        history = format_history(session["turns"]) if session else ""
+        try:
+            answer = await answer_from_chunks_async(message, [catalog.chunks[i] for i in ids], self.gemini,
+                                                    self.prompt_builder, history=history, deadline=deadline)
+        except Exception as e:
+            logger.error(f"❌ Failed to generate answer: {e}")
+            answer = f"I encountered an error while processing your request: {str(e)}"
+        self._finish_turn(catalog, session, message, answer, ids, "llm", start)
+        return answer
+    
+    def _prepare_turn(self, catalog: Catalog, message: str, session: Optional[Dict[str, Any]],
+                      deadline: Optional[Deadline] = None) -> Tuple[Optional[str], List[int]]:
+        """
+        Everything in a chat turn before Gemini: follow-up narrowing, routing and retrieval
+        
+        Returns a structured answer and the ids it used, or None and the
+        chunk ids to answer from. Reads `session` without changing it.
+        """
+        # Chunk ids only mean something within the catalog version that produced them
+        previous_ids = []
+        if session is not None and session.get("catalog_version") == catalog.version:
+            previous_ids = session["chunk_ids"]
+        if previous_ids and is_follow_up(message, session, catalog.router.catalog_terms(message)):
+            with timed("session_narrowing"):
+                ids = narrow_follow_up(message, previous_ids, catalog.chunks, analytics=catalog.analytics)
+            if ids is not None:
+                return None, ids
+        
+        with timed("intent_routing"):
+            answer, routed_ids = catalog.router.route_with_ids(message)
+        if answer is not None:
+            return answer, routed_ids
+        try:
+            return None, retrieve_chunk_ids(message, self.embed_model, catalog.index, chunks=catalog.chunks,
+                                            reranker=self.reranker, deadline=deadline)
+        except Exception as e:
+            logger.error(f"❌ Failed to retrieve chunks: {e}")
+            return None, []
+    
+    def _finish_turn(self, catalog: Catalog, session: Optional[Dict[str, Any]], message: str, answer: str,
+                     chunk_ids: Optional[List[int]], path: str, start: float) -> None:
+        catalog.router.stats.record(path, time.perf_counter() - start)
+        if session is None:
+            return
+        if session.get("catalog_version") != catalog.version:
+            session["chunk_ids"] = []
+        session["catalog_version"] = catalog.version
+        add_turn(session, message, answer, chunk_ids=chunk_ids)
+    
+    def answer_queries(self, queries: List[str], max_concurrency: int = 4) -> Iterator[Dict[str, Any]]:
+        """Answer many queries in one batch, yielding results as they complete"""
+        catalog = self.catalog
+        open_ended = []
+        for i, query in enumerate(queries):
+            answer = catalog.router.route(query)
+            if answer is None:
+                open_ended.append(i)
+            else:
+                yield {"index": i, "query": query, "answer": answer}
+        results = answer_queries_with_rag([queries[i] for i in open_ended], self.embed_model, catalog.index,
+                                          catalog.chunks, self.gemini, max_concurrency=max_concurrency,
+                                          prompt_builder=self.prompt_builder, reranker=self.reranker)
+        with closing(results):
+            for result in results:
+                result["index"] = open_ended[result["index"]]
+                yield result
+    
+    def similar_products(self, product_id: int, k: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        A product's nearest neighbours and best-matching vegan alternatives
+        
+        Read from the precomputed kNN graph: no embedding, search or Gemini
+        call. Returns None if `product_id` is not in the catalog; `k` is
+        capped at the neighbours stored per product.
+        """
+        catalog = self.catalog
+        if not 0 <= product_id < len(catalog.chunks):
+            return None
+        k = max(1, min(k, catalog.graph.k))
+        describe = lambda i: product_summary(i, catalog.chunks[i]["metadata"])
+        return similar_products(catalog.chunks, catalog.graph, product_id, k, describe)
+    
+    def autocomplete(self, query: str, limit: int = AUTOCOMPLETE_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """Typeahead suggestions for a partial query, from the index built with the catalog"""
+        return self.catalog.autocomplete.complete(query, limit)
+    
+    def price_analytics(self) -> Dict[str, Any]:
+        """Savings by category and material, and price percentiles, precomputed for this catalog version"""
+        return self.catalog.analytics.summary
     
     def get_product_suggestions(self, category: Optional[str] = None, max_price: Optional[float] = None) -> List[Dict[str, Any]]:
         """Get product suggestions based on filters"""
         try:
             suggestions = []
-            for chunk in self.chunks:
+            for i, chunk in enumerate(self.catalog.chunks):
                 metadata = chunk['metadata']
                 
                 # Apply filters
@@ -246,23 +913,11 @@ class CrueltyFreeChatbot:
                     continue
                     
                 if max_price:
-                    try:
-                        price = float(str(metadata['Price']).replace('$', '').replace(',', ''))
-                        if price > max_price:
-                            continue
-                    except (ValueError, TypeError):
+                    price = price_value(metadata)
+                    if price is None or price > max_price:
                         continue
                 
-                suggestions.append({
-                    'product_name': metadata['Product Name'],
-                    'category': metadata['Category'],
-                    'animal_materials': metadata['Animal Materials Used'],
-                    'cruelty_flag': metadata['Animal Cruelty Flag'],
-                    'vegan_alternative': metadata['Vegan Alternative'],
-                    'vegan_material': metadata['Material'],
-                    'vegan_price': metadata['Price'],
-                    'why_vegan': metadata['Why Choose Vegan']
-                })
+                suggestions.append(product_summary(i, metadata))
             
             return suggestions[:10]  # Limit to 10 suggestions
             
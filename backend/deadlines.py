@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Per-request deadlines shared between the event loop and worker threads"""
+
+import math
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    The time by which a request must be answered
+
+    Created on the event loop and passed into worker threads, which check
+    `remaining()` between stages so they stop early. `cancel()`, e.g. when
+    the client disconnects, makes it expire at once.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires = time.monotonic() + seconds if seconds and seconds > 0 else math.inf
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        """Seconds left, 0 once expired or cancelled"""
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self) -> Optional[float]:
+        """Seconds left for asyncio.wait_for and client timeouts; None when there is no deadline"""
+        return None if self.expires == math.inf and not self.cancelled else self.remaining()
+
+    def cancel(self) -> None:
+        self.cancelled = True
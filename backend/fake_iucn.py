@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the IUCN Red List v4 API, used by the load-test harness
+
+Latency, payload size and error rate are read from the environment so the
+harness can start it as a subprocess. Responses carry an ETag, honour
+If-None-Match and are gzipped when the client accepts it, like upstream.
+
+    FAKE_IUCN_LATENCY      seconds added to every response (default 0.1)
+    FAKE_IUCN_ASSESSMENTS  assessments listed per code/taxon (default 50)
+    FAKE_IUCN_ERROR_RATE   fraction of requests answered with 503 (default 0)
+
+Usage:
+    python fake_iucn.py --port 8101 --latency 0.2 --assessments 200 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+
+from fastapi import FastAPI, Request
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+
+LATENCY = float(os.getenv("FAKE_IUCN_LATENCY", "0.1"))
+ASSESSMENTS = int(os.getenv("FAKE_IUCN_ASSESSMENTS", "50"))
+ERROR_RATE = float(os.getenv("FAKE_IUCN_ERROR_RATE", "0"))
+
+CONSERVATION_ACTION_CODES = ["1", "1_1", "1_2", "2", "2_1", "2_2", "2_3", "3", "3_1", "3_2", "4", "4_1", "5", "5_1", "6", "6_3"]
+USE_AND_TRADE_CODES = [str(i) for i in range(1, 19)]
+CATEGORIES = ["LC", "NT", "VU", "EN", "CR", "DD"]
+
+app = FastAPI(title="Fake IUCN v4")
+
+
+@app.middleware("http")
+async def simulate_upstream(request: Request, call_next):
+    if LATENCY:
+        await asyncio.sleep(LATENCY * random.uniform(0.5, 1.5))
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"error": "Service temporarily unavailable"}, status_code=503)
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    # Payloads are deterministic, so a body hash works as an ETag for conditional requests
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type=response.media_type or "application/json", headers={"ETag": etag})
+
+
+# Added last so it wraps the ETag middleware and compresses its output
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+def assessments(seed: str) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "year_published": str(rng.randint(1996, 2025)),
+            "latest": i == 0,
+            "possibly_extinct": False,
+            "possibly_extinct_in_the_wild": False,
+            "sis_taxon_id": rng.randint(1000, 999999),
+            "url": f"https://www.iucnredlist.org/species/{rng.randint(1000, 999999)}/{rng.randint(1000, 999999)}",
+            "taxon_scientific_name": f"Genus{rng.randint(1, 999)} species{rng.randint(1, 999)}",
+            "red_list_category_code": rng.choice(CATEGORIES),
+            "assessment_id": rng.randint(1000, 99999999),
+            "code": seed,
+            "code_type": "conservation_action",
+            "scopes": [{"description": {"en": "Global"}, "code": "1"}],
+        }
+        for i in range(ASSESSMENTS)
+    ]
+
+
+@app.get("/api/v4/conservation_actions")
+async def conservation_actions():
+    return {"conservation_actions": [
+        {"code": code, "description": {"en": f"Conservation action {code.replace('_', '.')}"}}
+        for code in CONSERVATION_ACTION_CODES
+    ]}
+
+
+@app.get("/api/v4/conservation_actions/{code}")
+async def conservation_action(code: str):
+    return {
+        "conservation_action": {"code": code, "description": {"en": f"Conservation action {code.replace('_', '.')}"}},
+        "assessments": assessments(code),
+    }
+
+
+@app.get("/api/v4/use_and_trade")
+async def use_and_trade():
+    return {"use_and_trade": [
+        {"code": code, "description": {"en": f"Use and trade {code}"}} for code in USE_AND_TRADE_CODES
+    ]}
+
+
+@app.get("/api/v4/use_and_trade/{code}")
+async def use_and_trade_by_code(code: str):
+    return {
+        "use_and_trade": {"code": code, "description": {"en": f"Use and trade {code}"}},
+        "assessments": assessments(f"ut{code}"),
+    }
+
+
+@app.get("/api/v4/taxa/scientific_name")
+async def taxa_scientific_name(genus_name: str = "Panthera", species_name: str = "leo"):
+    scientific_name = f"{genus_name} {species_name}"
+    return {
+        "taxon": {
+            "sis_id": abs(hash(scientific_name)) % 1000000,
+            "scientific_name": scientific_name,
+            "kingdom_name": "ANIMALIA",
+            "phylum_name": "CHORDATA",
+            "class_name": "MAMMALIA",
+            "order_name": "CARNIVORA",
+            "family_name": "FELIDAE",
+            "genus_name": genus_name,
+            "species_name": species_name,
+            "authority": "(Linnaeus, 1758)",
+            "common_names": [{"main": True, "name": "Lion", "language": "eng"}],
+            "synonyms": [],
+            "ssc_groups": [],
+        },
+        "assessments": assessments(scientific_name),
+    }
+
+
+@app.get("/api/v4/assessment/{assessment_id}")
+async def assessment(assessment_id: int):
+    rng = random.Random(assessment_id)
+    return {
+        "assessment_id": assessment_id,
+        "year_published": str(rng.randint(1996, 2025)),
+        "red_list_category": {"code": rng.choice(CATEGORIES), "description": {"en": "Vulnerable"}},
+        "population_trend": {"code": "2", "description": {"en": "Decreasing"}},
+        "threats": [{"code": f"{i}_1", "description": {"en": f"Threat {i}"}} for i in range(1, 12)],
+        "conservation_actions": [{"code": c, "description": {"en": f"Action {c}"}} for c in CONSERVATION_ACTION_CODES],
+        "habitats": [{"code": f"{i}", "description": {"en": f"Habitat {i}"}} for i in range(1, 8)],
+        "documentation": {"rationale": "Lorem ipsum " * ASSESSMENTS},
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    parser.add_argument("--assessments", type=int, default=ASSESSMENTS)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    args = parser.parse_args()
+
+    LATENCY, ASSESSMENTS, ERROR_RATE = args.latency, args.assessments, args.error_rate
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
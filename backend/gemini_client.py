@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""Resilient wrapper around Gemini `generate_content` calls"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import logging
+from typing import Any, Optional
+
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# HTTP-style status codes worth retrying (rate limited or provider-side failures)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+}
+
+
+TIMEOUT_ERROR_NAMES = {"DeadlineExceeded", "GatewayTimeout"}
+
+
+class GeminiUnavailableError(RuntimeError):
+    """Raised when Gemini cannot produce an answer (open circuit, exhausted retries, deadline)"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an exception from `generate_content` is worth retrying"""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(exc, "code", None)
+    code = getattr(code, "value", code)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+def is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) or type(exc).__name__ in TIMEOUT_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    fail fast for `reset_timeout` seconds. Then a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed right now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """Forget a call that was allowed but never reached the provider"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("⚠️ Gemini circuit breaker opened")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """
+    Drop-in replacement for a `genai.GenerativeModel` used for text generation
+
+    Every call goes through a token-bucket rate limiter, a cap on in-flight
+    requests, exponential backoff with full jitter on retryable errors and an
+    overall per-call deadline. A circuit breaker makes calls fail fast with
+    `GeminiUnavailableError` while the provider is degraded, so callers can
+    fall back to a retrieval-only answer.
+    """
+
+    def __init__(self, model: Any, rate_per_sec: float = 5.0, burst: float = 10.0,
+                 max_in_flight: int = 8, max_retries: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, timeout: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+    @classmethod
+    def from_env(cls, model: Any) -> "GeminiClient":
+        """Build a client using GEMINI_* environment variables for the limits"""
+        return cls(
+            model,
+            rate_per_sec=float(os.getenv("GEMINI_RATE_PER_SEC", "5")),
+            burst=float(os.getenv("GEMINI_BURST", "10")),
+            max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+            timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+            ),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _failed(self, exc: Exception, attempt: int, deadline: float, caller_deadline: bool) -> float:
+        """
+        Record a failed attempt and return the backoff before the next one, or raise if there is none
+
+        Only provider-side failures count against the breaker. Caller-side
+        errors (bad request, safety block) and timeouts caused by a caller
+        deadline shorter than our own `timeout` say nothing about provider
+        health, so they leave its state as it was.
+        """
+        retryable = is_retryable(exc)
+        if retryable and not (caller_deadline and is_timeout(exc)):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_cancelled()
+        delay = self._backoff(attempt)
+        # A timeout's message is empty, so fall back to its type
+        reason = str(exc) or type(exc).__name__
+        if not retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            raise GeminiUnavailableError(f"Gemini request failed: {reason}") from exc
+        logger.warning(f"⚠️ Retrying Gemini call in {delay:.2f}s after: {reason}")
+        return delay
+
+    def generate_content(self, prompt: str, timeout: Optional[float] = None) -> Any:
+        """Call Gemini with rate limiting, retries and a deadline of `timeout` seconds"""
+        caller_deadline = timeout is not None and timeout < self.timeout
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise GeminiUnavailableError("Gemini circuit breaker is open")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.bucket.acquire(timeout=remaining):
+                self.breaker.record_cancelled()
+                raise GeminiUnavailableError("Gemini rate limit wait exceeds deadline")
+            if not self.in_flight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self.breaker.record_cancelled()
+                raise GeminiUnavailableError("Too many Gemini requests in flight")
+            try:
+                remaining = max(0.1, deadline - time.monotonic())
+                response = self.model.generate_content(prompt, request_options={"timeout": remaining})
+            except Exception as e:
+                delay = self._failed(e, attempt, deadline, caller_deadline)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return response
+            finally:
+                self.in_flight.release()
+            time.sleep(delay)
+
+    async def generate_content_async(self, prompt: str, timeout: Optional[float] = None) -> Any:
+        """
+        `generate_content` for the event loop, sharing its limits
+
+        Cancelling the awaiting task cancels the Gemini request itself and
+        any rate-limit or backoff wait, so an abandoned request stops
+        costing quota; a cancelled call does not count against the breaker.
+        """
+        caller_deadline = timeout is not None and timeout < self.timeout
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise GeminiUnavailableError("Gemini circuit breaker is open")
+
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or not await self.bucket.acquire_async(timeout=remaining):
+                    self.breaker.record_cancelled()
+                    raise GeminiUnavailableError("Gemini rate limit wait exceeds deadline")
+                # The semaphore is shared with threads, so poll instead of blocking the loop
+                while not self.in_flight.acquire(blocking=False):
+                    if time.monotonic() >= deadline:
+                        self.breaker.record_cancelled()
+                        raise GeminiUnavailableError("Too many Gemini requests in flight")
+                    await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            try:
+                remaining = max(0.1, deadline - time.monotonic())
+                # wait_for enforces the deadline even if the SDK ignores its own timeout
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, request_options={"timeout": remaining}), remaining)
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            except Exception as e:
+                delay = self._failed(e, attempt, deadline, caller_deadline)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return response
+            finally:
+                self.in_flight.release()
+            await asyncio.sleep(delay)
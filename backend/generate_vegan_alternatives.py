@@ -1,12 +1,32 @@
+"""
+Synthetic luxury-product catalog with vegan alternatives
+
+Rows are generated in fixed-size shards, each with its own seeded RNG, so
+the output depends only on the seed and row count, never on how many
+worker processes produced it. Shards are streamed to CSV or Parquet as
+they finish, keeping memory flat for million-row catalogs.
+
+Usage:
+    python generate_vegan_alternatives.py                      # the 350-row catalog shipped with the app
+    python generate_vegan_alternatives.py --rows 1000000 --output catalog_1m.csv --workers 8
+"""
+
+import argparse
 import csv
+import io
+import os
 import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-
-# Seed for reproducibility
-random.seed(42)
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 OUTPUT_FILE = Path("luxury_animal_products_vegan_alternatives.csv")
 NUM_ROWS = 350
+DEFAULT_SEED = 42
+# Rows per shard; part of the output's identity, unlike the worker count
+SHARD_ROWS = 50_000
 
 HEADER = [
     "Product Name",
@@ -104,39 +124,39 @@ sustainability_benefits = [
 currency_symbol = "$"
 
 
-def price_str(low: int, high: int) -> str:
-    price = random.randint(low, high)
+def price_str(rng: random.Random, low: int, high: int) -> str:
+    price = rng.randint(low, high)
     return f"{currency_symbol}{price:,}"
 
 
-def build_product_name(brand: str, category: str, shape: str) -> str:
-    descriptor = random.choice(product_adjectives)
+def build_product_name(rng: random.Random, brand: str, category: str, shape: str) -> str:
+    descriptor = rng.choice(product_adjectives)
     return f"{brand} {descriptor} {shape} {category[:-1] if category.endswith('s') else category}"
 
 
-def pick_animal_material(category: str):
+def pick_animal_material(rng: random.Random, category: str):
     for cat, materials, shapes in animal_categories:
         if cat == category:
-            material = random.choice(materials)
-            shape = random.choice(shapes)
+            material = rng.choice(materials)
+            shape = rng.choice(shapes)
             return material, shape
     # Fallback
     return "Leather", "Item"
 
 
-def cruelty_note(material: str) -> str:
+def cruelty_note(rng: random.Random, material: str) -> str:
     base = animal_cruelty_notes.get(material)
     if not base:
         base = "Animals are subjected to confinement, rough handling, and painful slaughter for fashion, despite humane alternatives."
-    env = random.choice(sustainability_benefits)
+    env = rng.choice(sustainability_benefits)
     return (
         f"{base} Choosing animal-free options avoids this harm and helps drive {env}."
     )
 
 
-def vegan_alt(category: str):
-    brand = random.choice(vegan_brands)
-    material, benefits = random.choice(vegan_materials)
+def vegan_alt(rng: random.Random, category: str):
+    brand = rng.choice(vegan_brands)
+    material, benefits = rng.choice(vegan_materials)
     # Map category to a plausible vegan product type
     alt_type_map = {
         "Outerwear": ["Vegan Parka", "Faux Fur Coat", "Insulated Jacket", "Tailored Overcoat"],
@@ -145,17 +165,17 @@ def vegan_alt(category: str):
         "Accessories": ["Vegan Scarf", "Belt", "Wallet", "Gloves"],
         "Small Leather Goods": ["Card Case", "Wallet", "Key Pouch", "Mini Zip"],
     }
-    alt_shape = random.choice(alt_type_map.get(category, ["Vegan Alternative"]))
+    alt_shape = rng.choice(alt_type_map.get(category, ["Vegan Alternative"]))
     name = f"{brand} {alt_shape}"
     why = (
-        f"Selecting {material.lower()} provides {random.choice(benefits)}, "
-        f"and {random.choice(why_vegan_reasons)}. "
+        f"Selecting {material.lower()} provides {rng.choice(benefits)}, "
+        f"and {rng.choice(why_vegan_reasons)}. "
         f"It pairs modern performance with a refined look, proving that luxury can be compassionate."
     )
     return name, material, why
 
 
-def estimate_prices(category: str, material: str):
+def estimate_prices(rng: random.Random, category: str, material: str):
     # Rough realistic luxury pricing bands
     if category == "Outerwear":
         animal_low, animal_high = 900, 12000
@@ -179,33 +199,50 @@ def estimate_prices(category: str, material: str):
         animal_low, animal_high = 300, 1800
         vegan_low, vegan_high = 40, 250
 
-    return price_str(animal_low, animal_high), price_str(vegan_low, vegan_high)
+    return price_str(rng, animal_low, animal_high), price_str(rng, vegan_low, vegan_high)
+
+
+def shard_rng(seed: int, shard: int) -> random.Random:
+    # Shard 0 uses the bare seed, so catalogs up to one shard match the original single-list generator
+    return random.Random(seed if shard == 0 else f"{seed}:{shard}")
+
 
+def iter_shard(shard: int, count: int, seed: int = DEFAULT_SEED) -> Iterator[List[str]]:
+    """
+    Rows of one shard, from that shard's own RNG
 
-def generate_rows(n: int):
-    rows = []
-    used_names = set()
+    Names only need checking against the shard's own rows: names from
+    shard k > 0 carry an "Edition k+1" tag, so shards never collide. A
+    repeat within the shard gets a random suffix as before, or the row's
+    offset if that is taken too.
+    """
+    rng = shard_rng(seed, shard)
+    used_names: Set[str] = set()
+    edition = f" Edition {shard + 1}" if shard else ""
 
     # Expand brand combinations for variety
     categories = [c[0] for c in animal_categories]
 
-    while len(rows) < n:
-        category = random.choice(categories)
-        brand = random.choice(brands)
-        material, shape = pick_animal_material(category)
+    for offset in range(count):
+        category = rng.choice(categories)
+        brand = rng.choice(brands)
+        material, shape = pick_animal_material(rng, category)
 
-        name = build_product_name(brand, category, shape)
-        # Ensure some uniqueness
+        base = build_product_name(rng, brand, category, shape) + edition
+        name = base
+        # Ensure uniqueness
         if name in used_names:
-            name = f"{name} {random.randint(2, 99)}"
+            name = f"{base} {rng.randint(2, 99)}"
+            if name in used_names:
+                name = f"{base} No. {offset + 1}"
         used_names.add(name)
 
-        cruelty = cruelty_note(material)
-        animal_price, vegan_price = estimate_prices(category, material)
-        alt_name, alt_material, why_choose = vegan_alt(category)
+        cruelty = cruelty_note(rng, material)
+        animal_price, vegan_price = estimate_prices(rng, category, material)
+        alt_name, alt_material, why_choose = vegan_alt(rng, category)
 
         # More detailed cruelty with context to keep richness
-        context_addendum = random.choice([
+        context_addendum = rng.choice([
             "Transport to slaughterhouses can involve long hours without food or water, compounding fear.",
             "Investigations repeatedly document injuries, untreated wounds, and chronic stress.",
             "Wild-caught individuals suffer during capture and holding, enduring extreme panic.",
@@ -214,7 +251,7 @@ def generate_rows(n: int):
         ])
         cruelty_full = f"{cruelty} {context_addendum}"
 
-        rows.append([
+        yield [
             name,
             category,
             material,
@@ -225,9 +262,95 @@ def generate_rows(n: int):
             alt_material,
             vegan_price,
             why_choose,
-        ])
-
-    return rows
+        ]
+
+
+def shard_plan(n: int, shard_rows: int = SHARD_ROWS) -> List[Tuple[int, int]]:
+    """(shard, row count) pairs covering `n` rows"""
+    return [(shard, min(shard_rows, n - start)) for shard, start in enumerate(range(0, n, shard_rows))]
+
+
+def iter_rows(n: int, seed: int = DEFAULT_SEED, shard_rows: int = SHARD_ROWS) -> Iterator[List[str]]:
+    """All `n` rows in order, one shard at a time"""
+    for shard, count in shard_plan(n, shard_rows):
+        yield from iter_shard(shard, count, seed)
+
+
+def generate_rows(n: int, seed: int = DEFAULT_SEED) -> List[List[str]]:
+    return list(iter_rows(n, seed))
+
+
+# ------------------------------
+# Writers
+# ------------------------------
+def _render_shard(job: Tuple[int, int, int, str]) -> Tuple[int, Any]:
+    """Worker: one shard as CSV text, or as columns for Parquet"""
+    shard, count, seed, fmt = job
+    rows = iter_shard(shard, count, seed)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return count, buffer.getvalue()
+    return count, [list(column) for column in zip(*rows)]
+
+
+def _rendered_shards(jobs: List[Tuple[int, int, int, str]], workers: int) -> Iterator[Tuple[int, Any]]:
+    """Rendered shards in order, with at most 2 x `workers` in flight so memory stays bounded"""
+    if workers <= 1:
+        for job in jobs:
+            yield _render_shard(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for job in jobs:
+            pending.append(pool.submit(_render_shard, job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_catalog(path: Path, n: int, fmt: Optional[str] = None, workers: Optional[int] = None,
+                  seed: int = DEFAULT_SEED, shard_rows: int = SHARD_ROWS) -> Dict[str, Any]:
+    """Generate `n` rows into `path` (CSV or Parquet) and return a throughput report"""
+    path = Path(path)
+    fmt = fmt or ("parquet" if path.suffix == ".parquet" else "csv")
+    workers = workers or os.cpu_count() or 1
+    jobs = [(shard, count, seed, fmt) for shard, count in shard_plan(n, shard_rows)]
+    workers = max(1, min(workers, len(jobs)))
+
+    start = time.perf_counter()
+    written = 0
+    if fmt == "csv":
+        with path.open("w", newline='', encoding="utf-8") as f:
+            csv.writer(f).writerow(HEADER)
+            for count, text in _rendered_shards(jobs, workers):
+                f.write(text)
+                written += count
+    elif fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs the pyarrow package") from e
+        schema = pa.schema([(column, pa.string()) for column in HEADER])
+        with pq.ParquetWriter(str(path), schema) as writer:
+            for count, columns in _rendered_shards(jobs, workers):
+                writer.write_table(pa.table(dict(zip(HEADER, columns)), schema=schema))
+                written += count
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+    seconds = time.perf_counter() - start
+    return {
+        "path": str(path),
+        "format": fmt,
+        "rows": written,
+        "shards": len(jobs),
+        "workers": workers,
+        "seconds": seconds,
+        "rows_per_s": written / seconds if seconds else 0.0,
+    }
 
 
 def write_csv(path: Path, rows):
@@ -237,7 +360,23 @@ def write_csv(path: Path, rows):
         writer.writerows(rows)
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=NUM_ROWS, help="Number of products to generate")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="Output file (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from the file suffix)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Base seed; shards derive their own from it")
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS, help="Rows per shard")
+    args = parser.parse_args()
+
+    report = write_catalog(args.output, args.rows, fmt=args.format, workers=args.workers,
+                           seed=args.seed, shard_rows=args.shard_rows)
+    print(
+        f"✅ Wrote {report['rows']:,} rows to {report['path']} in {report['seconds']:.1f}s "
+        f"({report['rows_per_s']:,.0f} rows/s, {report['shards']} shards, {report['workers']} workers)"
+    )
+
+
 if __name__ == "__main__":
-    data_rows = generate_rows(NUM_ROWS)
-    write_csv(OUTPUT_FILE, data_rows)
-    print(f"Wrote {len(data_rows)} rows to {OUTPUT_FILE}") 
\ No newline at end of file
+    main()
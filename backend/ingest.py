@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Typed catalog loading and vectorized chunk text construction"""
+
+import logging
+import math
+from itertools import repeat
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality columns, stored once per distinct value
+CATEGORICAL_COLUMNS = ("Category", "Animal Materials Used", "Animal Cruelty Flag", "Material")
+TEXT_COLUMNS = (
+    "Product Name", "Cruelty Note", "Estimated Price", "Vegan Alternative", "Price", "Why Choose Vegan",
+)
+CSV_DTYPES = {
+    **{col: "category" for col in CATEGORICAL_COLUMNS},
+    **{col: str for col in TEXT_COLUMNS},
+}
+
+# Display price column -> numeric column parsed from it at load time
+PRICE_COLUMNS = {
+    "Estimated Price": "estimated_price",
+    "Price": "vegan_price",
+}
+
+# Chunk texts render missing values the way str.format did with the old per-row loop
+MISSING_TEXT = "nan"
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """Parse catalog prices like "$3,186" into floats"""
+    try:
+        return float(str(value).replace('$', '').replace(',', '').strip())
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_prices(values: pd.Series) -> pd.Series:
+    """Parse display prices like "$3,186" into floats; unparseable values become NaN"""
+    # Catalogs repeat a limited set of price strings, so each distinct one is parsed once
+    codes, uniques = pd.factorize(values)
+    cleaned = pd.Series(uniques, dtype=object).astype(str)
+    cleaned = cleaned.str.replace("$", "", regex=False).str.replace(",", "", regex=False).str.strip()
+    parsed = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype="float64")
+    # Code -1 (missing) picks the trailing NaN
+    return pd.Series(np.append(parsed, np.nan)[codes], index=values.index)
+
+
+def prepare_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply catalog dtypes and add the numeric price columns; the display strings are kept as-is"""
+    df = df.astype({col: dtype for col, dtype in CSV_DTYPES.items() if col in df.columns})
+    for display, numeric in PRICE_COLUMNS.items():
+        if display in df.columns:
+            df[numeric] = parse_prices(df[display])
+    return df
+
+
+def read_catalog(csv_path: str) -> pd.DataFrame:
+    """Read the product CSV with explicit dtypes and parsed prices"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    df = pd.read_csv(csv_path, dtype={col: dtype for col, dtype in CSV_DTYPES.items() if col in header})
+    return prepare_catalog(df)
+
+
+def _column_text(df: pd.DataFrame, column: str, default: str) -> np.ndarray:
+    """One column as an object array of display strings"""
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    values = df[column]
+    if not (isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values.dtype)):
+        values = values.astype(str)
+    # Categoricals expand through their codes, so each distinct value is shared, not copied
+    text = values.to_numpy(dtype=object)
+    missing = values.isna().to_numpy()
+    if missing.any():
+        text = text.copy()
+        text[missing] = MISSING_TEXT
+    return text
+
+
+def render_texts(df: pd.DataFrame, template: str, fields: Optional[Mapping[str, str]] = None,
+                 default: str = "Unknown") -> List[str]:
+    """
+    Fill `template` for every row, working column by column
+
+    Each referenced column is converted to strings once; rows are then
+    assembled with a single join instead of a format call per row.
+    Placeholders name a column, or a key of `fields` mapping to one.
+    Columns missing from the frame render as `default`.
+    """
+    fields = fields or {}
+    n = len(df)
+    parts: List[Iterable[str]] = []
+    for literal, field, _, _ in Formatter().parse(template):
+        if literal:
+            parts.append(repeat(literal, n))
+        if field is not None:
+            parts.append(_column_text(df, fields.get(field, field), default))
+    return ["".join(row) for row in zip(*parts)]
+
+
+def build_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Row dicts for chunk metadata, built from whole-column lists rather than per-row Series"""
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*(df[name].tolist() for name in names))]
+
+
+def price_value(metadata: Mapping[str, Any], display: str = "Price") -> Optional[float]:
+    """
+    Numeric price for a chunk's metadata
+
+    Chunks pickled before prices were parsed at load time only carry the
+    display string, so that is parsed as a fallback.
+    """
+    value = metadata.get(PRICE_COLUMNS[display])
+    if value is None:
+        return parse_price(metadata.get(display))
+    value = float(value)
+    return None if math.isnan(value) else value
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Route structured lookup queries to catalog templates instead of Gemini"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from answer_templates import alternatives_answer, listing_answer, price_answer
+from ingest import parse_price, price_value
+
+PRICE_PATTERN = re.compile(
+    r"^(?:what(?:'s| is| are)|how much (?:is|are|does|do)|tell me)\s+(?:the\s+)?"
+    r"(?:price|cost)s?\s+(?:of|for)\s+(?P<subject>.+?)$"
+    r"|^how much (?:is|are|does|do)\s+(?:the\s+|a\s+|an\s+)?(?P<subject2>.+?)(?:\s+cost)?$"
+    r"|^(?:price|cost) of\s+(?P<subject3>.+)$"
+)
+# Anchored, so "alternatives to" inside a longer question goes to the LLM
+ALTERNATIVE_PATTERN = re.compile(
+    r"^(?:(?:what are|what's|show(?: me)?|find|list|give me|suggest|recommend|any)\s+)?"
+    r"(?:(?:some|the|good|best|any)\s+)?"
+    r"(?:vegan|cruelty[- ]free|animal[- ]free)?\s*(?:alternatives?|substitutes?|replacements?|swaps?)\s+"
+    r"(?:to|for|of)\s+(?:an?\s+|the\s+)?(?P<subject>.+)$"
+)
+LISTING_PATTERN = re.compile(
+    r"^(?:list|show(?: me)?|find|give me|any)?\s*(?:all\s+|some\s+)?(?:vegan\s+|cruelty[- ]free\s+)?"
+    r"(?P<subject>[a-z][a-z ]*?)\s+(?:under|below|less than|cheaper than|for less than|up to)\s+"
+    r"\$?\s*(?P<amount>[\d,]+(?:\.\d+)?)\s*(?:dollars|usd)?$"
+)
+# A price cap anywhere in a message: "under $300", "cheaper than 1,200"
+UNDER_PATTERN = re.compile(
+    r"\b(?:under|below|less than|cheaper than|up to)\s+\$?\s*(?P<amount>[\d,]+(?:\.\d+)?)"
+)
+
+# Words users use for each catalog category
+CATEGORY_SYNONYMS = {
+    "Outerwear": ["outerwear", "coat", "jacket", "parka", "puffer", "overcoat", "bomber", "peacoat"],
+    "Handbags": ["handbag", "bag", "purse", "tote", "clutch", "crossbody"],
+    "Footwear": ["footwear", "shoe", "boot", "sneaker", "loafer", "heel", "sandal"],
+    "Accessories": ["accessory", "accessorie", "scarf", "scarve", "glove", "belt"],
+    "Small Leather Goods": ["small leather good", "wallet", "card case", "card holder", "key pouch", "phone case"],
+}
+
+STOPWORDS = {"a", "an", "the", "of", "for", "to", "me", "my", "some", "any", "please", "product", "products", "item", "items"}
+# Words that never name a product: a subject of only these goes to the LLM
+SUBJECT_STOPWORDS = STOPWORDS | {
+    "it", "its", "they", "them", "their", "this", "that", "these", "those", "one", "ones",
+    "in", "on", "at", "by", "with", "and", "or", "is", "are", "was", "be", "do", "does",
+    "what", "which", "how", "much", "cost", "price", "all", "your", "you", "our", "there", "here",
+}
+MIN_TERM_CHARS = 3
+MAX_RESULTS = 10
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so hermes matches Hermès"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _normalize(text: str) -> str:
+    text = _fold(text).strip()
+    text = re.sub(r"[?!.]+$", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _terms(text: str) -> List[str]:
+    words = [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOPWORDS]
+    # Crude singularization so "boots" matches "Boots" and "coats" matches "Overcoat"
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words]
+
+
+def _subject_terms(text: str) -> List[str]:
+    """Terms that can name a product: no pronouns or stop words, at least MIN_TERM_CHARS long"""
+    words = [w for w in re.findall(r"[a-z0-9']+", _fold(text)) if w not in SUBJECT_STOPWORDS]
+    return [t for t in _terms(" ".join(words)) if len(t) >= MIN_TERM_CHARS]
+
+
+class WordIndex:
+    """Rows by the words of their text, matched on whole words or word prefixes"""
+
+    def __init__(self, texts: List[str]):
+        postings: Dict[str, List[int]] = {}
+        for row, text in enumerate(texts):
+            for word in set(_terms(_fold(text))):
+                postings.setdefault(word, []).append(row)
+        self._words = sorted(postings)
+        self._postings = postings
+
+    def has_prefix(self, prefix: str) -> bool:
+        start = bisect.bisect_left(self._words, prefix)
+        return start < len(self._words) and self._words[start].startswith(prefix)
+
+    def rows_with_prefix(self, prefix: str) -> set:
+        start = bisect.bisect_left(self._words, prefix)
+        rows = set()
+        for word in self._words[start:]:
+            if not word.startswith(prefix):
+                break
+            rows.update(self._postings[word])
+        return rows
+
+    def match(self, terms: List[str]) -> List[int]:
+        """Rows in which every term starts a word, in row order"""
+        if not terms:
+            return []
+        rows = self.rows_with_prefix(terms[0])
+        for term in terms[1:]:
+            if not rows:
+                break
+            rows &= self.rows_with_prefix(term)
+        return sorted(rows)
+
+
+def detect_category(text: str) -> Optional[str]:
+    """Map free text like "shoes" or "wallets" to a catalog category"""
+    text = " ".join(_terms(text))
+    for category, words in CATEGORY_SYNONYMS.items():
+        if any(re.search(rf"\b{re.escape(w)}", text) for w in words):
+            return category
+    return None
+
+
+def price_cap(text: str) -> Optional[float]:
+    """The price cap a message names ("under $300" -> 300.0), or None"""
+    m = UNDER_PATTERN.search(text.lower())
+    return parse_price(m.group("amount")) if m else None
+
+
+class RouterStats:
+    """Counts and latency totals for structured vs generated answers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = {"structured": 0, "llm": 0}
+        self._seconds = {"structured": 0.0, "llm": 0.0}
+
+    def record(self, path: str, seconds: float) -> None:
+        with self._lock:
+            self._count[path] += 1
+            self._seconds[path] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._count.values())
+            mean_ms = {
+                path: (self._seconds[path] / n * 1000 if n else None)
+                for path, n in self._count.items()
+            }
+            return {
+                "total": total,
+                "structured": self._count["structured"],
+                "llm": self._count["llm"],
+                "structured_fraction": (self._count["structured"] / total) if total else 0.0,
+                "mean_latency_ms": mean_ms,
+            }
+
+
+class IntentRouter:
+    """
+    Detect lookup queries and answer them from the catalog with templates
+
+    Three intents are handled: price of a product, vegan alternatives to a
+    product or material, and category listings under a price. `route()`
+    returns None for everything else so the caller can use the LLM.
+    """
+
+    def __init__(self, chunks: List[Dict[str, Any]]):
+        self.stats = RouterStats()
+        self._rows: List[Tuple[Optional[float], Dict[str, Any]]] = [
+            (price_value(chunk['metadata']), chunk['metadata']) for chunk in chunks
+        ]
+        # Chunk position by metadata identity, to report which chunks an answer used
+        self._positions = {id(chunk['metadata']): i for i, chunk in enumerate(chunks)}
+        # Price questions are about products, so they match names only; alternatives also match materials
+        self._names = WordIndex([str(m.get("Product Name", "")) for _, m in self._rows])
+        self._described = WordIndex([
+            " ".join(str(m.get(col, "")) for col in ("Product Name", "Category", "Animal Materials Used"))
+            for _, m in self._rows
+        ])
+
+    def catalog_terms(self, text: str) -> List[str]:
+        """
+        Terms of `text` that start a product name, brand or material word
+
+        Words come back as written, not singularized ("less", not "les").
+        Category words ("bags", "wallets") and numbers are left out; they
+        are prices and categories, not a new subject.
+        """
+        found = []
+        for word in re.findall(r"[a-z0-9']+", _fold(text)):
+            terms = _subject_terms(word)
+            if not terms or word.isdigit() or detect_category(word) is not None:
+                continue
+            if self._described.has_prefix(terms[0]):
+                found.append(word)
+        return found
+
+    def _match(self, subject: str, names_only: bool = False) -> List[Dict[str, Any]]:
+        """Catalog rows in which every meaningful subject term starts a word of the name, category or material"""
+        index = self._names if names_only else self._described
+        return [self._rows[row][1] for row in index.match(_subject_terms(subject))]
+
+    def route(self, query: str) -> Optional[str]:
+        """Return a templated markdown answer, or None if the query needs the LLM"""
+        return self.route_with_ids(query)[0]
+
+    def route_with_ids(self, query: str) -> Tuple[Optional[str], List[int]]:
+        """Like `route()`, also returning the chunk ids of the products in the answer"""
+        answer, rows = self._route(query)
+        return answer, [self._positions[id(m)] for m in rows if id(m) in self._positions]
+
+    def _route(self, query: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        text = _normalize(query)
+
+        m = LISTING_PATTERN.search(text)
+        if m:
+            category = detect_category(m.group("subject"))
+            amount = parse_price(m.group("amount"))
+            if category and amount is not None:
+                rows = sorted(
+                    ((price, metadata) for price, metadata in self._rows
+                     if metadata['Category'] == category and price is not None and price <= amount),
+                    key=lambda item: item[0],
+                )
+                shown = [metadata for _, metadata in rows[:MAX_RESULTS]]
+                return listing_answer(category, amount, shown), shown
+
+        m = PRICE_PATTERN.search(text)
+        if m:
+            subject = m.group("subject") or m.group("subject2") or m.group("subject3")
+            rows = self._match(subject, names_only=True)
+            if rows:
+                return price_answer(rows[:MAX_RESULTS], total=len(rows)), rows[:MAX_RESULTS]
+            return None, []
+
+        m = ALTERNATIVE_PATTERN.search(text)
+        if m:
+            subject = m.group("subject")
+            # Only products that name the subject; anything looser is for the LLM to judge
+            rows = self._match(subject)
+            if rows:
+                return alternatives_answer(subject, rows[:MAX_RESULTS // 2]), rows[:MAX_RESULTS // 2]
+        return None, []
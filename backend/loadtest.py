@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP load-test harness for main.py
+
+Starts a fake IUCN v4 server (fake_iucn.py) and main:app with Gemini
+replaced by the local stub, then drives mixed traffic at a fixed request
+rate and reports throughput, p50/p95/p99 latency and error rate per route.
+
+Usage:
+    python loadtest.py --rps 50 --duration 30 --iucn-latency 0.2 --gemini-latency 0.8
+    python loadtest.py --target http://localhost:8000 --rps 20   # existing server, no stand-ins
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_NAME = "luxury_animal_products_vegan_alternatives.csv"
+
+CHAT_MESSAGES = [
+    "What are vegan alternatives to leather handbags?",
+    "Tell me about products that use ostrich leather",
+    "What's the price of Gucci Classic Overcoat?",
+    "list footwear under $200",
+    "How are animals harmed in the wool industry?",
+    "Why should I choose a vegan parka over a down jacket?",
+]
+CATEGORIES = ["Handbags", "Footwear", "Outerwear", "Accessories", "Small Leather Goods"]
+CODES = ["1_1", "2_1", "3_2", "5_1", "6_3"]
+TAXA = [("Panthera", "leo"), ("Loxodonta", "africana"), ("Ailuropoda", "melanoleuca")]
+
+SERVER_BOOTSTRAP = (
+    "import sys, uvicorn, bench_stubs; "
+    "bench_stubs.install_stub_gemini(float(sys.argv[1])); "
+    "uvicorn.run('main:app', host='127.0.0.1', port=int(sys.argv[2]), log_level='warning')"
+)
+
+
+def proxy_request() -> Tuple[str, str, str, Optional[dict]]:
+    kind = random.randrange(5)
+    if kind == 0:
+        return "GET /api/conservation_actions", "GET", "/api/conservation_actions", None
+    if kind == 1:
+        return "GET /api/conservation_actions/{code}", "GET", f"/api/conservation_actions/{random.choice(CODES)}", None
+    if kind == 2:
+        return "GET /api/use_and_trade/{code}", "GET", f"/api/use_and_trade/{random.randint(1, 18)}", None
+    if kind == 3:
+        genus, species = random.choice(TAXA)
+        path = f"/api/v4/taxa/scientific_name?genus_name={genus}&species_name={species}"
+        return "GET /api/v4/taxa/scientific_name", "GET", path, None
+    return "GET /api/assessment/{id}", "GET", f"/api/assessment/{random.randint(1000, 9999)}", None
+
+
+def chat_request():
+    return "POST /api/chatbot/chat", "POST", "/api/chatbot/chat", {"message": random.choice(CHAT_MESSAGES)}
+
+
+def suggestions_request():
+    path = f"/api/chatbot/suggestions?category={random.choice(CATEGORIES)}&max_price={random.choice([150, 300, 1000])}"
+    return "GET /api/chatbot/suggestions", "GET", path, None
+
+
+def categories_request():
+    return "GET /api/chatbot/categories", "GET", "/api/chatbot/categories", None
+
+
+REQUEST_KINDS = {
+    "proxy": proxy_request,
+    "chat": chat_request,
+    "suggestions": suggestions_request,
+    "categories": categories_request,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown traffic kind: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def wait_until_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become ready in {timeout}s")
+
+
+def start_stand_ins(args: argparse.Namespace, workdir: str) -> List[subprocess.Popen]:
+    """Launch fake IUCN and main:app (with stub Gemini) as subprocesses"""
+    fake_env = dict(os.environ,
+                    FAKE_IUCN_LATENCY=str(args.iucn_latency),
+                    FAKE_IUCN_ASSESSMENTS=str(args.iucn_assessments),
+                    FAKE_IUCN_ERROR_RATE=str(args.iucn_error_rate))
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fake_iucn:app", "--host", "127.0.0.1",
+         "--port", str(args.iucn_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=fake_env,
+    )
+
+    # Run the app from a scratch directory so it does not overwrite the saved index
+    shutil.copy(os.path.join(BACKEND_DIR, CSV_NAME), workdir)
+    app_env = dict(os.environ,
+                   PYTHONPATH=BACKEND_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+                   IUCN_BASE_URL=f"http://127.0.0.1:{args.iucn_port}",
+                   IUCN_API_TOKEN="loadtest",
+                   GEMINI_API_KEY="loadtest")
+    app = subprocess.Popen(
+        [sys.executable, "-c", SERVER_BOOTSTRAP, str(args.gemini_latency), str(args.port)],
+        cwd=workdir, env=app_env,
+    )
+    procs = [fake, app]
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.iucn_port}/api/v4/use_and_trade", 30)
+        wait_until_ready(f"http://127.0.0.1:{args.port}/health", args.startup_timeout)
+    except Exception:
+        stop(procs)
+        raise
+    return procs
+
+
+def stop(procs: List[subprocess.Popen]) -> None:
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def drive(target: str, rps: float, duration: float, mix: Dict[str, float], timeout: float) -> Dict:
+    """Open-loop load: requests start on schedule whether or not earlier ones have finished"""
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        async def one(route: str, method: str, path: str, body: Optional[dict]) -> None:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                statuses[route][response.status_code] += 1
+                if response.status_code >= 400:
+                    errors[route] += 1
+            except httpx.HTTPError:
+                statuses[route][0] += 1
+                errors[route] += 1
+            latencies[route].append(time.perf_counter() - start)
+
+        tasks = []
+        total = int(rps * duration)
+        started = time.perf_counter()
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = random.choices(kinds, weights)[0]
+            tasks.append(asyncio.create_task(one(*REQUEST_KINDS[kind]())))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, samples in sorted(latencies.items()):
+        ms = sorted(s * 1000 for s in samples)
+        routes[route] = {
+            "requests": len(ms),
+            "throughput_rps": len(ms) / elapsed,
+            "p50_ms": percentile(ms, 0.50),
+            "p95_ms": percentile(ms, 0.95),
+            "p99_ms": percentile(ms, 0.99),
+            "error_rate": errors[route] / len(ms),
+            "status_codes": dict(statuses[route]),
+        }
+    all_requests = sum(r["requests"] for r in routes.values())
+    return {
+        "target_rps": rps,
+        "achieved_rps": all_requests / elapsed,
+        "elapsed_s": elapsed,
+        "error_rate": (sum(errors.values()) / all_requests) if all_requests else 0.0,
+        "routes": routes,
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n📊 {report['achieved_rps']:.1f} req/s achieved (target {report['target_rps']}), "
+          f"error rate {report['error_rate']:.2%}\n")
+    print(f"{'route':42} {'reqs':>6} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, r in report["routes"].items():
+        print(f"{route:42} {r['requests']:>6} {r['throughput_rps']:>7.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['error_rate']:>7.2%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="Load-test an already running server instead of starting stand-ins")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("proxy=70,chat=10,suggestions=10,categories=10"),
+                        help="Traffic weights, e.g. proxy=70,chat=10,suggestions=10,categories=10")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout")
+    parser.add_argument("--port", type=int, default=8100, help="Port for main:app")
+    parser.add_argument("--iucn-port", type=int, default=8101, help="Port for the fake IUCN server")
+    parser.add_argument("--iucn-latency", type=float, default=0.1, help="Fake IUCN latency in seconds")
+    parser.add_argument("--iucn-assessments", type=int, default=50, help="Assessments per fake IUCN payload")
+    parser.add_argument("--iucn-error-rate", type=float, default=0.0, help="Fraction of fake IUCN 503s")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="Stub Gemini latency in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=300.0, help="Seconds to wait for main:app")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the traffic mix")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    procs: List[subprocess.Popen] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        target = args.target
+        if not target:
+            procs = start_stand_ins(args, workdir)
+            target = f"http://127.0.0.1:{args.port}"
+        try:
+            report = asyncio.run(drive(target, args.rps, args.duration, args.mix, args.timeout))
+        finally:
+            stop(procs)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,41 @@
 import os
-from typing import Optional, Any
+import hmac
+import json
+import asyncio
+from contextlib import closing
+from typing import Optional, Any, Awaitable, Dict, Hashable, NamedTuple, Tuple
 
 import httpx
 import markdown
 from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from starlette.datastructures import MutableHeaders
 from starlette.middleware import Middleware
 from dotenv import load_dotenv
 
 # Import the cruelty-free chatbot
 from cruelty_free_chatbot import CrueltyFreeChatbot
+from catalogs import CATALOGS, CatalogRegistry, UnknownCatalogError, parse_catalogs
+from caching import LRUCache, content_hash
+from metrics import (REGISTRY, REQUESTS_CUT_SHORT, UPSTREAM_IN_FLIGHT, UPSTREAM_RESPONSES, MetricsMiddleware,
+					 register_cache, timed)
+from deadlines import Deadline
+from admission import CLASS_DEFAULTS, AdmissionMiddleware, TrafficClass
+from profiling import Profiler, ProfilingMiddleware
+from sessions import create_session_store, new_session, valid_session_id
+from prefetch import PREFETCH_ON_STARTUP, PrefetchJob
+from compression import UPSTREAM_ACCEPT_ENCODING, CompressionMiddleware, accepted_encodings, decode_body
+from projection import FieldTree, canonical_fields, parse_fields, project
+from mirror import MIRROR_MAX_AGE, MIRROR_PATH, MIRROR_SYNC_ON_STARTUP, IUCNMirror, MirrorSync
 
 load_dotenv()
 
-IUCN_BASE_URL = "https://api.iucnredlist.org"
+IUCN_BASE_URL = os.getenv("IUCN_BASE_URL", "https://api.iucnredlist.org").rstrip("/")
 IUCN_TOKEN = os.getenv("IUCN_API_TOKEN", "").strip()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
 
 if not IUCN_TOKEN:
 	# We still start, but requests will fail with 500 until configured
@@ -26,50 +44,161 @@ if not IUCN_TOKEN:
 if not GEMINI_API_KEY:
 	print("[WARN] GEMINI_API_KEY not set. Set it in backend/.env")
 
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "5000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+PROXY_CACHE_SIZE = int(os.getenv("PROXY_CACHE_SIZE", "1024"))
+PROXY_CACHE_TTL = float(os.getenv("PROXY_CACHE_TTL", "7200"))
+# Browser/CDN caching of catalog endpoints; ETags make revalidation cheap
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=300")
+# Seconds between checks of the FAISS index and metadata files for a new catalog; 0 disables the watcher
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+# Seconds a chat or query request may take before it gets a retrieval-only answer; 0 disables
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "20"))
+# Seconds a proxied IUCN request may take before it is abandoned with 504; 0 disables
+PROXY_DEADLINE = float(os.getenv("PROXY_DEADLINE", "30"))
+# How often a slow request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.25
+# Upstream calls a composite endpoint may have open at once
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+
+# Fields the frontend reads from IUCN payloads
+TAXON_FIELDS = (
+	"sis_id", "scientific_name", "authority", "kingdom_name", "phylum_name", "class_name", "order_name",
+	"family_name", "genus_name", "species_name", "subpopulation_name", "infra_name", "ssc_groups",
+	"common_names", "synonyms",
+)
+ASSESSMENT_FIELDS = ("assessment_id", "year_published", "latest", "red_list_category_code", "url")
+# Latest assessments fetched in full for /api/taxon_profile
+PROFILE_MAX_ASSESSMENTS = int(os.getenv("PROFILE_MAX_ASSESSMENTS", "3"))
+
 allowed_origins_env = os.getenv("ALLOWED_ORIGINS", "*")
 ALLOWED_ORIGINS = [o.strip() for o in allowed_origins_env.split(",") if o.strip()] or ["*"]
 
 app = FastAPI(title="OneEarth IUCN Proxy & Cruelty-Free Shopping Assistant")
 
+# Separate slots and wait queues for chat, IUCN proxy and catalog traffic; innermost, so rejections get CORS headers
+traffic_classes = {name: TrafficClass.from_env(name) for name in CLASS_DEFAULTS}
+app.add_middleware(AdmissionMiddleware, classes=traffic_classes)
 app.add_middleware(
 	CORSMiddleware,
 	allow_origins=ALLOWED_ORIGINS,
 	allow_credentials=True,
 	allow_methods=["*"],
-	allow_headers=["*"]
+	allow_headers=["*"],
+	expose_headers=["Server-Timing", "Retry-After"]
 )
+app.add_middleware(MetricsMiddleware)
+
+profiler = Profiler()
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+app.add_middleware(CompressionMiddleware)
 
 client: Optional[httpx.AsyncClient] = None
-chatbot: Optional[Any] = None  # Will be CrueltyFreeChatbot instance or None
+catalogs: Optional[CatalogRegistry] = None  # Product catalogs and their chatbots, or None without GEMINI_API_KEY
+prefetch_job: Optional[PrefetchJob] = None
+prefetch_task: Optional[asyncio.Task] = None
+mirror: Optional[IUCNMirror] = None
+mirror_sync: Optional[MirrorSync] = None
+mirror_task: Optional[asyncio.Task] = None
+catalog_watch_task: Optional[asyncio.Task] = None
+
+# Successful IUCN GET responses as (status, body, media type, content encoding), keyed by path and query
+CacheEntry = Tuple[int, bytes, str, Optional[str]]
+proxy_cache = LRUCache(max_entries=PROXY_CACHE_SIZE, ttl=PROXY_CACHE_TTL)
+register_cache("iucn_proxy", proxy_cache)
+# Serialized `fields=` projections, keyed by the source response and the field list
+projection_cache = LRUCache(max_entries=PROXY_CACHE_SIZE, ttl=PROXY_CACHE_TTL)
+register_cache("projection", projection_cache)
+# Serialized catalog endpoint bodies, keyed by ETag
+catalog_cache = LRUCache(max_entries=256)
+register_cache("catalog", catalog_cache)
+fanout_limit = asyncio.Semaphore(FANOUT_CONCURRENCY)
+
+# Multi-turn chat history and retrieved chunk ids, keyed by session id
+session_store = create_session_store()
+
+# Rendered HTML for chatbot answers, keyed by a hash of the markdown
+render_cache = LRUCache(max_entries=RENDER_CACHE_SIZE)
+register_cache("markdown_render", render_cache)
+
+def _render_and_store(key: str, answer_md: str) -> str:
+	with timed("markdown_render"):
+		html = markdown.markdown(answer_md, extensions=['extra'], output_format='html5')
+	render_cache.set(key, html)
+	return html
+
+def render_markdown_sync(answer_md: str) -> str:
+	"""Render markdown to HTML, reusing earlier renders of the same text"""
+	key = content_hash(answer_md)
+	html = render_cache.get(key)
+	return html if html is not None else _render_and_store(key, answer_md)
+
+async def render_markdown(answer_md: str) -> str:
+	"""Like render_markdown_sync, but cold renders run in the worker pool"""
+	key = content_hash(answer_md)
+	html = render_cache.get(key)
+	return html if html is not None else await run_in_threadpool(_render_and_store, key, answer_md)
+
+def wants_html(request: dict) -> bool:
+	"""Clients that render markdown themselves send {"format": "markdown"}"""
+	return request.get("format", "html") != "markdown"
 
 @app.on_event("startup")
 async def on_startup() -> None:
-	global client, chatbot
+	global client, catalogs, prefetch_job, prefetch_task, mirror, mirror_sync, mirror_task, catalog_watch_task
 	client = httpx.AsyncClient(base_url=IUCN_BASE_URL, timeout=30.0)
+
+	if MIRROR_PATH:
+		mirror = IUCNMirror(MIRROR_PATH)
+		print(f"[INFO] Serving IUCN responses from local mirror {MIRROR_PATH}")
+		if IUCN_TOKEN:
+			mirror_sync = MirrorSync(mirror, fetch_upstream)
+			if MIRROR_SYNC_ON_STARTUP:
+				mirror_task = asyncio.create_task(mirror_sync.run_forever())
+
+	if IUCN_TOKEN:
+		prefetch_job = PrefetchJob(refresh_proxy_cache)
+		if PREFETCH_ON_STARTUP:
+			prefetch_task = asyncio.create_task(prefetch_job.run_forever())
 	
 	# Initialize the real RAG chatbot if API key is available
 	if GEMINI_API_KEY:
 		try:
 			print(f"[DEBUG] Initializing chatbot with API key: {GEMINI_API_KEY[:10]}...")
-			from cruelty_free_chatbot import CrueltyFreeChatbot
-			csv_path = "luxury_animal_products_vegan_alternatives.csv"
-			chatbot = CrueltyFreeChatbot(csv_path, GEMINI_API_KEY)
-			print("[INFO] Cruelty-free chatbot initialized successfully")
+			catalogs = CatalogRegistry(parse_catalogs(CATALOGS), GEMINI_API_KEY)
+			# The default catalog loads now; the others on their first request
+			catalogs.get()
+			print(f"[INFO] Cruelty-free chatbot initialized successfully (catalogs: {', '.join(catalogs.names())})")
+			if CATALOG_WATCH_INTERVAL > 0:
+				catalog_watch_task = asyncio.create_task(watch_catalog_artifacts())
 		except Exception as e:
 			print(f"[WARN] Failed to initialize cruelty-free chatbot: {e}")
 			import traceback
 			traceback.print_exc()
-			chatbot = None
+			catalogs = None
 	else:
 		print("[WARN] GEMINI_API_KEY not set, cruelty-free chatbot disabled")
-		chatbot = None
+		catalogs = None
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-	global client
+	global client, prefetch_task, mirror, mirror_task, catalog_watch_task
+	if catalog_watch_task is not None:
+		catalog_watch_task.cancel()
+		catalog_watch_task = None
+	if prefetch_task is not None:
+		prefetch_task.cancel()
+		prefetch_task = None
+	if mirror_task is not None:
+		mirror_task.cancel()
+		mirror_task = None
+	if mirror is not None:
+		mirror.close()
+		mirror = None
 	if client is not None:
 		await client.aclose()
 		client = None
@@ -78,35 +207,429 @@ async def on_shutdown() -> None:
 async def health() -> dict:
 	return {"ok": True}
 
-async def forward(method: str, path: str, request: Request) -> Response:
+@app.get("/metrics")
+async def metrics() -> Response:
+	"""Prometheus text exposition of latency histograms, cache and upstream metrics"""
+	return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin(request: Request) -> None:
+	"""Admin endpoints need ADMIN_TOKEN configured and sent as X-Admin-Token"""
+	if not ADMIN_TOKEN:
+		raise HTTPException(status_code=404, detail="Not found")
+	if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+		raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiling")
+async def profiling_status(request: Request) -> dict:
+	"""Current profiling settings and saved profiles"""
+	require_admin(request)
+	return {**profiler.status(), "saved": profiler.list_profiles()}
+
+@app.post("/admin/profiling")
+async def configure_profiling(request: Request) -> dict:
+	"""
+	Turn profiling on or off without redeploying
+
+	Body (all optional):
+	- fraction: share of chatbot and proxy requests to sample, 0 disables
+	- interval_ms: sampling interval
+	- window_seconds: also sample all threads for this many seconds
+	"""
+	require_admin(request)
+	body = await request.json() if await request.body() else {}
+	try:
+		profiler.configure(
+			fraction=float(body["fraction"]) if "fraction" in body else None,
+			interval_ms=float(body["interval_ms"]) if "interval_ms" in body else None,
+		)
+		window = float(body.get("window_seconds", 0))
+	except (TypeError, ValueError):
+		raise HTTPException(status_code=400, detail="fraction, interval_ms and window_seconds must be numbers")
+	if window > 0 and not profiler.start_window(min(window, 600.0)):
+		raise HTTPException(status_code=409, detail="A profiling window is already running")
+	return profiler.status()
+
+@app.get("/admin/admission")
+async def admission_status(request: Request) -> dict:
+	"""Limits, running and waiting requests per traffic class"""
+	require_admin(request)
+	return {name: traffic.stats() for name, traffic in traffic_classes.items()}
+
+@app.get("/admin/prefetch")
+async def prefetch_status(request: Request) -> dict:
+	"""Summary of the last IUCN cache warm-up and the proxy cache size"""
+	require_admin(request)
+	return {
+		"enabled": prefetch_job is not None,
+		"scheduled": prefetch_task is not None,
+		"last_run": prefetch_job.last_run if prefetch_job else {},
+		"proxy_cache": proxy_cache.stats(),
+	}
+
+@app.post("/admin/prefetch")
+async def run_prefetch(request: Request) -> dict:
+	"""Warm the IUCN proxy cache now, e.g. right after a deploy"""
+	require_admin(request)
+	if prefetch_job is None:
+		raise HTTPException(status_code=503, detail="IUCN_API_TOKEN not configured on server")
+	return await prefetch_job.run_once()
+
+@app.get("/admin/mirror")
+async def mirror_status(request: Request) -> dict:
+	"""Row counts and last sync of the local IUCN mirror"""
+	require_admin(request)
+	if mirror is None:
+		return {"enabled": False}
+	return {"enabled": True, "scheduled": mirror_task is not None, **await run_in_threadpool(mirror.status)}
+
+@app.post("/admin/mirror/sync")
+async def run_mirror_sync(request: Request) -> dict:
+	"""Sync the local IUCN mirror now"""
+	require_admin(request)
+	if mirror_sync is None:
+		raise HTTPException(status_code=503, detail="Local IUCN mirror not configured (MIRROR_PATH and IUCN_API_TOKEN)")
+	try:
+		return await mirror_sync.run_once()
+	except RuntimeError as e:
+		raise HTTPException(status_code=409, detail=str(e))
+
+CHATBOT_UNAVAILABLE = "Cruelty-free chatbot not available. Please check GEMINI_API_KEY configuration."
+
+async def get_chatbot(catalog: Optional[str] = None) -> CrueltyFreeChatbot:
+	"""The chatbot for a catalog (the default if None), loading it off the event loop on first use"""
+	if catalogs is None:
+		raise HTTPException(status_code=503, detail=CHATBOT_UNAVAILABLE)
+	try:
+		chatbot = catalogs.peek(catalog, touch=True)
+		if chatbot is None:
+			chatbot = await run_in_threadpool(catalogs.get, catalog)
+	except UnknownCatalogError:
+		raise HTTPException(status_code=404, detail=f"Unknown catalog: {catalog}")
+	except Exception as e:
+		raise HTTPException(status_code=503, detail=f"Catalog {catalog or catalogs.default} failed to load: {e}")
+	return chatbot
+
+async def reload_catalog(catalog: Optional[str], source: str = "csv", csv_path: Optional[str] = None) -> dict:
+	"""Build the new catalog off the event loop, swap it in and drop bodies cached for the old version"""
+	chatbot = await get_chatbot(catalog)
+	report = await run_in_threadpool(chatbot.reload, source, csv_path)
+	await run_in_threadpool(catalogs.update_size, catalogs.resolve(catalog))
+	if report["changed"]:
+		catalog_cache.clear()
+	return report
+
+async def watch_catalog_artifacts() -> None:
+	"""Reload loaded catalogs when another process rewrites their FAISS index and metadata"""
+	while True:
+		await asyncio.sleep(CATALOG_WATCH_INTERVAL)
+		for name, chatbot in (catalogs.loaded() if catalogs else {}).items():
+			try:
+				if chatbot.artifacts_changed():
+					report = await reload_catalog(name, "artifacts")
+					print(f"[INFO] Catalog {name} reloaded from artifacts: {report['version']} in {report['seconds']}s")
+			except RuntimeError:
+				pass  # An admin-triggered reload is running; check again next round
+			except Exception as e:
+				print(f"[WARN] Catalog {name} reload from artifacts failed: {e}")
+
+@app.get("/admin/catalog")
+async def catalog_status(request: Request) -> dict:
+	"""Configured and loaded catalogs, their estimated memory and each one's last reload"""
+	require_admin(request)
+	if catalogs is None:
+		return {"enabled": False}
+	return {
+		"enabled": True,
+		"watching": catalog_watch_task is not None,
+		**catalogs.stats(),
+		"last_reload": {name: chatbot.last_reload for name, chatbot in catalogs.loaded().items()},
+	}
+
+@app.post("/admin/catalog/reload")
+async def trigger_catalog_reload(request: Request) -> dict:
+	"""
+	Reload a chatbot catalog without a restart
+
+	Optional JSON body:
+	- catalog: which catalog (the default if omitted)
+	- source: "csv" (default) re-embeds the CSV and saves new artifacts;
+	  "artifacts" loads the saved FAISS index and metadata
+	- csv_path: CSV to build from instead of the current one
+	"""
+	require_admin(request)
+	body = await request.json() if await request.body() else {}
+	source = body.get("source", "csv")
+	if source not in ("csv", "artifacts"):
+		raise HTTPException(status_code=400, detail="source must be 'csv' or 'artifacts'")
+	chatbot = await get_chatbot(body.get("catalog"))
+	try:
+		return await reload_catalog(body.get("catalog"), source, body.get("csv_path"))
+	except RuntimeError as e:
+		raise HTTPException(status_code=409, detail=str(e))
+	except Exception as e:
+		raise HTTPException(status_code=500, detail=f"Catalog reload failed, still serving {chatbot.catalog_version}: {e}")
+
+@app.get("/admin/profiling/profiles/{name}")
+async def download_profile(name: str, request: Request) -> Response:
+	"""Download a collapsed-stack profile for flamegraph.pl or speedscope"""
+	require_admin(request)
+	path = profiler.profile_path(name)
+	if path is None:
+		raise HTTPException(status_code=404, detail="Profile not found")
+	return FileResponse(path, media_type="text/plain", filename=name)
+
+def proxy_cache_key(path: str, params: Dict[str, str]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+	return (path.strip("/"), tuple(sorted(params.items())))
+
+class UpstreamResponse(NamedTuple):
+	"""An IUCN response with its body exactly as sent, possibly compressed"""
+	status_code: int
+	headers: httpx.Headers
+	raw: bytes
+
+	@property
+	def encoding(self) -> Optional[str]:
+		return self.headers.get("content-encoding")
+
+	@property
+	def content(self) -> bytes:
+		return decode_body(self.raw, self.encoding)
+
+	def cache_entry(self) -> CacheEntry:
+		return (self.status_code, self.raw, self.headers.get("content-type", "application/json"), self.encoding)
+
+async def fetch_upstream(method: str, path: str, params: Dict[str, str], headers: Optional[Dict[str, str]] = None,
+						 content: Optional[bytes] = None) -> UpstreamResponse:
 	if client is None:
 		raise HTTPException(status_code=500, detail="HTTP client not ready")
 	if not IUCN_TOKEN:
 		raise HTTPException(status_code=500, detail="IUCN_API_TOKEN not configured on server")
 
-	# Build upstream request
-	headers = {"Accept": "application/json", "Authorization": IUCN_TOKEN}
+	upstream_headers = {
+		"Accept": "application/json",
+		"Accept-Encoding": UPSTREAM_ACCEPT_ENCODING,
+		"Authorization": IUCN_TOKEN,
+		**(headers or {}),
+	}
+	url = f"/api/v4/{path.lstrip('/')}"
+
+	# Read the body undecoded so compressed IUCN responses can be passed through as-is
+	upstream_request = client.build_request(method, url, params=params, headers=upstream_headers, content=content)
+	with UPSTREAM_IN_FLIGHT.track_in_flight(), timed("iucn_upstream"):
+		upstream = await client.send(upstream_request, stream=True)
+		try:
+			raw = b"".join([chunk async for chunk in upstream.aiter_raw()])
+		finally:
+			await upstream.aclose()
+	UPSTREAM_RESPONSES.inc(status=str(upstream.status_code))
+	return UpstreamResponse(upstream.status_code, upstream.headers, raw)
+
+async def refresh_proxy_cache(path: str, params: Dict[str, str]) -> Tuple[int, bytes, Optional[float]]:
+	"""Fetch a GET from upstream into the proxy cache; used by the prefetch job"""
+	upstream = await fetch_upstream("GET", path, params)
+	if upstream.status_code == 200:
+		proxy_cache.set(proxy_cache_key(path, params), upstream.cache_entry())
+	retry_after = upstream.headers.get("retry-after", "")
+	return upstream.status_code, upstream.content, float(retry_after) if retry_after.isdigit() else None
+
+async def cached_get(path: str, params: Dict[str, str]) -> CacheEntry:
+	"""
+	GET through the proxy cache as (status, body, media type, content encoding)
+
+	With a local mirror configured, fresh mirrored responses are served
+	without calling upstream, and stale ones cover upstream failures.
+	"""
+	key = proxy_cache_key(path, params)
+	cached = proxy_cache.get(key)
+	if cached is not None:
+		return cached
+	if mirror is not None:
+		mirrored = await run_in_threadpool(mirror.get_response, path, params, max_age=MIRROR_MAX_AGE)
+		if mirrored is not None:
+			entry = (200, mirrored[0], mirrored[1], None)
+			proxy_cache.set(key, entry)
+			return entry
+	try:
+		upstream = await fetch_upstream("GET", path, params)
+	except httpx.HTTPError:
+		stale = await run_in_threadpool(mirror.get_response, path, params) if mirror is not None else None
+		if stale is None:
+			raise
+		return (200, stale[0], stale[1], None)
+	if upstream.status_code >= 500 and mirror is not None:
+		stale = await run_in_threadpool(mirror.get_response, path, params)
+		if stale is not None:
+			return (200, stale[0], stale[1], None)
+	entry = upstream.cache_entry()
+	if upstream.status_code == 200:
+		proxy_cache.set(key, entry)
+	return entry
+
+def encoded_response(entry: CacheEntry, request: Request) -> Response:
+	"""Send a cached body compressed as IUCN sent it if the client accepts that, decoded otherwise"""
+	status_code, body, media_type, encoding = entry
+	headers = {}
+	if encoding:
+		if encoding in accepted_encodings(request.headers.get("accept-encoding", "")):
+			headers = {"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+		else:
+			body = decode_body(body, encoding)
+	return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+def parse_fields_param(fields: Optional[str]) -> Optional[FieldTree]:
+	if fields is None:
+		return None
+	try:
+		return parse_fields(fields)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+
+def cached_projection(key: Hashable, tree: FieldTree) -> Optional[Response]:
+	body = projection_cache.get((key, canonical_fields(tree)))
+	return Response(content=body, media_type="application/json") if body is not None else None
+
+def projected_json(key: Hashable, data: Any, tree: FieldTree, cache: bool = True) -> Response:
+	"""JSON response with only the requested fields; cached for later requests unless `cache` is False"""
+	with timed("projection"):
+		body = json.dumps(project(data, tree), separators=(",", ":")).encode("utf-8")
+	if cache:
+		projection_cache.set((key, canonical_fields(tree)), body)
+	return Response(content=body, media_type="application/json")
+
+async def until_disconnect(request: Request, work: Awaitable[Any], kind: str,
+						   deadline: Optional[Deadline] = None) -> Any:
+	"""
+	Await `work`, cancelling it if the client disconnects first
+
+	Cancelling stops pending upstream and Gemini calls and frees their
+	connections; `deadline` is cancelled too, so worker threads the work
+	started skip their remaining stages. A disconnect raises 499 (client
+	closed request), which only shows up in logs and metrics.
+	"""
+	# Body messages come through receive too, so read them before polling it for a disconnect
+	await request.body()
+	task = asyncio.ensure_future(work)
+	try:
+		while True:
+			done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+			if done:
+				return task.result()
+			if await request.is_disconnected():
+				if deadline is not None:
+					deadline.cancel()
+				REQUESTS_CUT_SHORT.inc(kind=kind, reason="disconnect")
+				raise HTTPException(status_code=499, detail="Client closed request")
+	finally:
+		task.cancel()
+
+async def forward(method: str, path: str, request: Request) -> Response:
+	"""Proxy one IUCN request, abandoning it if the client leaves or PROXY_DEADLINE passes"""
+	try:
+		return await until_disconnect(
+			request, asyncio.wait_for(forward_upstream(method, path, request), PROXY_DEADLINE or None), "proxy")
+	except asyncio.TimeoutError:
+		REQUESTS_CUT_SHORT.inc(kind="proxy", reason="deadline")
+		raise HTTPException(status_code=504, detail=f"IUCN request took longer than {PROXY_DEADLINE:g}s")
+
+async def forward_upstream(method: str, path: str, request: Request) -> Response:
+	params = dict(request.query_params)
+	tree = parse_fields_param(params.pop("fields", None))
 	# Preserve If-None-Match etc. if present
-	for h in ("If-None-Match", "If-Modified-Since"):
-		if h in request.headers:
-			headers[h] = request.headers[h]
+	conditional = {h: request.headers[h] for h in ("If-None-Match", "If-Modified-Since") if h in request.headers}
 
-	url = f"/api/v4/{path.lstrip('/')}"
+	# Plain GETs are served from the proxy cache; conditional requests go upstream
+	if method == "GET" and not conditional:
+		if tree is not None:
+			cached = cached_projection(proxy_cache_key(path, params), tree)
+			if cached is not None:
+				return cached
+		entry = await cached_get(path, params)
+		return projected_entry(entry, request, proxy_cache_key(path, params), tree)
 
 	# Only pass through body for non-GET
 	content = await request.body() if method != "GET" else None
+	upstream = await fetch_upstream(method, path, params, headers=conditional, content=content)
 
-	upstream = await client.request(
-		method=method,
-		url=url,
-		params=dict(request.query_params),
-		headers=headers,
-		content=content,
-	)
+	# Return raw response preserving content-type, status and upstream compression;
+	# with fields=, a 200 is projected like a cached one but not cached
+	return projected_entry(upstream.cache_entry(), request, proxy_cache_key(path, params), tree, cache=False)
 
-	# Return raw response preserving content-type and status
-	media_type = upstream.headers.get("content-type", "application/json")
-	return Response(content=upstream.content, status_code=upstream.status_code, media_type=media_type)
+def projected_entry(entry: CacheEntry, request: Request, key: Hashable, tree: Optional[FieldTree],
+					cache: bool = True) -> Response:
+	"""`entry` with only the `fields=` requested; sent as is without fields or when it is not JSON"""
+	if tree is None or entry[0] != 200:
+		return encoded_response(entry, request)
+	try:
+		data = json.loads(decode_body(entry[1], entry[3]))
+	except ValueError:
+		return encoded_response(entry, request)
+	return projected_json(key, data, tree, cache=cache)
+
+async def fetch_json(path: str, params: Optional[Dict[str, str]] = None) -> dict:
+	"""Parsed IUCN JSON for the composite endpoints; upstream errors become HTTP errors"""
+	async with fanout_limit:
+		status_code, body, _, encoding = await cached_get(path, params or {})
+	if status_code != 200:
+		raise HTTPException(status_code=status_code if status_code in (404, 429) else 502,
+							detail=f"IUCN {path} returned {status_code}")
+	return json.loads(decode_body(body, encoding))
+
+def trim_assessment(assessment: dict) -> dict:
+	return {field: assessment.get(field) for field in ASSESSMENT_FIELDS}
+
+def describe(item: Optional[dict]) -> Optional[str]:
+	"""English description of an IUCN code object"""
+	if not item:
+		return None
+	return (item.get("description") or {}).get("en")
+
+def trim_assessment_detail(detail: dict) -> dict:
+	return {
+		"assessment_id": detail.get("assessment_id"),
+		"year_published": detail.get("year_published"),
+		"red_list_category": {
+			"code": (detail.get("red_list_category") or {}).get("code"),
+			"description": describe(detail.get("red_list_category")),
+		},
+		"population_trend": describe(detail.get("population_trend")),
+		"threats": [describe(t) for t in detail.get("threats") or []],
+		"conservation_actions": [describe(c) for c in detail.get("conservation_actions") or []],
+		"habitats": [describe(h) for h in detail.get("habitats") or []],
+	}
+
+async def code_summary(kind: str, item: dict) -> dict:
+	"""One row of a code-list summary: description, assessment count and Red List category breakdown"""
+	summary = {"code": item["code"], "description": describe(item)}
+	try:
+		detail = await fetch_json(f"{kind}/{item['code']}")
+	except HTTPException as e:
+		summary["error"] = e.detail
+		return summary
+	assessments = detail.get("assessments", [])
+	categories: Dict[str, int] = {}
+	for a in assessments:
+		code = a.get("red_list_category_code") or "NA"
+		categories[code] = categories.get(code, 0) + 1
+	summary["assessment_count"] = len(assessments)
+	summary["latest_assessment_count"] = sum(1 for a in assessments if a.get("latest"))
+	summary["categories"] = categories
+	return summary
+
+async def code_list_summary(kind: str, fields: Optional[str] = None) -> Any:
+	"""The code list for `kind` plus every code's details, fetched concurrently"""
+	tree = parse_fields_param(fields)
+	if tree is not None:
+		cached = cached_projection(f"{kind}/summary", tree)
+		if cached is not None:
+			return cached
+	listing = await fetch_json(kind)
+	items = [i for i in listing.get(kind, []) if isinstance(i, dict) and i.get("code")]
+	summaries = await asyncio.gather(*(code_summary(kind, item) for item in items))
+	result = {kind: summaries}
+	if tree is None:
+		return result
+	# Summaries with failed codes are not cached, so the next request retries them
+	return projected_json(f"{kind}/summary", result, tree, cache=not any("error" in s for s in summaries))
 
 # Generic proxy routes for IUCN v4
 @app.api_route("/api/v4/{full_path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
@@ -126,6 +649,11 @@ async def taxa_scientific_name(request: Request) -> Response:
 async def get_conservation_actions(request: Request) -> Response:
 	return await forward("GET", "conservation_actions", request)
 
+@app.get("/api/conservation_actions/summary")
+async def get_conservation_actions_summary(fields: Optional[str] = None) -> Any:
+	"""Every conservation action with its assessment count and Red List category breakdown"""
+	return await code_list_summary("conservation_actions", fields)
+
 @app.get("/api/conservation_actions/{code}")
 async def get_conservation_action_by_code(code: str, request: Request) -> Response:
 	return await forward("GET", f"conservation_actions/{code}", request)
@@ -134,97 +662,351 @@ async def get_conservation_action_by_code(code: str, request: Request) -> Respon
 async def get_use_and_trade(request: Request) -> Response:
 	return await forward("GET", "use_and_trade", request)
 
+@app.get("/api/use_and_trade/summary")
+async def get_use_and_trade_summary(fields: Optional[str] = None) -> Any:
+	"""Every use and trade code with its assessment count and Red List category breakdown"""
+	return await code_list_summary("use_and_trade", fields)
+
 @app.get("/api/use_and_trade/{code}")
 async def get_use_and_trade_by_code(code: str, request: Request) -> Response:
 	return await forward("GET", f"use_and_trade/{code}", request)
 
+@app.get("/api/taxon_profile")
+async def get_taxon_profile(genus: str, species: str, infra: Optional[str] = None,
+							fields: Optional[str] = None) -> Any:
+	"""
+	Everything the taxon page needs in one response
+
+	Looks up the taxon, then fetches its latest assessments concurrently
+	and trims every payload to the fields the UI shows. `fields` trims
+	further, e.g. "taxon.scientific_name,assessments.year_published".
+	"""
+	tree = parse_fields_param(fields)
+	cache_key = ("taxon_profile", genus.lower(), species.lower(), (infra or "").lower())
+	if tree is not None:
+		cached = cached_projection(cache_key, tree)
+		if cached is not None:
+			return cached
+	params = {"genus_name": genus, "species_name": species}
+	if infra:
+		params["infra_name"] = infra
+	data = await fetch_json("taxa/scientific_name", params)
+	taxon = data.get("taxon") or {}
+	assessments = [trim_assessment(a) for a in data.get("assessments", [])]
+	latest = [a for a in assessments if a["latest"] and a["assessment_id"]]
+
+	# Latest assessments (global and regional) are independent lookups
+	details = await asyncio.gather(
+		*(fetch_json(f"assessment/{a['assessment_id']}") for a in latest[:PROFILE_MAX_ASSESSMENTS]),
+		return_exceptions=True,
+	)
+
+	result = {
+		"taxon": {field: taxon.get(field) for field in TAXON_FIELDS if field in taxon},
+		"assessments": assessments,
+		"latest_assessments": [trim_assessment_detail(d) for d in details if isinstance(d, dict)],
+	}
+	if tree is None:
+		return result
+	return projected_json(cache_key, result, tree, cache=all(isinstance(d, dict) for d in details))
+
+def require_mirror() -> IUCNMirror:
+	if mirror is None:
+		raise HTTPException(status_code=404, detail="Local IUCN mirror not configured (set MIRROR_PATH)")
+	return mirror
+
+@app.get("/api/mirror/assessments")
+async def query_mirror_assessments(scientific_name: Optional[str] = None, code: Optional[str] = None,
+								   code_type: Optional[str] = None, category: Optional[str] = None,
+								   latest: Optional[bool] = None, limit: int = 100) -> dict:
+	"""
+	Query mirrored assessments without calling IUCN
+
+	Query parameters (all optional):
+	- scientific_name: e.g. "Panthera leo"
+	- code / code_type: conservation action or use-and-trade code, code_type
+	  "conservation_action" or "use_and_trade"
+	- category: Red List category code, e.g. "EN"
+	- latest: only latest (true) or superseded (false) assessments
+	"""
+	store = require_mirror()
+	assessments = await run_in_threadpool(
+		store.find_assessments, scientific_name=scientific_name, code_type=code_type, code=code,
+		category=category, latest=latest, limit=min(max(limit, 1), 1000),
+	)
+	return {"assessments": assessments}
+
+@app.get("/api/mirror/taxa")
+async def query_mirror_taxa(name: str, limit: int = 20) -> dict:
+	"""Mirrored taxa whose scientific or common name starts with `name`"""
+	store = require_mirror()
+	return {"taxa": await run_in_threadpool(store.find_taxa, name, min(max(limit, 1), 100))}
+
 # New endpoints for the cruelty-free shopping chatbot
 @app.post("/api/chatbot/query")
-async def chatbot_query(request: dict):
+async def chatbot_query(request: dict, http_request: Request):
 	"""
 	Query the cruelty-free shopping chatbot
+
+	Stops when the client disconnects; past CHAT_DEADLINE the answer is built from retrieval alone.
 	"""
-	if not chatbot:
-		raise HTTPException(status_code=503, detail="Cruelty-free chatbot not available. Please check GEMINI_API_KEY configuration.")
+	chatbot = await get_chatbot(request.get("catalog"))
 
 	try:
 		query = request.get("query", "").strip()
 		if not query:
 			raise HTTPException(status_code=400, detail="Query is required")
 
-		answer_md = chatbot.answer_query(query)  # Markdown response
-		
-		answer_html = markdown.markdown(answer_md, extensions=['extra'], output_format='html5')  # Convert to HTML
+		deadline = Deadline(CHAT_DEADLINE)
+		answer_md = await until_disconnect(http_request, chatbot.chat_async(query, None, deadline), "chat",
+										   deadline)  # Markdown response
 
-		return {
-			"answer_markdown": answer_md,
-			"answer_html": answer_html,
-			"query": query
-		}
+		result = {"answer_markdown": answer_md, "query": query}
+		if wants_html(request):
+			result["answer_html"] = await render_markdown(answer_md)
+		return result
 
+	except HTTPException:
+		raise
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
 
+@app.post("/api/chatbot/batch")
+async def chatbot_batch(request: dict):
+	"""
+	Answer many queries in one request
+
+	Body: {"queries": [...], "max_concurrency": 4, "format": "html" | "markdown", "catalog": "..."}
+	Results stream back as NDJSON, one line per query in completion order,
+	each with the query's position in the input list as `index`.
+	"""
+	chatbot = await get_chatbot(request.get("catalog"))
+
+	queries = request.get("queries")
+	if not isinstance(queries, list) or not queries:
+		raise HTTPException(status_code=400, detail="queries must be a non-empty list")
+	if len(queries) > MAX_BATCH_QUERIES:
+		raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+	queries = [str(q).strip() for q in queries]
+	if not all(queries):
+		raise HTTPException(status_code=400, detail="Queries must not be empty")
+	try:
+		max_concurrency = int(request.get("max_concurrency", BATCH_MAX_CONCURRENCY))
+	except (TypeError, ValueError):
+		raise HTTPException(status_code=400, detail="max_concurrency must be an integer")
+	max_concurrency = min(max(max_concurrency, 1), BATCH_MAX_CONCURRENCY)
+	include_html = wants_html(request)
+
+	def ndjson_lines():
+		# Closing the results when the stream stops drops answers not yet started
+		with closing(chatbot.answer_queries(queries, max_concurrency=max_concurrency)) as results:
+			for result in results:
+				if "answer" in result:
+					result["answer_markdown"] = result.pop("answer")
+					if include_html:
+						result["answer_html"] = render_markdown_sync(result["answer_markdown"])
+				yield json.dumps(result) + "\n"
+
+	return StreamingResponse(iterate_in_threadpool(ndjson_lines()), media_type="application/x-ndjson")
+
+def catalog_etag(chatbot: CrueltyFreeChatbot, *parts: Any) -> str:
+	"""Strong ETag for a catalog response: the catalog version plus the query parameters"""
+	return '"%s"' % content_hash("|".join([chatbot.catalog_version, *map(str, parts)]))[:32]
+
+def etag_matches(request: Request, etag: str) -> bool:
+	header = request.headers.get("if-none-match")
+	if not header:
+		return False
+	if header.strip() == "*":
+		return True
+	# If-None-Match uses weak comparison, so W/"x" matches "x"
+	return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def catalog_response(request: Request, etag: str, build) -> Response:
+	"""
+	304 if the client already has this version, otherwise the JSON from `build()`
+
+	Bodies are cached per ETag, so repeat requests for the same catalog
+	version and parameters are not recomputed.
+	"""
+	headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+	if etag_matches(request, etag):
+		return Response(status_code=304, headers=headers)
+	body = catalog_cache.get(etag)
+	if body is None:
+		body = json.dumps(build()).encode("utf-8")
+		catalog_cache.set(etag, body)
+	return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/chatbot/suggestions")
-async def get_product_suggestions(category: Optional[str] = None, max_price: Optional[float] = None):
+async def get_product_suggestions(request: Request, category: Optional[str] = None, max_price: Optional[float] = None,
+                                  catalog: Optional[str] = None):
 	"""
 	Get product suggestions based on filters
 	
 	Query parameters:
 	- category: Product category (e.g., "Handbags", "Footwear")
 	- max_price: Maximum price filter
+	- catalog: Which product catalog (default catalog if omitted)
 	"""
-	if not chatbot:
-		raise HTTPException(status_code=503, detail="Cruelty-free chatbot not available. Please check GEMINI_API_KEY configuration.")
+	chatbot = await get_chatbot(catalog)
 	
 	try:
-		suggestions = chatbot.get_product_suggestions(category=category, max_price=max_price)
+		def build() -> dict:
+			suggestions = chatbot.get_product_suggestions(category=category, max_price=max_price)
+			return {"suggestions": suggestions, "filters": {"category": category, "max_price": max_price}}
 		
-		return {"suggestions": suggestions, "filters": {"category": category, "max_price": max_price}}
+		return catalog_response(request, catalog_etag(chatbot, "suggestions", category, max_price), build)
 		
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Failed to get suggestions: {str(e)}")
 
+@app.get("/api/chatbot/products/{product_id}/similar")
+async def get_similar_products(request: Request, product_id: int, k: int = 5, catalog: Optional[str] = None):
+	"""
+	Products nearest to one product, and the vegan alternatives that best match it
+
+	Served from the kNN graph built with the index, so no embedding or Gemini call is made.
+
+	Query parameters:
+	- k: How many neighbours (capped at SIMILAR_GRAPH_K)
+	- catalog: Which product catalog (default catalog if omitted)
+	"""
+	chatbot = await get_chatbot(catalog)
+	if not 0 <= product_id < len(chatbot.chunks):
+		raise HTTPException(status_code=404, detail=f"Unknown product: {product_id}")
+
+	try:
+		def build() -> dict:
+			return chatbot.similar_products(product_id, k)
+
+		return catalog_response(request, catalog_etag(chatbot, "similar", product_id, k), build)
+
+	except Exception as e:
+		raise HTTPException(status_code=500, detail=f"Failed to get similar products: {str(e)}")
+
+@app.get("/api/chatbot/autocomplete")
+async def autocomplete(q: str = "", limit: int = 10, catalog: Optional[str] = None):
+	"""
+	Typeahead suggestions for the chat box: brands, product names, categories and materials
+
+	Answered from an in-memory prefix index, so it runs on the event loop without an
+	embedding or Gemini call. Bodies are not kept in the catalog cache: every keystroke
+	is a different query.
+
+	Query parameters:
+	- q: What the user has typed so far
+	- limit: How many suggestions (at most AUTOCOMPLETE_MAX_RESULTS)
+	- catalog: Which product catalog (default catalog if omitted)
+	"""
+	chatbot = await get_chatbot(catalog)
+	with timed("autocomplete"):
+		suggestions = chatbot.autocomplete(q[:200], limit)
+	return JSONResponse({"query": q, "suggestions": suggestions}, headers={"Cache-Control": CATALOG_CACHE_CONTROL})
+
+@app.get("/api/chatbot/analytics")
+async def get_price_analytics(request: Request, catalog: Optional[str] = None):
+	"""
+	Average savings from switching to vegan by category and material, and price percentiles
+
+	Computed when the catalog loads and recomputed for the changed groups on reload.
+
+	Query parameters:
+	- catalog: Which product catalog (default catalog if omitted)
+	"""
+	chatbot = await get_chatbot(catalog)
+
+	try:
+		return catalog_response(request, catalog_etag(chatbot, "analytics"), chatbot.price_analytics)
+
+	except Exception as e:
+		raise HTTPException(status_code=500, detail=f"Failed to get price analytics: {str(e)}")
+
 @app.get("/api/chatbot/categories")
-async def get_categories():
+async def get_categories(request: Request, catalog: Optional[str] = None):
 	"""Get all available product categories"""
-	if not chatbot:
-		raise HTTPException(status_code=503, detail="Cruelty-free chatbot not available. Please check GEMINI_API_KEY configuration.")
+	chatbot = await get_chatbot(catalog)
 	
 	try:
-		categories = set()
-		for chunk in chatbot.chunks:
-			categories.add(chunk['metadata']['Category'])
+		def build() -> dict:
+			categories = set()
+			for chunk in chatbot.chunks:
+				categories.add(chunk['metadata']['Category'])
+			return {"categories": sorted(list(categories))}
 		
-		return {"categories": sorted(list(categories))}
+		return catalog_response(request, catalog_etag(chatbot, "categories"), build)
 		
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Failed to get categories: {str(e)}")
 
+@app.get("/api/chatbot/catalogs")
+async def list_catalogs() -> dict:
+	"""Catalog names clients can pass as `catalog`, and which one is the default"""
+	if catalogs is None:
+		raise HTTPException(status_code=503, detail=CHATBOT_UNAVAILABLE)
+	return {"catalogs": catalogs.names(), "default": catalogs.default}
+
+@app.get("/api/chatbot/stats")
+async def get_chatbot_stats(catalog: Optional[str] = None):
+	"""Share of queries answered from catalog templates vs Gemini, with mean latency per path and retrieval stage"""
+	chatbot = await get_chatbot(catalog)
+
+	return {
+		"routing": chatbot.router.stats.snapshot(),
+		"retrieval": chatbot.reranker.snapshot() if chatbot.reranker else None,
+		"render_cache": render_cache.stats(),
+		"sessions": session_store.stats(),
+	}
+
+@app.delete("/api/chatbot/sessions/{session_id}")
+async def end_chat_session(session_id: str) -> dict:
+	"""Forget a chat session's history, e.g. when the user clears the conversation"""
+	if not valid_session_id(session_id):
+		raise HTTPException(status_code=400, detail="Invalid session_id")
+	await run_in_threadpool(session_store.delete, session_id)
+	return {"deleted": session_id}
+
 @app.post("/api/chatbot/chat")
-async def chatbot_chat(request: dict):
+async def chatbot_chat(request: dict, http_request: Request):
 	"""
 	Interactive chat endpoint for the cruelty-free shopping assistant
+
+	Stops when the client disconnects, without saving the turn; past
+	CHAT_DEADLINE the answer is built from retrieval alone.
 	"""
-	if not chatbot:
-		raise HTTPException(status_code=503, detail="Cruelty-free chatbot not available. Please check GEMINI_API_KEY configuration.")
+	chatbot = await get_chatbot(request.get("catalog"))
 
 	try:
 		message = request.get("message", "").strip()
 		if not message:
 			raise HTTPException(status_code=400, detail="Message is required")
 
-		answer_md = chatbot.answer_query(message)  # Markdown response
-		
-		answer_html = markdown.markdown(answer_md, extensions=['extra'], output_format='html5')  # Convert to HTML
-
-		return {
+		# Continue the client's session, or start one the client can send back next turn. Ids are
+		# minted here, so an unknown or expired id starts a new session rather than claiming that id
+		session_id = request.get("session_id")
+		if session_id is not None and not valid_session_id(session_id):
+			raise HTTPException(status_code=400, detail="session_id must be 1-64 letters, digits, '-' or '_'")
+		session = await run_in_threadpool(session_store.get, session_id) if session_id else None
+		if session is None:
+			session = new_session()
+
+		deadline = Deadline(CHAT_DEADLINE)
+		answer_md = await until_disconnect(http_request, chatbot.chat_async(message, session, deadline), "chat",
+										   deadline)  # Markdown response
+		await run_in_threadpool(session_store.save, session)
+
+		result = {
 			"response_markdown": answer_md,
-			"response_html": answer_html,
 			"message": message,
+			"session_id": session["id"],
 			"timestamp": "2024-01-01T00:00:00Z"
 		}
+		if wants_html(request):
+			result["response_html"] = await render_markdown(answer_md)
+		return result
 
+	except HTTPException:
+		raise
 	except Exception as e:
 		print(f"[ERROR] Chatbot error: {str(e)}")
 		raise HTTPException(status_code=500, detail=f"Failed to process chat message: {str(e)}")
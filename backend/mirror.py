@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""Local SQLite mirror of the IUCN v4 endpoints the frontend reads"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from prefetch import CODE_LISTS, PREFETCH_TAXA, parse_taxa
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Empty disables the mirror
+MIRROR_PATH = os.getenv("MIRROR_PATH", "").strip()
+# Mirrored responses older than this are refreshed from upstream on request
+MIRROR_MAX_AGE = float(os.getenv("MIRROR_MAX_AGE", "86400"))
+MIRROR_SYNC_ON_STARTUP = os.getenv("MIRROR_SYNC_ON_STARTUP", "").lower() in ("1", "true", "yes")
+MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", "86400"))
+MIRROR_SYNC_CONCURRENCY = int(os.getenv("MIRROR_SYNC_CONCURRENCY", "4"))
+MIRROR_SYNC_RATE_PER_SEC = float(os.getenv("MIRROR_SYNC_RATE_PER_SEC", "2"))
+# IUCN v4 list endpoints return this many assessments per page
+IUCN_PAGE_SIZE = 100
+MAX_PAGES = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    path TEXT NOT NULL,
+    query TEXT NOT NULL,
+    body BLOB NOT NULL,
+    media_type TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (path, query)
+);
+CREATE TABLE IF NOT EXISTS taxa (
+    sis_id INTEGER PRIMARY KEY,
+    scientific_name TEXT NOT NULL,
+    genus_name TEXT,
+    species_name TEXT,
+    infra_name TEXT,
+    class_name TEXT,
+    common_name TEXT
+);
+CREATE INDEX IF NOT EXISTS taxa_scientific_name ON taxa (scientific_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS taxa_genus_species ON taxa (genus_name COLLATE NOCASE, species_name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS assessments (
+    assessment_id INTEGER PRIMARY KEY,
+    sis_taxon_id INTEGER,
+    taxon_scientific_name TEXT,
+    year_published TEXT,
+    latest INTEGER,
+    red_list_category_code TEXT,
+    url TEXT,
+    detail_synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS assessments_taxon ON assessments (taxon_scientific_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS assessments_sis_taxon ON assessments (sis_taxon_id);
+CREATE TABLE IF NOT EXISTS assessment_codes (
+    code_type TEXT NOT NULL,
+    code TEXT NOT NULL,
+    assessment_id INTEGER NOT NULL,
+    PRIMARY KEY (code_type, code, assessment_id)
+);
+CREATE INDEX IF NOT EXISTS assessment_codes_assessment ON assessment_codes (assessment_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+ASSESSMENT_COLUMNS = ("assessment_id", "sis_taxon_id", "taxon_scientific_name", "year_published",
+                      "latest", "red_list_category_code", "url")
+
+
+def query_key(params: Dict[str, str]) -> str:
+    return urlencode(sorted(params.items()))
+
+
+class IUCNMirror:
+    """
+    Raw IUCN responses plus normalized taxa, assessments and code links
+
+    Raw responses let the proxy routes answer byte-for-byte as upstream
+    would; the normalized tables back the query API. One connection is
+    shared behind a lock, so the mirror can be used from worker threads.
+    """
+
+    def __init__(self, path: str, max_age: float = MIRROR_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # 📦 Raw responses
+
+    def get_response(self, path: str, params: Dict[str, str],
+                     max_age: Optional[float] = None) -> Optional[Tuple[bytes, str, float]]:
+        """(body, media type, fetched_at) for a mirrored GET, or None if missing or older than `max_age`"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, media_type, fetched_at FROM responses WHERE path = ? AND query = ?",
+                (path.strip("/"), query_key(params)),
+            ).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and time.time() - row["fetched_at"] > max_age:
+            return None
+        return row["body"], row["media_type"], row["fetched_at"]
+
+    def validators(self, path: str, params: Dict[str, str]) -> Dict[str, str]:
+        """Conditional request headers for re-fetching a mirrored response"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE path = ? AND query = ?",
+                (path.strip("/"), query_key(params)),
+            ).fetchone()
+        headers = {}
+        if row is not None and row["etag"]:
+            headers["If-None-Match"] = row["etag"]
+        if row is not None and row["last_modified"]:
+            headers["If-Modified-Since"] = row["last_modified"]
+        return headers
+
+    def store_response(self, path: str, params: Dict[str, str], body: bytes, media_type: str,
+                       etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO responses (path, query, body, media_type, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (path, query) DO UPDATE SET body = excluded.body, media_type = excluded.media_type, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, fetched_at = excluded.fetched_at",
+                (path.strip("/"), query_key(params), body, media_type, etag, last_modified, time.time()),
+            )
+
+    def touch_response(self, path: str, params: Dict[str, str]) -> None:
+        """Mark a mirrored response fresh after upstream answered 304"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE path = ? AND query = ?",
+                (time.time(), path.strip("/"), query_key(params)),
+            )
+
+    # 🧬 Normalized records
+
+    def store_assessments(self, assessments: List[dict], code_type: Optional[str] = None,
+                          code: Optional[str] = None, taxon: Optional[dict] = None) -> None:
+        # Assessments listed under a taxon belong to it, whatever else the record says
+        taxon = taxon or {}
+        rows = []
+        for a in assessments:
+            if not isinstance(a, dict) or not a.get("assessment_id"):
+                continue
+            rows.append((
+                a["assessment_id"],
+                taxon.get("sis_id") or a.get("sis_taxon_id"),
+                taxon.get("scientific_name") or a.get("taxon_scientific_name"),
+                a.get("year_published"),
+                1 if a.get("latest") else 0,
+                a.get("red_list_category_code"),
+                a.get("url"),
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO assessments ({', '.join(ASSESSMENT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (assessment_id) DO UPDATE SET "
+                "sis_taxon_id = COALESCE(excluded.sis_taxon_id, sis_taxon_id), "
+                "taxon_scientific_name = COALESCE(excluded.taxon_scientific_name, taxon_scientific_name), "
+                "year_published = excluded.year_published, latest = excluded.latest, "
+                "red_list_category_code = excluded.red_list_category_code, url = excluded.url",
+                rows,
+            )
+            if code_type and code:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO assessment_codes (code_type, code, assessment_id) VALUES (?, ?, ?)",
+                    [(code_type, code, row[0]) for row in rows],
+                )
+
+    def store_taxon(self, taxon: dict) -> None:
+        if not taxon.get("sis_id") or not taxon.get("scientific_name"):
+            return
+        main_name = next((n.get("name") for n in taxon.get("common_names") or [] if n.get("main")), None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO taxa (sis_id, scientific_name, genus_name, species_name, infra_name, "
+                "class_name, common_name) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (taxon["sis_id"], taxon["scientific_name"], taxon.get("genus_name"), taxon.get("species_name"),
+                 taxon.get("infra_name"), taxon.get("class_name"), main_name),
+            )
+
+    def mark_detail_synced(self, assessment_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE assessments SET detail_synced = 1 WHERE assessment_id = ?", (assessment_id,))
+
+    def assessments_missing_detail(self, assessment_ids: List[int]) -> List[int]:
+        if not assessment_ids:
+            return []
+        placeholders = ",".join("?" * len(assessment_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT assessment_id FROM assessments WHERE detail_synced = 1 AND assessment_id IN ({placeholders})",
+                assessment_ids,
+            ).fetchall()
+        synced = {row["assessment_id"] for row in rows}
+        return [i for i in assessment_ids if i not in synced]
+
+    def set_state(self, key: str, value: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                               (key, json.dumps(value)))
+
+    def get_state(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    # 🔍 Query API
+
+    def find_assessments(self, scientific_name: Optional[str] = None, code_type: Optional[str] = None,
+                         code: Optional[str] = None, category: Optional[str] = None,
+                         latest: Optional[bool] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        sql = f"SELECT DISTINCT {', '.join('a.' + c for c in ASSESSMENT_COLUMNS)} FROM assessments a"
+        where, args = [], []
+        if code is not None:
+            sql += " JOIN assessment_codes c ON c.assessment_id = a.assessment_id"
+            where.append("c.code = ?")
+            args.append(code)
+            if code_type is not None:
+                where.append("c.code_type = ?")
+                args.append(code_type)
+        if scientific_name:
+            where.append("a.taxon_scientific_name = ? COLLATE NOCASE")
+            args.append(scientific_name)
+        if category:
+            where.append("a.red_list_category_code = ?")
+            args.append(category.upper())
+        if latest is not None:
+            where.append("a.latest = ?")
+            args.append(1 if latest else 0)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.year_published DESC, a.assessment_id LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [{**dict(row), "latest": bool(row["latest"])} for row in rows]
+
+    def find_taxa(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Taxa whose scientific or main common name starts with `name`"""
+        pattern = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM taxa WHERE scientific_name LIKE ? ESCAPE '\\' OR common_name LIKE ? ESCAPE '\\' "
+                "ORDER BY scientific_name LIMIT ?",
+                (pattern, pattern, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("responses", "taxa", "assessments", "assessment_codes")
+            }
+        return {"path": self.path, "max_age": self.max_age, "counts": counts,
+                "last_sync": self.get_state("last_sync")}
+
+
+# (path, params, headers) -> upstream response
+Fetcher = Callable[..., Awaitable[Any]]
+
+
+class MirrorSync:
+    """
+    Pages through the IUCN endpoints the frontend uses and stores them in the mirror
+
+    Re-syncs are incremental: every request carries the ETag/Last-Modified
+    seen last time, so unchanged pages come back as 304 and are only marked
+    fresh. IUCN never edits a published assessment (a reassessment gets a
+    new id and a newer year_published), so assessment details are fetched
+    only for latest assessments the mirror has not stored yet.
+    """
+
+    def __init__(self, mirror: IUCNMirror, fetch: Fetcher, taxa: Optional[List[Tuple[str, str]]] = None,
+                 concurrency: int = MIRROR_SYNC_CONCURRENCY, rate_per_sec: float = MIRROR_SYNC_RATE_PER_SEC,
+                 interval: float = MIRROR_SYNC_INTERVAL):
+        self.mirror = mirror
+        self.fetch = fetch
+        self.taxa = taxa if taxa is not None else parse_taxa(PREFETCH_TAXA)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate_per_sec, max(1.0, rate_per_sec))
+        self.interval = interval
+        self.last_run: Dict[str, Any] = {}
+        self._run_lock = asyncio.Lock()
+
+    async def _get(self, path: str, params: Dict[str, str], counts: Counter,
+                   attempts: int = 3) -> Tuple[Optional[dict], bool]:
+        """(parsed body, changed) for one GET, tallied in the run's `counts`; changed is False on 304"""
+        for _ in range(attempts):
+            await self.bucket.acquire_async()
+            # Held only for the request, so a throttled path does not keep a slot through its backoff
+            async with self.semaphore:
+                headers = await asyncio.to_thread(self.mirror.validators, path, params)
+                try:
+                    upstream = await self.fetch("GET", path, params, headers=headers)
+                except Exception as e:
+                    logger.warning(f"⚠️ Mirror sync of {path} failed: {e}")
+                    break
+            if upstream.status_code == 429:
+                retry_after = upstream.headers.get("retry-after", "")
+                self.bucket.pause(float(retry_after) if retry_after.isdigit() else 5.0)
+                continue
+            if upstream.status_code == 304:
+                counts["not_modified"] += 1
+                await asyncio.to_thread(self.mirror.touch_response, path, params)
+                stored = await asyncio.to_thread(self.mirror.get_response, path, params)
+                return (json.loads(stored[0]) if stored else None), False
+            if upstream.status_code != 200:
+                logger.warning(f"⚠️ Mirror sync of {path} returned {upstream.status_code}")
+                break
+            counts["fetched"] += 1
+            await asyncio.to_thread(
+                self.mirror.store_response, path, params, upstream.content,
+                upstream.headers.get("content-type", "application/json"),
+                upstream.headers.get("etag"), upstream.headers.get("last-modified"),
+            )
+            return json.loads(upstream.content), True
+        counts["failed"] += 1
+        return None, False
+
+    async def _sync_code(self, kind: str, code: str, counts: Counter) -> None:
+        path = f"{kind}/{code}"
+        code_type = kind.rstrip("s")
+        for page in range(1, MAX_PAGES + 1):
+            # Page 1 is requested without a page parameter so it matches what the proxy routes ask for
+            params = {"page": str(page)} if page > 1 else {}
+            data, changed = await self._get(path, params, counts)
+            if data is None:
+                return
+            assessments = data.get("assessments", [])
+            if changed:
+                await asyncio.to_thread(self.mirror.store_assessments, assessments, code_type, code)
+            if len(assessments) < IUCN_PAGE_SIZE:
+                return
+
+    async def _sync_taxon(self, genus: str, species: str, counts: Counter) -> List[int]:
+        """Sync one taxon and return its latest assessment ids"""
+        data, changed = await self._get("taxa/scientific_name", {"genus_name": genus, "species_name": species},
+                                        counts)
+        if data is None:
+            return []
+        taxon = data.get("taxon") or {}
+        assessments = data.get("assessments", [])
+        if changed:
+            await asyncio.to_thread(self.mirror.store_taxon, taxon)
+            await asyncio.to_thread(self.mirror.store_assessments, assessments, None, None, taxon)
+        return [a["assessment_id"] for a in assessments if a.get("latest") and a.get("assessment_id")]
+
+    async def _sync_assessment(self, assessment_id: int, counts: Counter) -> None:
+        data, _ = await self._get(f"assessment/{assessment_id}", {}, counts)
+        if data is not None:
+            await asyncio.to_thread(self.mirror.mark_detail_synced, assessment_id)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Sync every configured endpoint once and return a summary
+
+        Raises RuntimeError if a sync is already running, e.g. an admin
+        trigger during a scheduled run.
+        """
+        if self._run_lock.locked():
+            raise RuntimeError("A mirror sync is already running")
+        async with self._run_lock:
+            return await self._run(Counter(fetched=0, not_modified=0, failed=0))
+
+    async def _run(self, counts: Counter) -> Dict[str, Any]:
+        start = time.perf_counter()
+        lists = await asyncio.gather(*(self._get(kind, {}, counts) for kind in CODE_LISTS))
+        codes = [
+            (kind, str(item["code"]))
+            for kind, (data, _) in zip(CODE_LISTS, lists)
+            for item in (data or {}).get(CODE_LISTS[kind], [])
+            if isinstance(item, dict) and item.get("code")
+        ]
+        await asyncio.gather(*(self._sync_code(kind, code, counts) for kind, code in codes))
+
+        latest = await asyncio.gather(*(self._sync_taxon(genus, species, counts) for genus, species in self.taxa))
+        missing = await asyncio.to_thread(self.mirror.assessments_missing_detail, [i for ids in latest for i in ids])
+        await asyncio.gather(*(self._sync_assessment(i, counts) for i in missing))
+
+        self.last_run = {"finished_at": time.time(), "seconds": time.perf_counter() - start, **counts}
+        await asyncio.to_thread(self.mirror.set_state, "last_sync", self.last_run)
+        logger.info(f"✅ Mirror sync: {counts['fetched']} fetched, {counts['not_modified']} unchanged, "
+                    f"{counts['failed']} failed in {self.last_run['seconds']:.1f}s")
+        return self.last_run
+
+    async def run_forever(self) -> None:
+        """Sync now, then again every `interval` seconds until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except RuntimeError:
+                pass  # An admin-triggered sync is running; the next round picks up after it
+            except Exception as e:
+                logger.error(f"❌ Mirror sync failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Warm the IUCN proxy cache for code lists, per-code details and popular taxa"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ON_STARTUP = os.getenv("PREFETCH_ON_STARTUP", "").lower() in ("1", "true", "yes")
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "3600"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+PREFETCH_RATE_PER_SEC = float(os.getenv("PREFETCH_RATE_PER_SEC", "2"))
+# Semicolon-separated "Genus species" names
+PREFETCH_TAXA = os.getenv(
+    "PREFETCH_TAXA",
+    "Panthera leo;Panthera tigris;Loxodonta africana;Ailuropoda melanoleuca;Gorilla gorilla;"
+    "Ursus maritimus;Rhinoceros unicornis;Balaenoptera musculus",
+)
+
+# (path, params) -> (status code, body, Retry-After seconds or None)
+Fetcher = Callable[[str, Dict[str, str]], Awaitable[Tuple[int, bytes, Optional[float]]]]
+
+# Code list endpoints and the key holding their items
+CODE_LISTS = {
+    "conservation_actions": "conservation_actions",
+    "use_and_trade": "use_and_trade",
+}
+
+
+def parse_taxa(text: str) -> List[Tuple[str, str]]:
+    taxa = []
+    for name in text.split(";"):
+        parts = name.split()
+        if len(parts) >= 2:
+            taxa.append((parts[0], parts[1]))
+    return taxa
+
+
+class PrefetchJob:
+    """
+    Fetch a fixed set of IUCN endpoints through the proxy cache
+
+    `fetch` must go through the same cache as the proxy routes so a later
+    browser request is a hit. Requests run with bounded concurrency, are
+    paced by a token bucket and back off when upstream answers 429.
+    """
+
+    def __init__(self, fetch: Fetcher, taxa: Optional[List[Tuple[str, str]]] = None,
+                 concurrency: int = PREFETCH_CONCURRENCY, rate_per_sec: float = PREFETCH_RATE_PER_SEC,
+                 interval: float = PREFETCH_INTERVAL):
+        self.fetch = fetch
+        self.taxa = taxa if taxa is not None else parse_taxa(PREFETCH_TAXA)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate_per_sec, max(1.0, rate_per_sec))
+        self.interval = interval
+        self.last_run: Dict[str, Any] = {}
+
+    async def _get(self, path: str, params: Optional[Dict[str, str]] = None, attempts: int = 3) -> Optional[bytes]:
+        for _ in range(attempts):
+            await self.bucket.acquire_async()
+            # Held only for the request, so a throttled path does not keep a slot through its backoff
+            async with self.semaphore:
+                try:
+                    status, body, retry_after = await self.fetch(path, params or {})
+                except Exception as e:
+                    logger.warning(f"⚠️ Prefetch of {path} failed: {e}")
+                    return None
+            if status == 429:
+                # Upstream throttles the whole job, not one path: pause every request
+                self.bucket.pause(retry_after or 5.0)
+                continue
+            if status != 200:
+                logger.warning(f"⚠️ Prefetch of {path} returned {status}")
+                return None
+            return body
+        return None
+
+    async def _codes(self, path: str) -> Optional[List[str]]:
+        body = await self._get(path)
+        if body is None:
+            return None
+        try:
+            items = json.loads(body).get(CODE_LISTS[path], [])
+        except (ValueError, AttributeError):
+            return None
+        return [str(item["code"]) for item in items if isinstance(item, dict) and item.get("code")]
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Warm every configured endpoint once and return a summary"""
+        start = time.perf_counter()
+        code_lists = await asyncio.gather(*(self._codes(path) for path in CODE_LISTS))
+        requests = [(f"{path}/{code}", {}) for path, codes in zip(CODE_LISTS, code_lists) for code in codes or []]
+        requests += [
+            ("taxa/scientific_name", {"genus_name": genus, "species_name": species})
+            for genus, species in self.taxa
+        ]
+        results = await asyncio.gather(*(self._get(path, params) for path, params in requests))
+        warmed = sum(1 for c in code_lists if c is not None) + sum(1 for r in results if r is not None)
+        self.last_run = {
+            "finished_at": time.time(),
+            "seconds": time.perf_counter() - start,
+            "requested": len(CODE_LISTS) + len(requests),
+            "warmed": warmed,
+        }
+        logger.info(f"✅ Prefetched {warmed} IUCN responses in {self.last_run['seconds']:.1f}s")
+        return self.last_run
+
+    async def run_forever(self) -> None:
+        """Warm now, then again every `interval` seconds until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Prefetch run failed: {e}")
+            await asyncio.sleep(self.interval)
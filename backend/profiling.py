@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Opt-in wall-clock stack sampling for production request paths"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+# Request paths eligible for per-request sampling
+PROFILED_PREFIXES = ("/api/chatbot", "/api/v4", "/api/assessment", "/api/taxa",
+                     "/api/conservation_actions", "/api/use_and_trade")
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+
+class StackSampler:
+    """
+    Samples the stacks of every Python thread on a fixed interval
+
+    Stacks are stored collapsed ("outer;inner;leaf count"), the input format
+    of flamegraph.pl and speedscope. Work for one request hops between the
+    event loop and worker threads, so all threads are sampled; frames from
+    other concurrent requests show up too.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Admin-controlled profiling modes
+
+    - Sampled requests: a `fraction` of eligible requests run under their own
+      sampler (one at a time, so overhead stays bounded).
+    - Window: all threads are sampled for a fixed number of seconds.
+
+    Each profile is written to PROFILE_DIR as a .folded file.
+    """
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, prefixes: Sequence[str] = PROFILED_PREFIXES):
+        self.profile_dir = profile_dir
+        self.prefixes = tuple(prefixes)
+        self.fraction = 0.0
+        self.interval = 0.005
+        self.window_ends_at: Optional[float] = None
+        self._request_sampler_busy = threading.Lock()
+        self._window_lock = threading.Lock()
+
+    def configure(self, fraction: Optional[float] = None, interval_ms: Optional[float] = None) -> None:
+        if fraction is not None:
+            self.fraction = min(1.0, max(0.0, fraction))
+        if interval_ms is not None:
+            self.interval = max(0.001, interval_ms / 1000)
+
+    def should_sample(self, path: str) -> bool:
+        return self.fraction > 0 and path.startswith(self.prefixes) and random.random() < self.fraction
+
+    def start_request(self) -> Optional[StackSampler]:
+        """A running sampler for this request, or None if another request holds it"""
+        if not self._request_sampler_busy.acquire(blocking=False):
+            return None
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def finish_request(self, sampler: StackSampler, method: str, path: str, seconds: float) -> None:
+        sampler.stop()
+        self._request_sampler_busy.release()
+        slug = re.sub(r"[^\w]+", "_", path.strip("/"))[:60] or "root"
+        self._write(f"request-{method.lower()}-{slug}-{seconds * 1000:.0f}ms", sampler)
+
+    def start_window(self, seconds: float) -> bool:
+        """Sample all threads for `seconds` in the background; False if a window is already running"""
+        if not self._window_lock.acquire(blocking=False):
+            return False
+        self.window_ends_at = time.time() + seconds
+        sampler = StackSampler(self.interval)
+        sampler.start()
+
+        def finish() -> None:
+            try:
+                sampler.stop()
+                self._write(f"window-{seconds:g}s", sampler)
+            finally:
+                self.window_ends_at = None
+                self._window_lock.release()
+
+        timer = threading.Timer(seconds, finish)
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _write(self, label: str, sampler: StackSampler) -> None:
+        if not sampler.samples:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        with open(os.path.join(self.profile_dir, f"{stamp}-{label}.folded"), "w") as f:
+            f.write(sampler.collapsed())
+        self._prune()
+
+    def _prune(self) -> None:
+        profiles = self.list_profiles()
+        for old in profiles[PROFILE_MAX_FILES:]:
+            os.remove(os.path.join(self.profile_dir, old["name"]))
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Saved profiles, newest first"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        names = sorted((n for n in os.listdir(self.profile_dir) if PROFILE_NAME.match(n)), reverse=True)
+        return [{"name": n, "bytes": os.path.getsize(os.path.join(self.profile_dir, n))} for n in names]
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Filesystem path for a saved profile, rejecting anything that is not a plain profile name"""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "fraction": self.fraction,
+            "interval_ms": self.interval * 1000,
+            "window_active": self.window_ends_at is not None,
+            "window_ends_at": self.window_ends_at,
+            "profiles": len(self.list_profiles()),
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs a sampled fraction of eligible requests under the stack sampler"""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        sampler = self.profiler.start_request()
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.finish_request(sampler, scope["method"], scope["path"], time.perf_counter() - start)
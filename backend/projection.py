@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""`fields=` projection that trims JSON payloads to the keys a client asks for"""
+
+from typing import Any, Dict
+
+MAX_FIELDS = 64
+
+FieldTree = Dict[str, "FieldTree"]
+
+
+def parse_fields(text: str) -> FieldTree:
+    """
+    Parse "taxon.scientific_name,assessments.year_published" into a tree
+
+    Dotted paths walk into nested objects; a path through a list applies to
+    every element. Raises ValueError for empty or oversized field lists.
+    """
+    paths = [p.strip() for p in text.split(",") if p.strip()]
+    if not paths:
+        raise ValueError("fields must list at least one field")
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields")
+    tree: FieldTree = {}
+    for path in paths:
+        node = tree
+        for part in path.split("."):
+            if not part:
+                raise ValueError(f"Invalid field path: {path}")
+            node = node.setdefault(part, {})
+    return tree
+
+
+def canonical_fields(tree: FieldTree) -> str:
+    """Order-independent form of a field tree, for cache keys"""
+    return ",".join(
+        f"{name}({canonical_fields(sub)})" if sub else name for name, sub in sorted(tree.items())
+    )
+
+
+def project(data: Any, tree: FieldTree) -> Any:
+    """Keep only the fields in `tree`; leaves keep their whole value"""
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [project(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {name: project(data[name], sub) for name, sub in tree.items() if name in data}
+    return data
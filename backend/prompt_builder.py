@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Token-budgeted prompt assembly for the RAG chatbots"""
+
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+# Catalog column -> label used in the prompt, in display order
+FIELD_LABELS = [
+    ("Product Name", "Product"),
+    ("Category", "Category"),
+    ("Animal Materials Used", "Materials from animals"),
+    ("Animal Cruelty Flag", "Animal cruelty flag"),
+    ("Cruelty Note", "Cruelty Note"),
+    ("Estimated Price", "Price"),
+    ("Vegan Alternative", "Vegan Alternative"),
+    ("Material", "Vegan Material"),
+    ("Price", "Vegan Price"),
+    ("Why Choose Vegan", "Why choose vegan"),
+]
+BASE_FIELDS = ("Product Name", "Category", "Vegan Alternative")
+NOTE_FIELDS = ("Cruelty Note", "Why Choose Vegan")
+
+# Extra fields to include when the query mentions one of the keywords
+INTENT_FIELDS = {
+    "price": (("Estimated Price", "Price"),
+              ["price", "cost", "cheap", "afford", "budget", "expensive", "$", "under", "save", "saving"]),
+    "materials": (("Animal Materials Used", "Material"),
+                  ["material", "made", "leather", "fur", "wool", "silk", "down", "skin", "cork", "fabric"]),
+    "cruelty": (("Animal Materials Used", "Animal Cruelty Flag", "Cruelty Note"),
+                ["cruel", "harm", "suffer", "kill", "animal", "ethic", "welfare", "hurt"]),
+    "why": (("Material", "Why Choose Vegan"),
+            ["why", "benefit", "sustainab", "environment", "eco", "planet", "choose", "better"]),
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def _note_sentences(value: Any) -> List[str]:
+    """Sentences of a note, none for a missing, blank or NaN one"""
+    text = str(value if value is not None else "").strip()
+    if text.lower() in ("", "nan", "none"):
+        return []
+    return [s for s in SENTENCE_SPLIT.split(text) if s]
+
+
+class PromptBuilder:
+    """
+    Build compact prompts from retrieved chunks
+
+    Only the catalog fields relevant to the query are included. Note
+    sentences repeated across the retrieved products (the generator reuses
+    the same cruelty and sustainability text for many rows) are listed once
+    under "Shared notes" and referenced by number. Products are added in
+    retrieval order until the token budget is spent.
+
+    Token counts use the embedding model's local tokenizer when one is
+    given; it is not Gemini's tokenizer but tracks it closely enough for
+    budgeting. Without one, words and punctuation are counted.
+    """
+
+    def __init__(self, tokenizer: Any = None, token_budget: int = PROMPT_TOKEN_BUDGET):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return len(WORD_PATTERN.findall(text))
+
+    def select_fields(self, query: str) -> Tuple[str, ...]:
+        """Catalog columns worth sending for this query; all of them for open-ended questions"""
+        text = query.lower()
+        wanted = set(BASE_FIELDS)
+        matched = False
+        for fields, keywords in INTENT_FIELDS.values():
+            if any(k in text for k in keywords):
+                wanted.update(fields)
+                matched = True
+        if not matched:
+            return tuple(col for col, _ in FIELD_LABELS)
+        return tuple(col for col, _ in FIELD_LABELS if col in wanted)
+
+    def build_context(self, chunks: Sequence[Dict[str, Any]], fields: Sequence[str],
+                      max_tokens: Optional[int] = None) -> str:
+        """Render chunks into a context block of at most `max_tokens` tokens"""
+        if max_tokens is None:
+            max_tokens = self.token_budget
+        if max_tokens <= 0:
+            return ""
+        context = ""
+        for n in range(1, len(chunks) + 1):
+            candidate = self._render(chunks[:n], fields)
+            if self.count_tokens(candidate) > max_tokens:
+                if n == 1:
+                    # Even one product is over budget: send as many of its lines as fit
+                    context = self._truncate(candidate, max_tokens)
+                break
+            context = candidate
+        return context
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Leading whole lines of `text` within `max_tokens`"""
+        kept = []
+        for line in text.split("\n"):
+            if self.count_tokens("\n".join(kept + [line])) > max_tokens:
+                break
+            kept.append(line)
+        return "\n".join(kept).strip()
+
+    def context_budget(self, query: str, template: Callable[[str, str], str]) -> int:
+        """Tokens left for context once the template and query are counted"""
+        return max(0, self.token_budget - self.count_tokens(template(query, "")))
+
+    def build(self, query: str, chunks: Sequence[Dict[str, Any]],
+              template: Callable[[str, str], str]) -> str:
+        """Fill `template(query, context)` with as much context as the budget allows"""
+        fields = self.select_fields(query)
+        context = self.build_context(chunks, fields, self.context_budget(query, template))
+        return template(query, context)
+
+    def _render(self, chunks: Sequence[Dict[str, Any]], fields: Sequence[str]) -> str:
+        notes = [f for f in NOTE_FIELDS if f in fields]
+        sentences_per_chunk: List[Dict[str, List[str]]] = []
+        counts: Counter = Counter()
+        for chunk in chunks:
+            split = {f: _note_sentences(chunk['metadata'].get(f)) for f in notes}
+            sentences_per_chunk.append(split)
+            for sentences in split.values():
+                counts.update(set(sentences))
+
+        shared: Dict[str, int] = {}
+        blocks = []
+        for chunk, split in zip(chunks, sentences_per_chunk):
+            metadata = chunk['metadata']
+            lines = []
+            for col, label in FIELD_LABELS:
+                if col not in fields:
+                    continue
+                if col in split:
+                    if not split[col]:
+                        continue
+                    parts = []
+                    for sentence in split[col]:
+                        if counts[sentence] > 1:
+                            ref = shared.setdefault(sentence, len(shared) + 1)
+                            parts.append(f"[{ref}]")
+                        else:
+                            parts.append(sentence)
+                    value = " ".join(parts)
+                else:
+                    value = metadata.get(col, "")
+                lines.append(f"{label}: {value}")
+            blocks.append("\n".join(lines))
+
+        context = "\n\n".join(blocks)
+        if shared:
+            context += "\n\nShared notes:\n" + "\n".join(f"[{ref}] {s}" for s, ref in shared.items())
+        return context
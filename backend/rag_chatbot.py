@@ -2,7 +2,6 @@
 """Improved Cruelty-Free Shopping RAG with Gemini API"""
 
 import os
-import pandas as pd
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
@@ -11,6 +10,11 @@ import google.generativeai as genai
 from typing import List, Dict, Any
 import logging
 
+from gemini_client import GeminiClient, GeminiUnavailableError
+from answer_templates import retrieval_only_answer
+from prompt_builder import PromptBuilder
+from ingest import build_records, read_catalog, render_texts
+
 # ------------------------------
 # 1️⃣ Setup logging
 # ------------------------------
@@ -43,6 +47,19 @@ Vegan Material: {vegan_material}
 Vegan Price: ${vegan_price}
 Why choose vegan: {why_vegan}
 """
+    # Template placeholder -> catalog column
+    CHUNK_FIELDS = {
+        "product_name": "Product Name",
+        "category": "Category",
+        "animal_materials": "Animal Materials Used",
+        "cruelty_flag": "Animal Cruelty Flag",
+        "cruelty_note": "Cruelty Note",
+        "price": "Estimated Price",
+        "vegan_alternative": "Vegan Alternative",
+        "vegan_material": "Material",
+        "vegan_price": "Price",
+        "why_vegan": "Why Choose Vegan",
+    }
 
 # ------------------------------
 # 3️⃣ Data Processor
@@ -58,7 +75,7 @@ class DataProcessor:
     def load_data(self) -> bool:
         """Load CSV data with error handling"""
         try:
-            self.df = pd.read_csv(self.csv_path)
+            self.df = read_catalog(self.csv_path)
             logger.info(f"✅ Loaded {len(self.df)} products from CSV")
             return True
         except FileNotFoundError:
@@ -74,25 +91,12 @@ class DataProcessor:
             logger.error("❌ No data loaded. Call load_data() first.")
             return []
         
-        chunks = []
-        for _, row in self.df.iterrows():
-            try:
-                text = Config.CHUNK_TEMPLATE.format(
-                    product_name=row.get('Product Name', 'Unknown'),
-                    category=row.get('Category', 'Unknown'),
-                    animal_materials=row.get('Animal Materials Used', 'Unknown'),
-                    cruelty_flag=row.get('Animal Cruelty Flag', 'Unknown'),
-                    cruelty_note=row.get('Cruelty Note', 'Unknown'),
-                    price=row.get('Estimated Price', 'Unknown'),
-                    vegan_alternative=row.get('Vegan Alternative', 'Unknown'),
-                    vegan_material=row.get('Material', 'Unknown'),
-                    vegan_price=row.get('Price', 'Unknown'),
-                    why_vegan=row.get('Why Choose Vegan', 'Unknown')
-                )
-                chunks.append({"text": text, "metadata": row.to_dict()})
-            except Exception as e:
-                logger.warning(f"⚠️ Error processing row: {e}")
-                continue
+        try:
+            texts = render_texts(self.df, Config.CHUNK_TEMPLATE, Config.CHUNK_FIELDS)
+            chunks = [{"text": text, "metadata": metadata} for text, metadata in zip(texts, build_records(self.df))]
+        except Exception as e:
+            logger.warning(f"⚠️ Error processing rows: {e}")
+            chunks = []
         
         self.chunks = chunks
         logger.info(f"✅ Created {len(chunks)} text chunks")
@@ -195,23 +199,23 @@ class GeminiManager:
         """Configure Gemini API"""
         try:
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+            self.model = GeminiClient.from_env(genai.GenerativeModel(Config.GEMINI_MODEL))
             logger.info(f"✅ Configured Gemini API with model: {Config.GEMINI_MODEL}")
         except Exception as e:
             logger.error(f"❌ Error configuring Gemini API: {e}")
             raise
     
     def generate_response(self, prompt: str) -> str:
-        """Generate response using Gemini"""
+        """
+        Generate response using Gemini
+
+        Raises GeminiUnavailableError when the call fails after retries or the
+        circuit breaker is open, so callers can fall back to retrieval only.
+        """
         if self.model is None:
             raise ValueError("Gemini model not configured")
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            logger.error(f"❌ Error generating Gemini response: {e}")
-            return f"Sorry, I encountered an error: {str(e)}"
+        return self.model.generate_content(prompt).text
 
 # ------------------------------
 # 6️⃣ RAG System
@@ -286,19 +290,10 @@ class RAGSystem:
             logger.error(f"❌ Error retrieving chunks: {e}")
             return []
     
-    def answer_query(self, query: str) -> str:
-        """Generate answer using RAG"""
-        if not self.gemini_manager:
-            return "❌ Gemini API not available. Please check your API key."
-        
-        try:
-            top_chunks = self.retrieve_chunks(query)
-            if not top_chunks:
-                return "❌ No relevant information found for your query."
-            
-            context = "\n".join([c['text'] for c in top_chunks])
-            
-            prompt = f"""
+    @staticmethod
+    def build_prompt(query: str, context: str) -> str:
+        """Build the Gemini prompt for a query and its retrieved context"""
+        return f"""
 You are a cruelty-free shopping assistant.
 You have information about products that use animal materials and their vegan alternatives.
 Use the following product information to answer the user's question clearly and helpfully.
@@ -316,8 +311,25 @@ User query: {query}
 
 Answer:
 """
+    
+    def answer_query(self, query: str) -> str:
+        """Generate answer using RAG"""
+        if not self.gemini_manager:
+            return "❌ Gemini API not available. Please check your API key."
+        
+        try:
+            top_chunks = self.retrieve_chunks(query)
+            if not top_chunks:
+                return "❌ No relevant information found for your query."
             
-            return self.gemini_manager.generate_response(prompt)
+            prompt_builder = PromptBuilder(getattr(self.embedding_manager.embed_model, "tokenizer", None))
+            prompt = prompt_builder.build(query, top_chunks, self.build_prompt)
+            
+            try:
+                return self.gemini_manager.generate_response(prompt)
+            except GeminiUnavailableError as e:
+                logger.warning(f"⚠️ Gemini unavailable, answering from retrieval only: {e}")
+                return retrieval_only_answer(query, top_chunks)
             
         except Exception as e:
             logger.error(f"❌ Error generating answer: {e}")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Two-stage retrieval: wide ANN recall narrowed by lexical filters, then a batched cross-encoder re-rank"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+from deadlines import Deadline
+from ingest import price_value
+from intent_router import detect_category, price_cap
+from metrics import RERANK_OUTCOMES, timed
+
+logger = logging.getLogger(__name__)
+
+# Off by default: a model name, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2, downloads it at startup
+# and re-orders results; empty keeps the FAISS top-k
+RERANK_MODEL = os.getenv("RERANK_MODEL", "").strip()
+# Stage-1 candidates per query (N)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+# Per query; past it, the queries keep their stage-1 order
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Tokens per (query, product) pair; product texts are truncated past this
+RERANK_MAX_LENGTH = 256
+
+OUTCOMES = ("reranked", "timeout", "unavailable")
+
+
+def lexical_constraints(query: str) -> Tuple[Optional[str], Optional[float]]:
+    """The category and price cap a query names, each None if it names none"""
+    text = query.lower()
+    return detect_category(text), price_cap(text)
+
+
+def lexical_filter(query: str, ids: Sequence[int], chunks: List[Dict[str, Any]], keep: int) -> List[int]:
+    """
+    Stage-1 candidates narrowed to the category and price cap the query names
+
+    "wallets under $300" keeps Small Leather Goods priced up to $300. If
+    fewer than `keep` candidates pass, the rest follow them in ANN order
+    so the answer still has enough products.
+    """
+    category, cap = lexical_constraints(query)
+    if category is None and cap is None:
+        return list(ids)
+
+    def fits(i: int) -> bool:
+        metadata = chunks[i]["metadata"]
+        if category is not None and metadata.get("Category") != category:
+            return False
+        if cap is not None:
+            price = price_value(metadata)
+            return price is not None and price <= cap
+        return True
+
+    matching = [i for i in ids if fits(i)]
+    if len(matching) >= keep:
+        return matching
+    chosen = set(matching)
+    return matching + [i for i in ids if i not in chosen]
+
+
+class CascadeStats:
+    """Outcome counts and mean latency of each retrieval stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outcomes = dict.fromkeys(OUTCOMES, 0)
+        self._count = {"stage1": 0, "stage2": 0}
+        self._seconds = {"stage1": 0.0, "stage2": 0.0}
+        self._candidates = 0.0
+
+    def record_stage(self, stage: str, seconds: float, candidates: float = 0) -> None:
+        with self._lock:
+            self._count[stage] += 1
+            self._seconds[stage] += seconds
+            self._candidates += candidates
+
+    def record_outcome(self, outcome: str) -> None:
+        RERANK_OUTCOMES.inc(outcome=outcome)
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "outcomes": dict(self._outcomes),
+                "mean_latency_ms": {
+                    stage: (self._seconds[stage] / n * 1000 if n else None)
+                    for stage, n in self._count.items()
+                },
+                "mean_candidates": (self._candidates / self._count["stage1"]) if self._count["stage1"] else None,
+            }
+
+
+class Reranker:
+    """
+    Second retrieval stage shared by every catalog
+
+    Stage 1 (in the caller) takes `candidates` products per query from
+    FAISS; `cascade()` narrows them with `lexical_filter` and re-scores all
+    (query, product) pairs of a call in one batched cross-encoder pass on
+    CPU. Scoring runs batch by batch against `budget_ms` per query in the
+    call: as soon as the pace so far shows the pass cannot finish in time,
+    it stops and every query keeps its stage-1 order. Stage 1 runs while
+    `candidates` > 0, stage 2 only with a loaded model; without one, the
+    wide set is fetched only for queries the lexical filter can narrow.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, candidates: int = RERANK_CANDIDATES,
+                 budget_ms: float = RERANK_BUDGET_MS, batch_size: int = RERANK_BATCH_SIZE,
+                 model: Optional[CrossEncoder] = None):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.budget_ms = budget_ms
+        self.batch_size = max(1, batch_size)
+        self.model = model
+        self.stats = CascadeStats()
+        self._load_lock = threading.Lock()
+        self._load_failed = False
+
+    @property
+    def enabled(self) -> bool:
+        """Whether stage 1 (wide recall and lexical filter) runs"""
+        return self.candidates > 0
+
+    @property
+    def reranking(self) -> bool:
+        """Whether stage 2 runs: only with a loaded model, never after a failed load"""
+        return self.model is not None
+
+    def recall_size(self, queries: Sequence[str], top_k: int) -> int:
+        """FAISS results to fetch per query for the cascade, or 0 when neither stage has work to do"""
+        if not self.enabled:
+            return 0
+        if self.reranking or any(lexical_constraints(q) != (None, None) for q in queries):
+            return max(top_k, self.candidates)
+        return 0
+
+    def load(self) -> Optional[CrossEncoder]:
+        """Load the cross-encoder once; None if it is disabled or failed to load"""
+        if self.model is not None or not self.model_name or self._load_failed:
+            return self.model
+        with self._load_lock:
+            if self.model is None and not self._load_failed:
+                try:
+                    self.model = CrossEncoder(self.model_name, max_length=RERANK_MAX_LENGTH, device="cpu")
+                    logger.info(f"✅ Loaded re-ranking model {self.model_name}")
+                except Exception as e:
+                    self._load_failed = True
+                    logger.warning(f"⚠️ Re-ranking model {self.model_name} unavailable, using ANN order: {e}")
+        return self.model
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Settings and per-stage stats, for choosing `candidates` and `budget_ms`"""
+        return {
+            "model": self.model_name if self.model is not None else None,
+            "candidates": self.candidates,
+            "budget_ms": self.budget_ms,
+            **self.stats.snapshot(),
+        }
+
+    def cascade(self, queries: Sequence[str], rows: Sequence[Sequence[int]], chunks: List[Dict[str, Any]],
+                top_k: int, stage1_start: float, deadline: Optional[Deadline] = None) -> List[List[int]]:
+        """
+        The best `top_k` ids per query from its stage-1 `rows`
+
+        `stage1_start` is when the caller started embedding, so stage-1
+        latency covers the embed, the wide search and the lexical filter.
+        A request `deadline` caps the re-ranking budget.
+        """
+        candidates = [lexical_filter(q, row, chunks, top_k) for q, row in zip(queries, rows)]
+        self.stats.record_stage("stage1", time.perf_counter() - stage1_start,
+                                sum(len(c) for c in candidates) / max(1, len(candidates)))
+        if not self.reranking:
+            if self.model_name:
+                self.stats.record_outcome("unavailable")
+            return [ids[:top_k] for ids in candidates]
+        return self.rerank(queries, candidates, chunks, top_k, deadline)
+
+    def rerank(self, queries: Sequence[str], candidates: Sequence[Sequence[int]],
+               chunks: List[Dict[str, Any]], top_k: int, deadline: Optional[Deadline] = None) -> List[List[int]]:
+        """Re-score every query's candidates in one batched pass; stage-1 order if over budget"""
+        fallback = [list(ids[:top_k]) for ids in candidates]
+        pairs = [(q, chunks[i]["text"]) for q, ids in zip(queries, candidates) for i in ids]
+        if not pairs:
+            return fallback
+        model = self.load()
+        if model is None:
+            self.stats.record_outcome("unavailable")
+            return fallback
+
+        # A batch call re-ranks every query's candidates, so it gets every query's budget
+        budget = self.budget_ms / 1000 * len(candidates)
+        if deadline is not None:
+            budget = min(budget, deadline.remaining())
+            if budget <= 0:
+                self.stats.record_outcome("timeout")
+                return fallback
+        start = time.perf_counter()
+        scores = []
+        with timed("rerank"):
+            for offset in range(0, len(pairs), self.batch_size):
+                batch = pairs[offset:offset + self.batch_size]
+                scores.append(np.asarray(model.predict(batch, batch_size=self.batch_size,
+                                                       show_progress_bar=False), dtype=np.float32))
+                done = offset + len(batch)
+                elapsed = time.perf_counter() - start
+                # Stop as soon as the pace so far cannot finish within the budget
+                if done < len(pairs) and elapsed / done * len(pairs) > budget:
+                    self.stats.record_stage("stage2", elapsed)
+                    self.stats.record_outcome("timeout")
+                    return fallback
+        self.stats.record_stage("stage2", time.perf_counter() - start)
+        self.stats.record_outcome("reranked")
+
+        scores = np.concatenate(scores)
+        ranked = []
+        offset = 0
+        for ids in candidates:
+            row = scores[offset:offset + len(ids)]
+            offset += len(ids)
+            # Stable, so ties keep the ANN order
+            order = np.argsort(-row, kind="stable")[:top_k]
+            ranked.append([int(ids[j]) for j in order])
+        return ranked
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""Conversation sessions for multi-turn chat: session stores and follow-up narrowing"""
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from analytics import CatalogAnalytics
+from ingest import price_value
+from intent_router import detect_category, price_cap
+
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+# Per-session memory cap, measured as serialized JSON size
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "16384"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+# Empty keeps sessions in process; "redis://host:6379/0" shares them between workers
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "").strip()
+
+MAX_TURN_CHARS = 2000
+HISTORY_TURN_CHARS = 400
+
+SESSION_ID_PATTERN = re.compile(r"^[\w-]{1,64}$")
+FOLLOW_UP_PATTERN = re.compile(
+    r"^(?:and|what about|how about|also|but|ok(?:ay)?|so|any)\b"
+    r"|\b(?:those|these|them|they|it|its|ones|that one|this one|the first|the second|the last|"
+    r"cheaper|less expensive|more affordable|similar)\b"
+)
+CHEAPER_PATTERN = re.compile(r"\b(?:cheaper|less expensive|more affordable|lower price|budget)\b")
+FOLLOW_UP_MAX_WORDS = 12
+# Words of follow-up phrasing that may also start a catalog word ("less" -> "Lessa"), never a new subject
+FOLLOW_UP_WORDS = {
+    "cheaper", "less", "expensive", "more", "affordable", "lower", "budget", "under", "below", "than",
+    "similar", "made", "first", "second", "last", "also", "about", "other", "another", "else", "vegan",
+    "cruelty", "free", "show", "tell", "option", "alternative", "these", "those",
+}
+
+
+def new_session() -> Dict[str, Any]:
+    """A session under a fresh server-generated id; client-chosen ids are never used"""
+    return {"id": uuid.uuid4().hex, "turns": [], "chunk_ids": []}
+
+
+def valid_session_id(session_id: Any) -> bool:
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+def add_turn(session: Dict[str, Any], user: str, assistant: str, chunk_ids: Optional[List[int]] = None,
+             max_turns: int = SESSION_MAX_TURNS, max_bytes: int = SESSION_MAX_BYTES) -> None:
+    """
+    Append one exchange, then trim the session to its turn and memory caps
+
+    Oldest exchanges go first; the most recent one is always kept.
+    """
+    session["turns"].append({"user": user[:MAX_TURN_CHARS], "assistant": assistant[:MAX_TURN_CHARS]})
+    if chunk_ids is not None:
+        session["chunk_ids"] = [int(i) for i in chunk_ids]
+    del session["turns"][:-max_turns]
+    while len(session["turns"]) > 1 and len(json.dumps(session)) > max_bytes:
+        session["turns"].pop(0)
+
+
+def format_history(turns: List[Dict[str, str]]) -> str:
+    """Recent turns as prompt text, each side shortened"""
+    lines = []
+    for turn in turns:
+        lines.append(f"User: {turn['user'][:HISTORY_TURN_CHARS]}")
+        lines.append(f"Assistant: {turn['assistant'][:HISTORY_TURN_CHARS]}")
+    return "\n".join(lines)
+
+
+# ------------------------------
+# 🗂️ Session stores
+# ------------------------------
+class SessionStore:
+    """Interface for session backends; sessions are plain JSON-serializable dicts"""
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, session: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Sessions in this process, evicted after `idle_ttl` seconds unused
+
+    When more than `max_sessions` are live, the least recently used go
+    first. Callers get copies, so a request never mutates a stored session
+    until it saves it.
+    """
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.evicted = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Entries are kept in last-used order, so idle ones are at the front
+        while self._data:
+            session_id, (_, last_used) = next(iter(self._data.items()))
+            if now - last_used < self.idle_ttl and len(self._data) <= self.max_sessions:
+                break
+            del self._data[session_id]
+            self.evicted += 1
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._evict(time.monotonic())
+            entry = self._data.get(session_id)
+            return copy.deepcopy(entry[0]) if entry is not None else None
+
+    def save(self, session: Dict[str, Any]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._data[session["id"]] = (copy.deepcopy(session), now)
+            self._data.move_to_end(session["id"])
+            self._evict(now)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._data), "evicted": self.evicted}
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in Redis, shared by every worker; Redis expires idle ones"""
+
+    def __init__(self, url: str, idle_ttl: float = SESSION_IDLE_TTL, prefix: str = "chat-session:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_STORE_URL points at Redis but the redis package is not installed") from e
+        self._redis = redis.Redis.from_url(url)
+        self.idle_ttl = int(idle_ttl)
+        self.prefix = prefix
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        key = self.prefix + session_id
+        data = self._redis.get(key)
+        if data is None:
+            return None
+        self._redis.expire(key, self.idle_ttl)
+        return json.loads(data)
+
+    def save(self, session: Dict[str, Any]) -> None:
+        self._redis.set(self.prefix + session["id"], json.dumps(session), ex=self.idle_ttl)
+
+    def delete(self, session_id: str) -> None:
+        self._redis.delete(self.prefix + session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+def create_session_store(url: str = SESSION_STORE_URL) -> SessionStore:
+    if not url:
+        return InMemorySessionStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
+
+
+# ------------------------------
+# 🔁 Follow-up narrowing
+# ------------------------------
+def is_follow_up(message: str, session: Optional[Dict[str, Any]],
+                 catalog_terms: Sequence[str] = ()) -> bool:
+    """
+    Short messages that lean on earlier turns, like "and cheaper ones?" or "what are they made of?"
+
+    Needs a previous turn to lean on. `catalog_terms` are the words of the
+    message that name a product, brand or material (see
+    IntentRouter.catalog_terms): a message that brings one, like "is it
+    cruel to wear wool?", starts a new search instead.
+    """
+    if not session or not session.get("turns"):
+        return False
+    if any(term not in FOLLOW_UP_WORDS for term in catalog_terms):
+        return False
+    text = message.lower().strip()
+    return len(text.split()) <= FOLLOW_UP_MAX_WORDS and bool(FOLLOW_UP_PATTERN.search(text))
+
+
+def narrow_follow_up(message: str, chunk_ids: List[int], chunks: List[Dict[str, Any]],
+                     top_k: int = 5, analytics: Optional[CatalogAnalytics] = None) -> Optional[List[int]]:
+    """
+    Chunk ids for a follow-up, derived from the previous turn's results
+
+    - No price or category in the message: reuse the previous results.
+    - "cheaper" / "under $X": keep previous results under the cap, topped
+      up with catalog products from the same categories under the cap.
+    - A different category without a price: None, so the caller runs a
+      fresh retrieval.
+
+    With the catalog's `analytics`, the top-up is a lookup in its sorted
+    per-category prices instead of a scan of every chunk.
+    """
+    text = message.lower()
+    cap = price_cap(text)
+    if cap is None and CHEAPER_PATTERN.search(text):
+        prices = [p for p in (price_value(chunks[i]["metadata"]) for i in chunk_ids) if p is not None]
+        if prices:
+            cap = min(prices) - 0.01
+
+    previous_categories = {chunks[i]["metadata"].get("Category") for i in chunk_ids}
+    category = detect_category(text)
+    if cap is None:
+        if category is None or category in previous_categories:
+            return list(chunk_ids)
+        return None
+
+    categories = {category} if category else previous_categories
+
+    def fits(i: int) -> bool:
+        metadata = chunks[i]["metadata"]
+        price = price_value(metadata)
+        return metadata.get("Category") in categories and price is not None and price <= cap
+
+    narrowed = [i for i in chunk_ids if fits(i)]
+    if len(narrowed) < top_k and analytics is not None:
+        narrowed += analytics.priced_under(categories, cap, top_k - len(narrowed), exclude=set(narrowed))
+    elif len(narrowed) < top_k:
+        seen = set(narrowed)
+        # Closest to the cap first: the next price tier down from what was shown
+        extra = sorted(
+            (i for i in range(len(chunks)) if i not in seen and fits(i)),
+            key=lambda i: -price_value(chunks[i]["metadata"]),
+        )
+        narrowed += extra[:top_k - len(narrowed)]
+    # Nothing cheaper exists: keep the previous products so the answer can say so
+    return narrowed or list(chunk_ids)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Precomputed k-nearest-neighbour graph over product vectors for "more like this" lookups"""
+
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Neighbours stored per product; requests can ask for at most this many
+SIMILAR_GRAPH_K = int(os.getenv("SIMILAR_GRAPH_K", "20"))
+# Query rows per FAISS search call, bounding the (rows x k) result buffers
+SEARCH_BATCH = 8192
+
+
+class NeighborGraph(NamedTuple):
+    """Row i holds product i's nearest other products, closest first; -1 pads short rows"""
+    ids: np.ndarray        # (n, k) int64
+    distances: np.ndarray  # (n, k) float32, squared L2 like the product index
+
+    @property
+    def k(self) -> int:
+        return self.ids.shape[1]
+
+
+def _flat_index(vectors: np.ndarray) -> faiss.Index:
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def _search(index: faiss.Index, queries: np.ndarray, k: int, self_ids: Optional[np.ndarray] = None):
+    """Batched top-k search; a query's own id (if given) is dropped from its results"""
+    n = len(queries)
+    ids = np.full((n, k), -1, dtype=np.int64)
+    distances = np.full((n, k), np.inf, dtype=np.float32)
+    extra = 1 if self_ids is not None else 0
+    width = min(k + extra, index.ntotal)
+    if n == 0 or width == 0:
+        return ids, distances
+    for start in range(0, n, SEARCH_BATCH):
+        stop = min(start + SEARCH_BATCH, n)
+        D, I = index.search(queries[start:stop], width)
+        if self_ids is not None:
+            D = np.where(I == self_ids[start:stop, None], np.inf, D)
+        D = np.where(I < 0, np.inf, D)
+        order = np.argsort(D, axis=1, kind="stable")[:, :k]
+        ids[start:stop, :order.shape[1]] = np.take_along_axis(I, order, axis=1)
+        distances[start:stop, :order.shape[1]] = np.take_along_axis(D, order, axis=1)
+    ids[~np.isfinite(distances)] = -1
+    return ids, distances
+
+
+def build_graph(vectors: np.ndarray, k: int = SIMILAR_GRAPH_K, index: Optional[faiss.Index] = None) -> NeighborGraph:
+    """All products' neighbours from one batched matrix search of the catalog against itself"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = index if index is not None else _flat_index(vectors)
+    ids, distances = _search(index, vectors, k, self_ids=np.arange(len(vectors)))
+    logger.info(f"✅ Built kNN graph for {len(vectors)} products (k={k})")
+    return NeighborGraph(ids, distances)
+
+
+def _merge(ids_a, dist_a, ids_b, dist_b, k: int):
+    ids = np.concatenate([ids_a, ids_b], axis=1)
+    distances = np.concatenate([dist_a, dist_b], axis=1)
+    distances = np.where(ids < 0, np.inf, distances)
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    ids = np.take_along_axis(ids, order, axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    ids[~np.isfinite(distances)] = -1
+    return ids, distances
+
+
+def update_graph(previous: NeighborGraph, old_ids: np.ndarray, vectors: np.ndarray,
+                 k: int = SIMILAR_GRAPH_K, index: Optional[faiss.Index] = None) -> NeighborGraph:
+    """
+    Graph for a changed catalog, reusing `previous` where it is still exact
+
+    `old_ids[i]` is new product i's position in the previous catalog, or -1
+    if it is new or its text changed. Only new products are searched
+    against the whole catalog; unchanged products merge their previous
+    neighbours with the new products closest to them. Rows that lost a
+    neighbour to a removal are searched in full.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if previous.k < k:
+        return build_graph(vectors, k, index)
+    index = index if index is not None else _flat_index(vectors)
+    n = len(vectors)
+    ids = np.full((n, k), -1, dtype=np.int64)
+    distances = np.full((n, k), np.inf, dtype=np.float32)
+
+    fresh = np.nonzero(old_ids < 0)[0]
+    kept = np.nonzero(old_ids >= 0)[0]
+    old_to_new = np.full(len(previous.ids), -1, dtype=np.int64)
+    old_to_new[old_ids[kept]] = kept
+
+    # Unchanged products: previous neighbours renumbered, plus any new product that comes closer
+    prev_ids = previous.ids[old_ids[kept], :k]
+    kept_ids = np.where(prev_ids >= 0, old_to_new[np.maximum(prev_ids, 0)], -1)
+    kept_distances = np.where(kept_ids >= 0, previous.distances[old_ids[kept], :k], np.inf).astype(np.float32)
+    if fresh.size:
+        fresh_ids, fresh_distances = _search(_flat_index(vectors[fresh]), vectors[kept], k)
+        fresh_ids = np.where(fresh_ids >= 0, fresh[np.maximum(fresh_ids, 0)], -1)
+        kept_ids, kept_distances = _merge(kept_ids, kept_distances, fresh_ids, fresh_distances, k)
+    ids[kept], distances[kept] = kept_ids, kept_distances
+
+    # A removed neighbour leaves a gap only a full search can fill; so do new products
+    lost = kept[((prev_ids >= 0) & (old_to_new[np.maximum(prev_ids, 0)] < 0)).any(axis=1)]
+    full = np.concatenate([fresh, lost])
+    if full.size:
+        ids[full], distances[full] = _search(index, vectors[full], k, self_ids=full)
+    logger.info(f"✅ Updated kNN graph: {len(full)} of {n} products searched in full")
+    return NeighborGraph(ids, distances)
+
+
+def save_graph(graph: NeighborGraph, path: str, version: str) -> None:
+    """Write the graph next to the index; `version` ties it to one catalog version"""
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, ids=graph.ids, distances=graph.distances, version=np.array(version))
+    os.replace(tmp, path)
+
+
+def load_graph(path: str, version: str, n: int) -> Optional[NeighborGraph]:
+    """The saved graph if it belongs to this catalog version, else None"""
+    try:
+        with np.load(path) as data:
+            if str(data["version"]) != version or data["ids"].shape[0] != n:
+                return None
+            return NeighborGraph(data["ids"], data["distances"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def similar_products(chunks: List[Dict[str, Any]], graph: NeighborGraph, product_id: int, k: int,
+                     describe) -> Dict[str, Any]:
+    """
+    A product's nearest neighbours and the vegan alternatives that best match it
+
+    Alternatives are the product's own followed by its neighbours', closest
+    first and without repeats. Pure lookups: no embedding or search.
+    """
+    row_ids = graph.ids[product_id, :k]
+    row_distances = graph.distances[product_id, :k]
+    similar = [
+        {**describe(int(i)), "distance": round(float(d), 4)}
+        for i, d in zip(row_ids, row_distances) if i >= 0
+    ]
+    alternatives = []
+    seen = set()
+    for source, distance in [(product_id, 0.0), *((s["id"], s["distance"]) for s in similar)]:
+        metadata = chunks[source]["metadata"]
+        name = metadata.get("Vegan Alternative")
+        if not isinstance(name, str) or not name or name in seen:
+            continue
+        seen.add(name)
+        alternatives.append({
+            "vegan_alternative": name,
+            "vegan_material": metadata.get("Material"),
+            "vegan_price": metadata.get("Price"),
+            "for_product_id": source,
+            "distance": distance,
+        })
+    return {"product": describe(product_id), "similar": similar, "vegan_alternatives": alternatives[:k]}
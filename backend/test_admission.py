@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Tests for admission control: traffic classes, client keys and 429/503 decisions"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from admission import AdmissionMiddleware, AdmissionRejected, TrafficClass, classify, client_key, parse_networks
+
+TRUSTED = parse_networks("127.0.0.0/8,10.0.0.0/8")
+
+
+def scope(peer="203.0.113.7", **headers):
+    return {
+        "client": (peer, 5000),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    }
+
+
+def test_classify():
+    assert classify("/api/chatbot/chat") == "chat"
+    assert classify("/api/chatbot/batch") == "chat"
+    assert classify("/api/chatbot/suggestions") == "catalog"
+    assert classify("/api/v4/taxa/scientific_name") == "proxy"
+    assert classify("/metrics") is None
+
+
+def test_client_key_uses_allow_listed_api_keys_only():
+    assert client_key(scope(x_api_key="partner-1"), api_keys={"partner-1"}, trusted=TRUSTED) == "key:partner-1"
+    # A made-up key cannot buy a fresh bucket
+    assert client_key(scope(x_api_key="random"), api_keys={"partner-1"}, trusted=TRUSTED) == "ip:203.0.113.7"
+
+
+def test_client_key_ignores_forwarded_for_from_untrusted_peers():
+    assert client_key(scope(x_forwarded_for="1.2.3.4"), api_keys=(), trusted=TRUSTED) == "ip:203.0.113.7"
+
+
+def test_client_key_takes_rightmost_untrusted_hop():
+    # Browser spoofs 1.2.3.4; the Next.js server appends the real address, a load balancer its own
+    forwarded = scope("127.0.0.1", x_forwarded_for="1.2.3.4, 198.51.100.9, 10.0.0.5")
+    assert client_key(forwarded, api_keys=(), trusted=TRUSTED) == "ip:198.51.100.9"
+
+
+def test_client_key_trusting_any_peer():
+    assert client_key(scope(x_forwarded_for="1.2.3.4, 198.51.100.9"), api_keys=(), trusted=None) == "ip:198.51.100.9"
+
+
+def test_client_over_rate_gets_429():
+    traffic = TrafficClass("test-rate", concurrency=1, queue=0, max_wait=1, client_rate=1, client_burst=2)
+    traffic.check_client("ip:a")
+    traffic.check_client("ip:a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        traffic.check_client("ip:a")
+    assert rejected.value.status == 429
+    assert rejected.value.reason == "client_rate"
+    assert 0 < rejected.value.retry_after <= 1
+    # Another client has its own bucket
+    traffic.check_client("ip:b")
+
+
+def test_full_queue_gets_503():
+    async def run():
+        traffic = TrafficClass("test-queue", concurrency=1, queue=1, max_wait=5)
+        await traffic.acquire()
+        waiter = asyncio.ensure_future(traffic.acquire())
+        await asyncio.sleep(0)
+        assert traffic.waiting == 1
+        with pytest.raises(AdmissionRejected) as rejected:
+            await traffic.acquire()
+        assert (rejected.value.status, rejected.value.reason) == (503, "queue_full")
+        traffic.release(0.1)
+        await waiter
+        assert (traffic.running, traffic.waiting) == (1, 0)
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_gets_503_and_leaves_the_queue():
+    async def run():
+        traffic = TrafficClass("test-wait", concurrency=1, queue=4, max_wait=0.05)
+        await traffic.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await traffic.acquire()
+        assert rejected.value.reason == "wait_timeout"
+        assert traffic.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_middleware_rejects_with_retry_after():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    classes = {"chat": TrafficClass("test-mw", concurrency=1, queue=0, max_wait=1)}
+    middleware = AdmissionMiddleware(app, classes=classes)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://t") as client:
+            first = asyncio.ensure_future(client.post("/api/chatbot/chat"))
+            await asyncio.sleep(0.05)
+            second = await client.post("/api/chatbot/chat")
+            assert second.status_code == 503
+            assert int(second.headers["Retry-After"]) >= 1
+            release.set()
+            assert (await first).status_code == 200
+            # Unclassified paths pass straight through
+            assert (await client.get("/health")).status_code == 200
+        assert classes["chat"].running == 0
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Tests for saving and loading catalog artifacts: version marker, mismatched pairs and failed saves"""
+
+import os
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from cruelty_free_chatbot import (catalog_version, load_index_and_metadata, read_version_marker,
+                                  save_index_and_metadata, version_path)
+
+
+def catalog(n, name="product"):
+    chunks = [{"text": f"{name} {i}", "metadata": {"Product Name": f"{name} {i}"}} for i in range(n)]
+    index = faiss.IndexFlatL2(4)
+    index.add(np.random.default_rng(n).random((n, 4), dtype=np.float32))
+    return index, chunks
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "products.index"), str(tmp_path / "metadata.pkl")
+
+
+def test_saved_pair_loads_with_its_version(paths):
+    index, chunks = catalog(3)
+    save_index_and_metadata(index, chunks, *paths)
+    assert read_version_marker(paths[0])["version"] == catalog_version(chunks)
+    loaded, loaded_chunks, version = load_index_and_metadata(*paths)
+    assert loaded.ntotal == 3 and loaded_chunks == chunks
+    assert version == catalog_version(chunks)
+
+
+def test_metadata_from_another_save_is_rejected(paths):
+    index, chunks = catalog(3)
+    save_index_and_metadata(index, chunks, *paths)
+    # A save caught between its metadata and its marker: same size, other version
+    with open(paths[1], "wb") as f:
+        pickle.dump(catalog(3, name="other")[1], f)
+    with pytest.raises(ValueError):
+        load_index_and_metadata(*paths, attempts=2)
+
+
+def test_artifacts_without_a_marker_still_load(paths):
+    index, chunks = catalog(2)
+    save_index_and_metadata(index, chunks, *paths)
+    os.remove(version_path(paths[0]))
+    _, _, version = load_index_and_metadata(*paths)
+    assert version == catalog_version(chunks)
+
+
+def test_failed_save_raises(tmp_path):
+    index, chunks = catalog(2)
+    with pytest.raises(Exception):
+        save_index_and_metadata(index, chunks, str(tmp_path / "missing" / "products.index"),
+                                str(tmp_path / "metadata.pkl"))
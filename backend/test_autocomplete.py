@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Tests for typeahead: prefix ranking and typo corrections"""
+
+from autocomplete import AutocompleteIndex
+
+
+def chunk(name):
+    return {"text": name, "metadata": {"Product Name": name, "Category": "Handbags"}}
+
+
+STYLES = ["Atelier Tote", "Classic Clutch", "Heritage Scarf", "Elegance Belt", "Archive Wallet", "Signature Bag"]
+CHUNKS = (
+    [chunk(f"Brunello Cucinelli {style} {i}") for style in STYLES for i in range(2)]
+    + [chunk(f"Gucci {style}") for style in STYLES[:3]]
+)
+
+
+def texts(results):
+    return [r["text"] for r in results]
+
+
+def test_prefix_ranks_popular_first():
+    index = AutocompleteIndex.from_chunks(CHUNKS)
+    assert texts(index.complete("brun"))[0] == "Brunello Cucinelli"
+
+
+def test_typo_prefers_the_same_first_letter():
+    index = AutocompleteIndex.from_chunks(CHUNKS)
+    results = index.complete("guci")
+    assert results[0]["text"] == "Gucci"
+    assert results[0]["corrected"] == "gucci"
+
+
+def test_corrections_take_turns():
+    index = AutocompleteIndex.from_chunks(CHUNKS)
+    corrected = [r["corrected"] for r in index.complete("guci", limit=6)]
+    # The more popular brand does not fill every slot
+    assert corrected.count("gucci") == 3 and corrected.count("cucinelli") == 3
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for batch answering: duplicate queries, result positions and early close"""
+
+import threading
+import time
+
+import pytest
+
+import cruelty_free_chatbot
+from cruelty_free_chatbot import answer_queries_with_rag
+
+CHUNKS = [{"text": f"product {i}", "metadata": {}} for i in range(3)]
+
+
+class FakeGemini:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        time.sleep(self.delay)
+        return type("Response", (), {"text": f"answer {len(self.prompts)}"})()
+
+
+class FakePromptBuilder:
+    def __init__(self):
+        self.contexts = 0
+
+    def select_fields(self, query):
+        return ()
+
+    def context_budget(self, query, build_prompt):
+        return 1000
+
+    def build_context(self, chunks, fields, budget):
+        self.contexts += 1
+        return " | ".join(c["text"] for c in chunks)
+
+
+@pytest.fixture
+def retrieval(monkeypatch):
+    """Retrieval by the query's first word: "wallet ..." -> [0], "bag ..." -> [1], anything else -> []"""
+    routes = {"wallet": [0], "bag": [1]}
+    monkeypatch.setattr(cruelty_free_chatbot, "retrieve_chunk_ids_batch",
+                        lambda queries, *args, **kwargs: [routes.get(q.split()[0].lower(), []) for q in queries])
+
+
+def run(queries, gemini, max_concurrency=4, prompt_builder=None):
+    return list(answer_queries_with_rag(queries, None, None, CHUNKS, gemini, max_concurrency=max_concurrency,
+                                        prompt_builder=prompt_builder or FakePromptBuilder()))
+
+
+def test_duplicates_are_answered_once(retrieval):
+    gemini = FakeGemini()
+    results = run(["wallet deals", "Wallet  DEALS", "bag deals", "wallet deals"], gemini)
+    assert len(gemini.prompts) == 2
+    by_index = {r["index"]: r for r in results}
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert by_index[0]["answer"] == by_index[1]["answer"] == by_index[3]["answer"]
+    assert by_index[1]["query"] == "Wallet  DEALS"
+
+
+def test_same_chunks_share_one_context(retrieval):
+    builder = FakePromptBuilder()
+    run(["wallet deals", "wallet prices"], FakeGemini(), prompt_builder=builder)
+    assert builder.contexts == 1
+
+
+def test_no_context_skips_gemini(retrieval):
+    gemini = FakeGemini()
+    (result,) = run(["shoes"], gemini)
+    assert gemini.prompts == []
+    assert result["answer"] == cruelty_free_chatbot.NO_CONTEXT_ANSWER
+
+
+def test_retrieval_failure_reports_every_query(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("index missing")
+    monkeypatch.setattr(cruelty_free_chatbot, "retrieve_chunk_ids_batch", fail)
+    results = run(["a", "b"], FakeGemini())
+    assert [r["index"] for r in results] == [0, 1]
+    assert all("index missing" in r["error"] for r in results)
+
+
+def test_close_drops_unstarted_work(retrieval):
+    gemini = FakeGemini(delay=0.1)
+    queries = [f"wallet {i}" for i in range(20)]
+    results = answer_queries_with_rag(queries, None, None, CHUNKS, gemini, max_concurrency=2,
+                                      prompt_builder=FakePromptBuilder())
+    next(results)
+    start = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - start < 0.05
+    time.sleep(0.3)
+    # The first answer plus at most `max_concurrency` calls already running
+    assert len(gemini.prompts) <= 3
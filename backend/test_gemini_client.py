@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Tests for the Gemini client's retries and circuit breaker"""
+
+import asyncio
+import time
+
+import pytest
+
+from gemini_client import CircuitBreaker, GeminiClient, GeminiUnavailableError
+
+
+class ProviderError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+class FakeModel:
+    """Raises the queued errors in order, then answers"""
+
+    def __init__(self, *errors, delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt, request_options=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def generate_content_async(self, prompt, request_options=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def client(model, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+    return GeminiClient(model, rate_per_sec=1000, burst=1000, base_delay=0.001, max_delay=0.001, **kwargs)
+
+
+def test_retries_provider_errors_then_succeeds():
+    model = FakeModel(ProviderError(503), ProviderError(429))
+    assert client(model, breaker=CircuitBreaker()).generate_content("p") == "ok"
+    assert model.calls == 3
+
+
+def test_breaker_opens_after_repeated_provider_failures():
+    gemini = client(FakeModel(*[ProviderError(503)] * 10), max_retries=1)
+    with pytest.raises(GeminiUnavailableError):
+        gemini.generate_content("p")
+    assert gemini.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(GeminiUnavailableError, match="circuit breaker is open"):
+        gemini.generate_content("p")
+
+
+def test_caller_error_does_not_close_a_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    gemini = client(FakeModel(ProviderError(400)), breaker=breaker)
+    with pytest.raises(GeminiUnavailableError):
+        gemini.generate_content("p")
+    # Still waiting for a healthy trial call, which is let through next
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert gemini.generate_content("p") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_caller_error_does_not_reset_failure_count():
+    gemini = client(FakeModel(ProviderError(503), ProviderError(400), ProviderError(503)), max_retries=0)
+    for _ in range(3):
+        with pytest.raises(GeminiUnavailableError):
+            gemini.generate_content("p")
+    assert gemini.breaker.state == CircuitBreaker.OPEN
+
+
+def test_caller_deadline_timeouts_do_not_trip_the_breaker():
+    gemini = client(FakeModel(delay=0.2), timeout=30)
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(GeminiUnavailableError):
+                await gemini.generate_content_async("p", timeout=0.05)
+
+    asyncio.run(run())
+    assert gemini.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_own_timeouts_trip_the_breaker():
+    gemini = client(FakeModel(delay=0.2), timeout=0.05)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(GeminiUnavailableError):
+                await gemini.generate_content_async("p")
+
+    asyncio.run(run())
+    assert gemini.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests for structured query routing: only confident catalog matches skip the LLM"""
+
+import pytest
+
+from intent_router import IntentRouter
+
+
+def chunk(name, category, material, price):
+    metadata = {"Product Name": name, "Category": category, "Animal Materials Used": material,
+                "Estimated Price": f"${price * 8}", "Vegan Alternative": f"Vegan {name}",
+                "Material": "Recycled polyester", "Price": f"${price}"}
+    return {"text": name, "metadata": metadata}
+
+
+CHUNKS = [
+    chunk("Gucci Classic Overcoat Outerwear", "Outerwear", "Duck down", 359),
+    chunk("Miu Miu Signature Belt Accessorie", "Accessories", "Silk", 90),
+    chunk("Burberry Heritage Belt Accessorie", "Accessories", "Silk", 120),
+    chunk("Hermes Birkin Handbag", "Handbags", "Crocodile leather", 450),
+    chunk("Prada Edit Wallet Small Leather Good", "Small Leather Goods", "Calfskin leather", 80),
+    chunk("Fendi Knit Tote Handbag", "Handbags", "Mink fur", 300),
+]
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(CHUNKS)
+
+
+@pytest.mark.parametrize("query", [
+    # Pronouns and short words used to match inside names ("it" in "Birkin", "in" in "Knit")
+    "how much is it?",
+    "how much are they",
+    "what is the cost of in",
+    # A material is not a product: price questions about it go to the LLM
+    "price of silk",
+    # "alternatives to" inside a longer question
+    "I love my coat but what are the ethical alternatives to fur that keep warm?",
+    # No product names the subject
+    "alternatives to unicornhide",
+])
+def test_unclear_queries_go_to_the_llm(router, query):
+    assert router.route(query) is None
+
+
+def test_price_matches_whole_word_prefixes(router):
+    answer, ids = router.route_with_ids("how much is the gucci overcoat?")
+    assert ids == [0]
+    assert "$359" in answer
+
+
+def test_price_singular_matches_plural(router):
+    _, ids = router.route_with_ids("what are the prices of prada wallets")
+    assert ids == [4]
+
+
+def test_alternatives_match_materials(router):
+    answer, ids = router.route_with_ids("vegan alternatives to silk")
+    assert ids == [1, 2]
+    assert answer.startswith("Vegan alternatives to silk")
+
+
+def test_listing_under_price(router):
+    _, ids = router.route_with_ids("show me handbags under $400")
+    assert ids == [5]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the IUCN mirror sync: per-run counts, overlapping runs and 304 revalidation"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mirror import IUCNMirror, MirrorSync
+
+TAXON = {
+    "taxon": {"sis_id": 15951, "scientific_name": "Panthera leo"},
+    "assessments": [{"assessment_id": 7, "latest": True, "year_published": "2023"}],
+}
+
+
+class FakeIUCN:
+    """Code lists with no codes, one taxon and its assessment; answers 304 to a matching ETag"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+
+    async def __call__(self, method, path, params, headers=None):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        if path == "taxa/scientific_name":
+            body = TAXON
+        elif path.startswith("assessment/"):
+            body = {"assessment_id": 7}
+        else:
+            body = {path: []}
+        return httpx.Response(200, headers={"etag": '"v1"', "content-type": "application/json"},
+                              content=json.dumps(body).encode())
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = IUCNMirror(str(tmp_path / "mirror.sqlite"))
+    yield mirror
+    mirror.close()
+
+
+def test_second_run_is_revalidated(mirror):
+    sync = MirrorSync(mirror, FakeIUCN(), taxa=[("Panthera", "leo")], rate_per_sec=1000)
+    first = asyncio.run(sync.run_once())
+    assert (first["fetched"], first["not_modified"], first["failed"]) == (4, 0, 0)
+    second = asyncio.run(sync.run_once())
+    # The assessment detail is already stored, so it is not requested again
+    assert (second["fetched"], second["not_modified"], second["failed"]) == (0, 3, 0)
+
+
+def test_overlapping_runs_are_rejected(mirror):
+    sync = MirrorSync(mirror, FakeIUCN(delay=0.05), taxa=[("Panthera", "leo")], rate_per_sec=1000)
+
+    async def run():
+        first = asyncio.ensure_future(sync.run_once())
+        await asyncio.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            await sync.run_once()
+        return await first
+
+    summary = asyncio.run(run())
+    assert summary["fetched"] == 4
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Tests for the IUCN prefetch job's pacing and 429 backoff"""
+
+import asyncio
+import json
+import time
+
+from prefetch import PrefetchJob
+from ratelimit import TokenBucket
+
+
+def test_pause_holds_the_bucket_back():
+    bucket = TokenBucket(rate=100, capacity=10)
+    bucket.pause(0.2)
+    assert bucket.wait_time() >= 0.2
+
+
+def test_throttled_request_releases_its_slot_while_backing_off():
+    responses = {"conservation_actions": [(429, b"", 0.2), (200, b'{"conservation_actions": []}', None)]}
+
+    async def fetch(path, params):
+        queue = responses.get(path)
+        return queue.pop(0) if queue else (200, b"{}", None)
+
+    async def run():
+        job = PrefetchJob(fetch, taxa=[], concurrency=1, rate_per_sec=100)
+        task = asyncio.ensure_future(job._get("conservation_actions"))
+        await asyncio.sleep(0.05)
+        assert not job.semaphore.locked()
+        start = time.perf_counter()
+        body = await task
+        assert json.loads(body) == {"conservation_actions": []}
+        assert time.perf_counter() - start >= 0.1
+
+    asyncio.run(run())
+
+
+def test_run_once_warms_codes_and_taxa():
+    seen = []
+
+    async def fetch(path, params):
+        seen.append(path)
+        if path in ("conservation_actions", "use_and_trade"):
+            return 200, json.dumps({path: [{"code": "1"}, {"code": "2"}]}).encode(), None
+        return 200, b"{}", None
+
+    job = PrefetchJob(fetch, taxa=[("Panthera", "leo")], concurrency=2, rate_per_sec=1000)
+    summary = asyncio.run(job.run_once())
+    assert summary["requested"] == summary["warmed"] == 7
+    assert "taxa/scientific_name" in seen
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Tests for token-budgeted prompt assembly"""
+
+import math
+
+from prompt_builder import FIELD_LABELS, PromptBuilder
+
+FIELDS = tuple(col for col, _ in FIELD_LABELS)
+
+
+def chunk(name, cruelty_note="Animals suffer.", why="It is kinder."):
+    metadata = {"Product Name": name, "Category": "Handbags", "Animal Materials Used": "Leather",
+                "Animal Cruelty Flag": "YES", "Cruelty Note": cruelty_note, "Estimated Price": "$900",
+                "Vegan Alternative": f"Vegan {name}", "Material": "Cork", "Price": "$120",
+                "Why Choose Vegan": why}
+    return {"text": name, "metadata": metadata}
+
+
+def test_products_are_added_until_the_budget_is_spent():
+    builder = PromptBuilder()
+    chunks = [chunk(f"Bag {i}", cruelty_note=f"Note {i}.", why=f"Reason {i}.") for i in range(5)]
+    one = builder.count_tokens(builder.build_context(chunks[:1], FIELDS, 10_000))
+    context = builder.build_context(chunks, FIELDS, one * 2 + 5)
+    assert "Bag 1" in context and "Bag 2" not in context
+
+
+def test_zero_budget_sends_no_context():
+    assert PromptBuilder().build_context([chunk("Bag")], FIELDS, 0) == ""
+
+
+def test_oversized_first_product_is_truncated_to_the_budget():
+    builder = PromptBuilder()
+    context = builder.build_context([chunk("Bag", cruelty_note="Long note. " * 200)], FIELDS, 20)
+    assert context.startswith("Product: Bag")
+    assert 0 < builder.count_tokens(context) <= 20
+
+
+def test_repeated_sentences_are_shared():
+    builder = PromptBuilder()
+    context = builder.build_context([chunk("Bag A"), chunk("Bag B")], FIELDS, 10_000)
+    assert context.count("Animals suffer.") == 1
+    assert "Shared notes:" in context
+
+
+def test_blank_notes_are_not_shared():
+    builder = PromptBuilder()
+    chunks = [chunk("Bag A", cruelty_note="nan", why=""), chunk("Bag B", cruelty_note=math.nan, why="  ")]
+    context = builder.build_context(chunks, FIELDS, 10_000)
+    assert "Shared notes" not in context
+    assert "nan" not in context.lower()
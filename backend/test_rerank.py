@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Tests for the two-stage retrieval cascade: lexical filter, re-rank order, timeout and fallback paths"""
+
+import time
+
+import numpy as np
+
+from deadlines import Deadline
+from intent_router import price_cap
+from rerank import Reranker, lexical_filter
+
+
+def product(i, category, price):
+    return {"text": f"product {i}", "metadata": {"Category": category, "Price": f"${price}"}}
+
+
+CHUNKS = [
+    product(0, "Handbags", 900),
+    product(1, "Small Leather Goods", 450),
+    product(2, "Small Leather Goods", 120),
+    product(3, "Footwear", 200),
+    product(4, "Small Leather Goods", 80),
+    product(5, "Handbags", 150),
+]
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the product number in its text, optionally taking `delay` seconds per batch"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = 0
+
+    def predict(self, pairs, batch_size=16, show_progress_bar=False):
+        self.batches += 1
+        time.sleep(self.delay)
+        return np.array([float(text.split()[-1]) for _, text in pairs])
+
+
+def test_lexical_filter_keeps_category_and_price_cap():
+    ids = [0, 1, 2, 3, 4, 5]
+    assert lexical_filter("wallets under $300", ids, CHUNKS, keep=2) == [2, 4]
+
+
+def test_lexical_filter_tops_up_in_ann_order():
+    ids = [3, 1, 0, 2]
+    assert lexical_filter("wallets under $300", ids, CHUNKS, keep=3) == [2, 3, 1, 0]
+
+
+def test_lexical_filter_without_constraints_keeps_everything():
+    assert lexical_filter("something warm", [5, 0, 3], CHUNKS, keep=2) == [5, 0, 3]
+
+
+def test_rerank_orders_by_score():
+    reranker = Reranker(model=FakeCrossEncoder())
+    assert reranker.rerank(["q"], [[1, 4, 2]], CHUNKS, top_k=2) == [[4, 2]]
+    assert reranker.snapshot()["outcomes"]["reranked"] == 1
+
+
+def test_unavailable_model_keeps_stage1_order():
+    reranker = Reranker(model_name="")
+    assert not reranker.reranking
+    assert reranker.rerank(["q"], [[1, 4, 2]], CHUNKS, top_k=2) == [[1, 4]]
+    assert reranker.snapshot()["outcomes"]["unavailable"] == 1
+
+
+def test_over_budget_stops_early_and_keeps_stage1_order():
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = Reranker(model=model, budget_ms=10, batch_size=1)
+    assert reranker.rerank(["q"], [[1, 4, 2, 5]], CHUNKS, top_k=2) == [[1, 4]]
+    assert model.batches == 1
+    assert reranker.snapshot()["outcomes"]["timeout"] == 1
+
+
+def test_expired_deadline_skips_the_model():
+    model = FakeCrossEncoder()
+    deadline = Deadline(10)
+    deadline.cancel()
+    reranker = Reranker(model=model)
+    assert reranker.rerank(["q"], [[1, 4]], CHUNKS, top_k=1, deadline=deadline) == [[1]]
+    assert model.batches == 0
+
+
+def test_batch_budget_scales_with_queries():
+    # Each batch takes about one query's budget, so one shared budget would time out after the first
+    model = FakeCrossEncoder(delay=0.02)
+    reranker = Reranker(model=model, budget_ms=40, batch_size=2)
+    queries = [f"q{i}" for i in range(10)]
+    ranked = reranker.rerank(queries, [[1, 4]] * 10, CHUNKS, top_k=1)
+    assert ranked == [[4]] * 10
+    assert reranker.snapshot()["outcomes"] == {"reranked": 1, "timeout": 0, "unavailable": 0}
+
+
+def test_cascade_filters_before_reranking():
+    reranker = Reranker(model=FakeCrossEncoder())
+    ranked = reranker.cascade(["wallets under $300", "anything"], [[0, 1, 2, 4], [0, 3]], CHUNKS,
+                              top_k=2, stage1_start=time.perf_counter())
+    assert ranked == [[4, 2], [3, 0]]
+    assert reranker.snapshot()["mean_candidates"] == 2.0
+
+
+def test_failed_load_fetches_wide_only_for_filterable_queries():
+    reranker = Reranker(model_name="missing/model", candidates=50)
+    reranker._load_failed = True
+    assert reranker.enabled and not reranker.reranking
+    assert reranker.recall_size(["something warm"], top_k=5) == 0
+    assert reranker.recall_size(["wallets under $300"], top_k=5) == 50
+
+
+def test_zero_candidates_turns_stage1_off():
+    reranker = Reranker(model=FakeCrossEncoder(), candidates=0)
+    assert reranker.recall_size(["wallets under $300"], top_k=5) == 0
+
+
+def test_loaded_model_always_fetches_wide():
+    reranker = Reranker(model=FakeCrossEncoder(), candidates=20)
+    assert reranker.recall_size(["something warm"], top_k=5) == 20
+
+
+def test_cascade_without_a_model_only_filters():
+    reranker = Reranker(model_name="missing/model")
+    reranker._load_failed = True
+    ranked = reranker.cascade(["wallets under $300"], [[0, 1, 2, 4]], CHUNKS, top_k=2,
+                              stage1_start=time.perf_counter())
+    assert ranked == [[2, 4]]
+    assert reranker.snapshot()["outcomes"]["unavailable"] == 1
+
+
+def test_price_cap_parses_amounts():
+    assert price_cap("Wallets UNDER $1,200.50") == 1200.5
+    assert price_cap("cheap wallets") is None
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Tests for follow-up detection and server-minted session ids"""
+
+import pytest
+
+from intent_router import IntentRouter
+from sessions import add_turn, is_follow_up, narrow_follow_up, new_session
+
+
+def chunk(name, category, material, price):
+    metadata = {"Product Name": name, "Category": category, "Animal Materials Used": material,
+                "Price": f"${price}"}
+    return {"text": name, "metadata": metadata}
+
+
+CHUNKS = [
+    chunk("Gucci Classic Overcoat Outerwear", "Outerwear", "Wool", 359),
+    chunk("Hermes Birkin Handbag", "Handbags", "Crocodile leather", 450),
+    chunk("Fendi Knit Tote Handbag", "Handbags", "Mink fur", 300),
+    chunk("Prada Lessa Tote Handbag", "Handbags", "Calfskin leather", 200),
+]
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(CHUNKS)
+
+
+@pytest.fixture
+def session():
+    session = new_session()
+    add_turn(session, "show me handbags", "Here are some handbags.", [1, 2])
+    return session
+
+
+def test_first_message_is_never_a_follow_up(router):
+    message = "and cheaper ones?"
+    assert not is_follow_up(message, new_session(), router.catalog_terms(message))
+    assert not is_follow_up(message, None)
+
+
+@pytest.mark.parametrize("message", [
+    "and cheaper ones?",
+    "what are they made of?",
+    "any less expensive options?",
+    "show me similar ones",
+])
+def test_follow_ups_lean_on_the_previous_turn(router, session, message):
+    assert is_follow_up(message, session, router.catalog_terms(message))
+
+
+@pytest.mark.parametrize("message", [
+    "is it cruel to wear wool?",
+    "what about gucci?",
+    "and the hermes one?",
+])
+def test_a_new_subject_starts_a_new_search(router, session, message):
+    assert not is_follow_up(message, session, router.catalog_terms(message))
+
+
+def test_cheaper_narrows_to_the_same_categories(session):
+    ids = narrow_follow_up("and cheaper ones?", session["chunk_ids"], CHUNKS, top_k=2)
+    assert ids == [3]
+
+
+def test_session_ids_are_minted_on_the_server():
+    ids = {new_session()["id"] for _ in range(100)}
+    assert len(ids) == 100
+    assert all(len(i) == 32 and int(i, 16) >= 0 for i in ids)
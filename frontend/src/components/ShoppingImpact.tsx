@@ -1,8 +1,37 @@
+"use client";
+
+import { useState, useEffect } from "react";
 import { Heart, Globe, Leaf, ShoppingBag } from "lucide-react";
 import { SiAnimalplanet } from "react-icons/si";
 import Image from "next/image";
 
+interface CategorySavings {
+  group: string;
+  priced: number;
+  savings: { mean: number | null; median: number | null };
+}
+
+const formatDollars = (value: number) =>
+  `$${Math.round(value).toLocaleString("en-US")}`;
+
 export default function ShoppingImpact() {
+  // Average savings from choosing the vegan alternative, per product category
+  const [savings, setSavings] = useState<CategorySavings[]>([]);
+
+  useEffect(() => {
+    const loadSavings = async () => {
+      try {
+        const response = await fetch("/api/chatbot/analytics");
+        if (!response.ok) return;
+        const data = await response.json();
+        setSavings(data.by?.category || []);
+      } catch {
+        // The chatbot backend is optional here; the section reads fine without it
+      }
+    };
+    loadSavings();
+  }, []);
+
   return (
     <section id="shopping-impact" className="py-12 bg-white">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
@@ -66,6 +95,29 @@ export default function ShoppingImpact() {
                   </div>
                 </div>
 
+                {savings.length > 0 && (
+                  <div className="mb-6 rounded-2xl bg-[#F3F8F5] p-4">
+                    <p className="text-base font-medium text-[#0F3D2E] mb-3">
+                      Average savings by switching to vegan
+                    </p>
+                    <div className="grid grid-cols-1 sm:grid-cols-2 gap-2">
+                      {savings
+                        .filter((row) => row.savings.mean !== null)
+                        .map((row) => (
+                          <div
+                            key={row.group}
+                            className="flex items-center justify-between gap-3 text-sm text-[#4B5A54]"
+                          >
+                            <span>{row.group}</span>
+                            <span className="font-medium text-[#166D3B]">
+                              {formatDollars(row.savings.mean as number)}
+                            </span>
+                          </div>
+                        ))}
+                    </div>
+                  </div>
+                )}
+
                 <div className="flex items-center gap-3 text-[#166D3B]">
                   <p className="text-lg font-medium">
                     Every choice you make can help animals stay happy and keep
@@ -27,6 +27,10 @@ export default function CrueltyFreeChatbot() {
   const [inputValue, setInputValue] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [mounted, setMounted] = useState(false);
+  // Server-side conversation id, so follow-up questions keep their context
+  const [sessionId, setSessionId] = useState<string | null>(null);
+  // Typeahead suggestions for what is being typed, shown in place of the quick questions
+  const [completions, setCompletions] = useState<string[]>([]);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -64,6 +68,38 @@ export default function CrueltyFreeChatbot() {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
+  // Fetch typeahead suggestions shortly after the user stops typing
+  useEffect(() => {
+    const query = inputValue.trim();
+    if (query.length < 2) {
+      setCompletions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          `/api/chatbot/autocomplete?q=${encodeURIComponent(query)}`,
+          { signal: controller.signal }
+        );
+        if (response.ok) {
+          const data = await response.json();
+          setCompletions(
+            (data.suggestions || []).map((s: { text: string }) => s.text)
+          );
+        }
+      } catch {
+        // Aborted by the next keystroke, or the backend is down: keep the quick questions
+      }
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [inputValue]);
+
   const sendMessage = async () => {
     if (!inputValue.trim() || isLoading) return;
 
@@ -76,6 +112,7 @@ export default function CrueltyFreeChatbot() {
 
     setMessages((prev) => [...prev, userMessage]);
     setInputValue("");
+    setCompletions([]);
     setIsLoading(true);
 
     try {
@@ -86,11 +123,15 @@ export default function CrueltyFreeChatbot() {
         },
         body: JSON.stringify({
           message: userMessage.content,
+          ...(sessionId ? { session_id: sessionId } : {}),
         }),
       });
 
       if (response.ok) {
         const data = await response.json();
+        if (data.session_id) {
+          setSessionId(data.session_id);
+        }
         const botMessage: ChatMessage = {
           id: (Date.now() + 1).toString(),
           type: "bot",
@@ -146,7 +187,7 @@ export default function CrueltyFreeChatbot() {
           <div ref={messagesEndRef} />
 
           <QuickQuestions
-            questions={quickQuestions}
+            questions={completions.length ? completions : quickQuestions}
             onQuestionClick={handleQuickQuestion}
           />
 
@@ -0,0 +1,12 @@
+import type { NextApiRequest } from "next";
+
+// X-Forwarded-For for backend calls: every browser reaches the backend from this
+// server, so without it the backend's per-client rate limits would see one client
+export function forwardedFor(req: NextApiRequest): Record<string, string> {
+  const prior = req.headers["x-forwarded-for"];
+  const chain = [
+    Array.isArray(prior) ? prior.join(", ") : prior,
+    req.socket.remoteAddress,
+  ].filter(Boolean);
+  return chain.length ? { "X-Forwarded-For": chain.join(", ") } : {};
+}
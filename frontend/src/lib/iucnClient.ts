@@ -75,6 +75,40 @@ export interface UseAndTradeDetail {
   }>;
 }
 
+// Composite endpoints: one round trip, payloads trimmed to what the UI shows
+export interface AssessmentSummary {
+  assessment_id: number;
+  year_published: string;
+  latest: boolean;
+  red_list_category_code: string;
+  url: string;
+}
+
+export interface AssessmentDetailSummary {
+  assessment_id: number;
+  year_published: string;
+  red_list_category: { code: string | null; description: string | null };
+  population_trend: string | null;
+  threats: string[];
+  conservation_actions: string[];
+  habitats: string[];
+}
+
+export interface TaxonProfile {
+  taxon: Record<string, any>;
+  assessments: AssessmentSummary[];
+  latest_assessments: AssessmentDetailSummary[];
+}
+
+export interface CodeSummary {
+  code: string;
+  description: string | null;
+  assessment_count?: number;
+  latest_assessment_count?: number;
+  categories?: Record<string, number>;
+  error?: string;
+}
+
 const BASE_URL: string =
   (globalThis as any).__API_BASE_URL || "http://localhost:8000";
 
@@ -107,6 +141,17 @@ export const iucnClient = {
     if (infra) q.set("infra_name", infra);
     return request(`/api/v4/taxa/scientific_name?${q.toString()}`);
   },
+  getTaxonProfile: (genus: string, species: string, infra?: string) => {
+    const q = new URLSearchParams({ genus, species });
+    if (infra) q.set("infra", infra);
+    return request<TaxonProfile>(`/api/taxon_profile?${q.toString()}`);
+  },
+  getConservationActionsSummary: () =>
+    request<{ conservation_actions: CodeSummary[] }>(
+      `/api/conservation_actions/summary`
+    ),
+  getUseAndTradeSummary: () =>
+    request<{ use_and_trade: CodeSummary[] }>(`/api/use_and_trade/summary`),
   getConservationActions: () =>
     request<ConservationActionsResponse>(`/api/conservation_actions`),
   getConservationActionByCode: (code: string) =>
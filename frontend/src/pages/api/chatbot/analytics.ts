@@ -0,0 +1,46 @@
+import type { NextApiRequest, NextApiResponse } from "next";
+import { forwardedFor } from "@/lib/forwarded";
+
+export default async function handler(
+  req: NextApiRequest,
+  res: NextApiResponse
+) {
+  if (req.method !== "GET") {
+    return res.status(405).json({ error: "Method not allowed" });
+  }
+
+  try {
+    const { catalog } = req.query;
+
+    // Build query parameters
+    const params = new URLSearchParams();
+    if (catalog) params.append("catalog", catalog as string);
+
+    // Proxy the request to the backend FastAPI server
+    const backendResponse = await fetch(
+      `http://localhost:8000/api/chatbot/analytics?${params}`,
+      {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          ...forwardedFor(req),
+        },
+      }
+    );
+
+    if (!backendResponse.ok) {
+      throw new Error(
+        `Backend responded with status: ${backendResponse.status}`
+      );
+    }
+
+    const data = await backendResponse.json();
+    res.status(200).json(data);
+  } catch (error) {
+    console.error("Chatbot analytics error:", error);
+    res.status(500).json({
+      error: "Failed to get price analytics",
+      details: error instanceof Error ? error.message : "Unknown error",
+    });
+  }
+}
@@ -1,4 +1,5 @@
 import type { NextApiRequest, NextApiResponse } from "next";
+import { forwardedFor } from "@/lib/forwarded";
 
 export default async function handler(
   req: NextApiRequest,
@@ -9,12 +10,18 @@ export default async function handler(
   }
 
   try {
-    const { message } = req.body;
+    const { message, session_id, catalog } = req.body;
 
     if (!message) {
       return res.status(400).json({ error: "Message is required" });
     }
 
+    // Abort the backend call if the browser goes away, so it stops working on the answer
+    const abort = new AbortController();
+    res.on("close", () => {
+      if (!res.writableEnded) abort.abort();
+    });
+
     // Proxy the request to the backend FastAPI server
     const backendResponse = await fetch(
       "http://localhost:8000/api/chatbot/chat",
@@ -22,11 +29,24 @@ export default async function handler(
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...forwardedFor(req),
         },
-        body: JSON.stringify({ message }),
+        signal: abort.signal,
+        body: JSON.stringify({
+          message,
+          ...(session_id ? { session_id } : {}),
+          ...(catalog ? { catalog } : {}),
+        }),
       }
     );
 
+    if (backendResponse.status === 429 || backendResponse.status === 503) {
+      // The backend is shedding load: pass the status and Retry-After on so the client can back off
+      const retryAfter = backendResponse.headers.get("Retry-After");
+      if (retryAfter) res.setHeader("Retry-After", retryAfter);
+      return res.status(backendResponse.status).json(await backendResponse.json());
+    }
+
     if (!backendResponse.ok) {
       throw new Error(
         `Backend responded with status: ${backendResponse.status}`
@@ -36,6 +56,7 @@ export default async function handler(
     const data = await backendResponse.json();
     res.status(200).json(data);
   } catch (error) {
+    if (res.writableEnded || res.destroyed) return;
     console.error("Chatbot chat error:", error);
     res.status(500).json({
       error: "Failed to process chat message",
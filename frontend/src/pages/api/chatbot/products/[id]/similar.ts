@@ -0,0 +1,53 @@
+import type { NextApiRequest, NextApiResponse } from "next";
+import { forwardedFor } from "@/lib/forwarded";
+
+export default async function handler(
+  req: NextApiRequest,
+  res: NextApiResponse
+) {
+  if (req.method !== "GET") {
+    return res.status(405).json({ error: "Method not allowed" });
+  }
+
+  try {
+    const { id, k, catalog } = req.query;
+
+    // Build query parameters
+    const params = new URLSearchParams();
+    if (k) params.append("k", k as string);
+    if (catalog) params.append("catalog", catalog as string);
+
+    // Proxy the request to the backend FastAPI server
+    const backendResponse = await fetch(
+      `http://localhost:8000/api/chatbot/products/${encodeURIComponent(
+        id as string
+      )}/similar?${params}`,
+      {
+        method: "GET",
+        headers: {
+          "Content-Type": "application/json",
+          ...forwardedFor(req),
+        },
+      }
+    );
+
+    if (backendResponse.status === 404) {
+      return res.status(404).json(await backendResponse.json());
+    }
+
+    if (!backendResponse.ok) {
+      throw new Error(
+        `Backend responded with status: ${backendResponse.status}`
+      );
+    }
+
+    const data = await backendResponse.json();
+    res.status(200).json(data);
+  } catch (error) {
+    console.error("Chatbot similar products error:", error);
+    res.status(500).json({
+      error: "Failed to get similar products",
+      details: error instanceof Error ? error.message : "Unknown error",
+    });
+  }
+}
@@ -1,4 +1,5 @@
 import type { NextApiRequest, NextApiResponse } from "next";
+import { forwardedFor } from "@/lib/forwarded";
 
 export default async function handler(
   req: NextApiRequest,
@@ -15,6 +16,12 @@ export default async function handler(
       return res.status(400).json({ error: "Query is required" });
     }
 
+    // Abort the backend call if the browser goes away, so it stops working on the answer
+    const abort = new AbortController();
+    res.on("close", () => {
+      if (!res.writableEnded) abort.abort();
+    });
+
     // Proxy the request to the backend FastAPI server
     const backendResponse = await fetch(
       "http://localhost:8000/api/chatbot/query",
@@ -22,11 +29,20 @@ export default async function handler(
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...forwardedFor(req),
         },
+        signal: abort.signal,
         body: JSON.stringify({ query }),
       }
     );
 
+    if (backendResponse.status === 429 || backendResponse.status === 503) {
+      // The backend is shedding load: pass the status and Retry-After on so the client can back off
+      const retryAfter = backendResponse.headers.get("Retry-After");
+      if (retryAfter) res.setHeader("Retry-After", retryAfter);
+      return res.status(backendResponse.status).json(await backendResponse.json());
+    }
+
     if (!backendResponse.ok) {
       throw new Error(
         `Backend responded with status: ${backendResponse.status}`
@@ -36,6 +52,7 @@ export default async function handler(
     const data = await backendResponse.json();
     res.status(200).json(data);
   } catch (error) {
+    if (res.writableEnded || res.destroyed) return;
     console.error("Chatbot query error:", error);
     res.status(500).json({
       error: "Failed to process query",
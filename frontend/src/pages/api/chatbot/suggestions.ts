@@ -1,4 +1,5 @@
 import type { NextApiRequest, NextApiResponse } from "next";
+import { forwardedFor } from "@/lib/forwarded";
 
 export default async function handler(
   req: NextApiRequest,
@@ -23,6 +24,7 @@ export default async function handler(
         method: "GET",
         headers: {
           "Content-Type": "application/json",
+          ...forwardedFor(req),
         },
       }
     );